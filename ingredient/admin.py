@@ -1,7 +1,8 @@
 from django.contrib import admin
-from .models import Ingredient, UserAnalysisResult, IngredientResult
+from .models import Ingredient, UserAnalysisResult, IngredientResult, AnalysisJob
 
 # Register your models here.
 admin.site.register(Ingredient)
 admin.site.register(UserAnalysisResult)
-admin.site.register(IngredientResult)
\ No newline at end of file
+admin.site.register(IngredientResult)
+admin.site.register(AnalysisJob)  # 실패한 작업의 오류 내용(error) 확인용
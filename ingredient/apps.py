@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class IngredientConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ingredient'
+
+    def ready(self):
+        # 성분 변경 시그널 등록
+        from . import index  # noqa: F401
+
+        # ANALYSIS_JOB_START_ON_STARTUP 이면 분석 작업 워커 시작 (재시작 전에 남은 작업 처리)
+        from .jobs import start_workers_on_startup
+        start_workers_on_startup()
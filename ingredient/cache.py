@@ -0,0 +1,354 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+import unicodedata
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    # 스레드 안전한 크기 제한 LRU 캐시
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def image_hash(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def perceptual_hash(image_bytes):
+    # dHash: 9x8 흑백으로 줄인 뒤 가로로 이웃한 픽셀의 밝기 비교 (64비트)
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img.draft('L', (64, 64))
+        pixels = list(img.convert('L').resize((9, 8), Image.BILINEAR).getdata())
+
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+class OCRCache:
+    """
+    리사이즈된 이미지 바이트의 해시로 Clova OCR 응답 원문(JSON)을 저장하는 캐시.
+    메모리 LRU 뒤에 디스크 저장소를 두고, 디스크는 max_bytes 를 넘으면 오래 안 쓴 파일부터 지운다.
+    phash_distance 를 지정하면 거의 같은 사진(지각 해시 거리 이내)도 캐시 결과를 사용한다.
+    디스크는 여러 프로세스가 같이 쓰므로 조회/정리는 항상 디렉터리의 실제 파일을 기준으로 한다.
+    purge 는 디스크의 세대 표시 파일을 바꿔서, 다른 프로세스도 다음 조회 때 메모리 캐시를 비우게 한다.
+    """
+
+    GENERATION_FILE = 'GENERATION'
+
+    def __init__(self, directory, memory_items=256, max_bytes=100 * 1024 * 1024, phash_distance=None):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self.phash_distance = phash_distance
+        self.memory = LRUCache(memory_items)
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._files = None  # 유사 사진 검색용 목록: key -> phash 또는 None
+        self._listed_at = None  # 목록을 읽을 때의 디렉터리 mtime
+        self._generation = None
+
+    def _path(self, key, phash=None):
+        name = key if phash is None else f'{key}.{phash:016x}'
+        return os.path.join(self.directory, name + '.json')
+
+    def _read_generation(self):
+        try:
+            with open(os.path.join(self.directory, self.GENERATION_FILE), encoding='utf-8') as f:
+                return f.read().strip()
+        except OSError:
+            return ''
+
+    def _sync(self):
+        # 다른 프로세스(ocr_cache --purge)가 캐시를 비웠으면 메모리 캐시를 버린다
+        generation = self._read_generation()
+        with self._lock:
+            if generation != self._generation:
+                if self._generation is not None:
+                    self.memory.clear()
+                self._generation = generation
+
+    def _scan(self):
+        # 디렉터리의 캐시 파일 목록: (key, phash 또는 None, 경로, 크기, mtime)
+        entries = []
+        try:
+            listing = list(os.scandir(self.directory))
+        except OSError:
+            return entries
+        for entry in listing:
+            parts = entry.name.split('.')
+            if not entry.name.endswith('.json') or len(parts) not in (2, 3):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue  # 다른 프로세스가 방금 지운 파일
+            phash = int(parts[1], 16) if len(parts) == 3 else None
+            entries.append((parts[0], phash, entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _listing(self):
+        # 파일이 추가/삭제되면 디렉터리 mtime 이 바뀌므로 그때만 목록을 다시 읽는다
+        try:
+            listed_at = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return {}
+        with self._lock:
+            if self._files is not None and self._listed_at == listed_at:
+                return self._files
+        files = {key: phash for key, phash, path, size, mtime in self._scan()}
+        with self._lock:
+            self._files, self._listed_at = files, listed_at
+        return files
+
+    def _read(self, key, phash):
+        path = self._path(key, phash)
+        try:
+            with open(path, encoding='utf-8') as f:
+                result = f.read()
+            os.utime(path)  # 최근 사용 시각 갱신 (디스크 정리 순서)
+        except OSError:
+            return None
+        self.memory.set(key, result)
+        return result
+
+    def _nearest(self, files, phash):
+        best_key, best_distance = None, self.phash_distance + 1
+        for key, other in files.items():
+            if other is None:
+                continue
+            distance = bin(phash ^ other).count('1')
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        return best_key
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, image_bytes):
+        # 파일 읽기와 phash 계산은 잠금 밖에서 한다
+        key = image_hash(image_bytes)
+        self._sync()
+        result = self.memory.get(key)
+        if result is not None:
+            self._count('hits')
+            return result
+
+        phash = perceptual_hash(image_bytes) if self.phash_distance is not None else None
+        result = self._read(key, phash)  # 다른 프로세스가 저장한 파일도 바로 찾는다
+        if result is not None:
+            self._count('hits')
+            return result
+
+        if phash is not None:
+            files = self._listing()
+            near_key = self._nearest(files, phash)
+            if near_key is not None:
+                result = self._read(near_key, files[near_key])
+                if result is not None:
+                    self._count('near_hits')
+                    return result
+
+        self._count('misses')
+        return None
+
+    def set(self, image_bytes, result):
+        key = image_hash(image_bytes)
+        phash = perceptual_hash(image_bytes) if self.phash_distance is not None else None
+        self._sync()
+        self.memory.set(key, result)
+
+        path = self._path(key, phash)
+        temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                f.write(result.encode('utf-8'))
+            os.replace(temp_path, path)  # 다른 프로세스가 쓰는 중인 파일을 읽지 않도록
+        except OSError as e:
+            logger.warning("OCR 캐시 저장 실패: %s", e)
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+        self._evict()
+
+    def _evict(self):
+        # 다른 프로세스가 저장한 파일까지 합친 디스크 사용량 기준으로 정리
+        entries = self._scan()
+        total = sum(size for key, phash, path, size, mtime in entries)
+        if total <= self.max_bytes:
+            return
+
+        for key, phash, path, size, mtime in sorted(entries, key=lambda entry: entry[4]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def purge(self):
+        # 메모리/디스크 캐시를 모두 비우고 지운 파일 수 반환
+        generation = uuid.uuid4().hex
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, self.GENERATION_FILE), 'w', encoding='utf-8') as f:
+            f.write(generation)
+        with self._lock:
+            self._generation = generation
+            self.memory.clear()
+            self._files = None
+            self.hits = self.near_hits = self.misses = 0
+
+        removed = 0
+        for key, phash, path, size, mtime in self._scan():
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def stats(self):
+        # hits/misses 는 현재 프로세스 기준 (서버 프로세스 값은 /status/ocr-cache/), 디스크는 모든 프로세스 합계
+        self._sync()
+        entries = self._scan()
+        with self._lock:
+            requests = self.hits + self.near_hits + self.misses
+            return {
+                'hits': self.hits,
+                'near_hits': self.near_hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits + self.near_hits) / requests if requests else 0.0,
+                'memory_items': len(self.memory),
+                'disk_items': len(entries),
+                'disk_bytes': sum(size for key, phash, path, size, mtime in entries),
+            }
+
+
+_ocr_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache():
+    # settings.OCR_CACHE_ENABLED 가 False 면 None
+    global _ocr_cache
+    if not getattr(settings, 'OCR_CACHE_ENABLED', True):
+        return None
+    with _cache_lock:
+        if _ocr_cache is None:
+            _ocr_cache = OCRCache(
+                directory=getattr(settings, 'OCR_CACHE_DIR', settings.BASE_DIR / 'cache' / 'ocr'),
+                memory_items=getattr(settings, 'OCR_CACHE_MEMORY_ITEMS', 256),
+                max_bytes=getattr(settings, 'OCR_CACHE_MAX_BYTES', 100 * 1024 * 1024),
+                phash_distance=getattr(settings, 'OCR_CACHE_PHASH_DISTANCE', None),
+            )
+    return _ocr_cache
+
+
+def canonical_tokens(texts):
+    # 사진마다 달라지는 순서/중복/유니코드 표현 차이를 없앤 OCR 단어 목록
+    tokens = set()
+    for text in texts:
+        token = unicodedata.normalize('NFKC', text or '').strip()
+        if token:
+            tokens.add(token)
+    return tuple(sorted(tokens))
+
+
+class AnalysisCache:
+    """
+    OCR 단어 목록 -> (교정된 단어 집합, 매칭된 성분 id) 캐시.
+    같은 제품을 다시 찍으면 성분명 교정과 매칭을 모두 건너뛴다.
+    version 으로 성분 사전 인덱스의 세대(IngredientIndex.generation)를 받아, 바뀌면 전체를 비운다.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.memory = LRUCache(maxsize)
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        with self._lock:
+            if self.version != version:
+                self.memory.clear()
+                self.version = version
+
+    def get(self, texts, version):
+        self._check_version(version)
+        result = self.memory.get(canonical_tokens(texts))
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def set(self, texts, version, corrected, ingredient_ids):
+        self._check_version(version)
+        self.memory.set(canonical_tokens(texts), {
+            'corrected': tuple(sorted(set(corrected))),
+            'ids': tuple(ingredient_ids),
+        })
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / requests if requests else 0.0,
+            'items': len(self.memory),
+            'version': self.version,
+        }
+
+
+_analysis_cache = None
+
+
+def get_analysis_cache():
+    global _analysis_cache
+    with _cache_lock:
+        if _analysis_cache is None:
+            _analysis_cache = AnalysisCache(getattr(settings, 'ANALYSIS_CACHE_ITEMS', 1024))
+    return _analysis_cache
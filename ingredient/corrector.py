@@ -0,0 +1,128 @@
+import re
+
+from .hangul import decompose
+from .utils import normalize_name
+
+# OCR 한 필드에 여러 성분이 붙어 나오는 경우를 나누는 구분자
+TOKEN_SEPARATORS = re.compile(r'[,，、·ㆍ/;:]')
+
+
+def edit_distance(a, b, max_distance):
+    """
+    인접 문자 자리바꿈을 포함한 편집 거리 (Optimal String Alignment).
+    max_distance 를 넘으면 계산을 멈추고 max_distance + 1 을 반환한다.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+            row_min = min(row_min, current[j])
+        if row_min > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+
+    return previous[-1]
+
+
+class SymSpellCorrector:
+    """
+    성분 사전으로 만든 Symmetric Delete 맞춤법 교정기.
+    한글은 자모 단위로 분해한 뒤 비교하므로 받침 하나, 모음 하나 차이도 거리 1로 본다.
+    """
+
+    def __init__(self, words, max_distance=2, prefix_length=10):
+        # words: (정규화된 이름, 교정 결과로 돌려줄 이름) 목록
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.words = {}    # 자모 문자열 -> 교정 결과
+        self.deletes = {}  # 삭제 변형 -> 자모 문자열 목록
+
+        for key, value in words:
+            jamo = decompose(key)
+            if not jamo or jamo in self.words:
+                continue
+            self.words[jamo] = value
+            for delete in self._deletes(jamo[:prefix_length], max_distance):
+                self.deletes.setdefault(delete, []).append(jamo)
+
+    def __len__(self):
+        return len(self.words)
+
+    @staticmethod
+    def _deletes(word, distance):
+        result = {word}
+        frontier = {word}
+        for _ in range(distance):
+            next_frontier = set()
+            for item in frontier:
+                for i in range(len(item)):
+                    next_frontier.add(item[:i] + item[i + 1:])
+            next_frontier -= result
+            result |= next_frontier
+            frontier = next_frontier
+        return result
+
+    def _allowed_distance(self, jamo):
+        # 짧은 단어는 허용 거리를 줄여서 엉뚱한 성분으로 바뀌지 않게 한다
+        return min(self.max_distance, len(jamo) // 5)
+
+    def lookup(self, term):
+        # (교정 결과, 거리) 또는 None
+        jamo = decompose(normalize_name(term))
+        if not jamo:
+            return None
+        if jamo in self.words:
+            return self.words[jamo], 0
+
+        max_distance = self._allowed_distance(jamo)
+        if max_distance == 0:
+            return None
+
+        best = None
+        best_distance = max_distance + 1
+        checked = set()
+
+        for delete in self._deletes(jamo[:self.prefix_length], max_distance):
+            for candidate in self.deletes.get(delete, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+
+                distance = edit_distance(jamo, candidate, max_distance)
+                if distance > max_distance:
+                    continue
+                # 거리가 같으면 사전 순으로 골라서 항상 같은 결과가 나오게 한다
+                if best is None or (distance, candidate) < (best_distance, best):
+                    best, best_distance = candidate, distance
+
+        if best is None:
+            return None
+        return self.words[best], best_distance
+
+    def correct(self, texts):
+        # natural_language_processing 과 같은 형식: 교정된 성분명 목록
+        # 사전에서 찾지 못한 단어는 원문 그대로 둔다
+        return [result[0] if result else token for token, result in self.correct_tokens(texts)]
+
+    def correct_tokens(self, texts):
+        # (단어, 교정 결과 또는 None) 목록
+        return [(token, self.lookup(token)) for token in tokenize(texts)]
+
+
+def tokenize(texts):
+    tokens = []
+    for text in texts:
+        for token in TOKEN_SEPARATORS.split(text or ''):
+            token = token.strip()
+            if token:
+                tokens.append(token)
+    return tokens
@@ -0,0 +1,42 @@
+# 한글 음절을 자모 단위로 분해하는 유틸 (오타 교정, 초성 검색에서 사용)
+
+HANGUL_BASE = 0xAC00
+HANGUL_END = 0xD7A3
+
+CHOSUNG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+JUNGSUNG = 'ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ'
+JONGSUNG = ['', 'ㄱ', 'ㄲ', 'ㄳ', 'ㄴ', 'ㄵ', 'ㄶ', 'ㄷ', 'ㄹ', 'ㄺ', 'ㄻ', 'ㄼ', 'ㄽ', 'ㄾ', 'ㄿ', 'ㅀ',
+            'ㅁ', 'ㅂ', 'ㅄ', 'ㅅ', 'ㅆ', 'ㅇ', 'ㅈ', 'ㅊ', 'ㅋ', 'ㅌ', 'ㅍ', 'ㅎ']
+
+
+def is_hangul_syllable(ch):
+    return HANGUL_BASE <= ord(ch) <= HANGUL_END
+
+
+def decompose(text):
+    # '아스피린' -> 'ㅇㅏㅅㅡㅍㅣㄹㅣㄴ' (한글이 아닌 문자는 그대로 둔다)
+    result = []
+    for ch in text:
+        if is_hangul_syllable(ch):
+            code = ord(ch) - HANGUL_BASE
+            result.append(CHOSUNG[code // 588])
+            result.append(JUNGSUNG[(code % 588) // 28])
+            result.append(JONGSUNG[code % 28])
+        else:
+            result.append(ch)
+    return ''.join(result)
+
+
+def chosung(text):
+    # '아스피린' -> 'ㅇㅅㅍㄹ'
+    result = []
+    for ch in text:
+        if is_hangul_syllable(ch):
+            result.append(CHOSUNG[(ord(ch) - HANGUL_BASE) // 588])
+        else:
+            result.append(ch)
+    return ''.join(result)
+
+
+def is_chosung_only(text):
+    return bool(text) and all(ch in CHOSUNG for ch in text)
@@ -0,0 +1,172 @@
+import io
+import statistics
+
+from django.conf import settings
+from PIL import Image, ImageDraw, ImageOps
+
+# 글자 크기 추정용 썸네일 폭, 글자가 있는 줄로 볼 어두운 픽셀 비율
+THUMBNAIL_WIDTH = 512
+INK_ROW_RATIO = 0.02
+
+
+class ImageTooLarge(ValueError):
+    # 디코딩하면 ANALYSIS_IMAGE_MAX_PIXELS 를 넘는 이미지
+    pass
+
+
+def decode_size(img, size):
+    # JPEG 는 draft 로 목표 크기 이상인 가장 작은 1/2, 1/4, 1/8 크기로 디코딩하도록 설정
+    if img.format == 'JPEG' and img.width >= size[0] * 2:
+        img.draft(img.mode, size)
+    return img.size
+
+
+def check_pixels(img, size):
+    # 실제로 디코딩할 픽셀 수로 검사 (원본 크기가 아니라 draft 적용 후 크기)
+    max_pixels = getattr(settings, 'ANALYSIS_IMAGE_MAX_PIXELS', 25_000_000)
+    width, height = decode_size(img, size)
+    if width * height > max_pixels:
+        raise ImageTooLarge(f"이미지가 너무 큽니다 ({width}x{height})")
+
+
+def work_size(img, target_width, ocr_max_width):
+    # OCR 전송용으로 표시용보다 큰 이미지가 필요할 수 있으므로 최대 전송 폭까지는 남겨 둔다
+    width = min(img.width, max(target_width, ocr_max_width))
+    return width, max(1, int(width * img.height / img.width))
+
+
+def check_image(image_file, target_width=1024):
+    """
+    헤더만 읽어서 분석 전에 이미지를 검사한다 (픽셀 디코딩 없음).
+    이미지가 아니면 PIL.UnidentifiedImageError, 너무 크면 ImageTooLarge.
+    """
+    try:
+        with Image.open(image_file) as img:
+            check_pixels(img, work_size(img, target_width, getattr(settings, 'OCR_IMAGE_MAX_WIDTH', 1600)))
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e))
+    finally:
+        image_file.seek(0)
+
+
+class AnalysisImage:
+    """
+    분석용 이미지를 한 번만 디코딩해서 메모리에 들고 있는 객체.
+    원본이 목표 크기보다 훨씬 큰 JPEG 이면 draft 모드로 1/2, 1/4, 1/8 크기로 바로 디코딩한다.
+    인코딩은 실제로 필요한 결과(OCR 전송용, 박스 표시용)만, 필요할 때 한 번씩 한다.
+    """
+
+    def __init__(self, image_file, target_width=1024, ocr_max_width=None):
+        ocr_max_width = ocr_max_width or getattr(settings, 'OCR_IMAGE_MAX_WIDTH', 1600)
+
+        with Image.open(image_file) as img:
+            self.format = img.format or 'JPEG'
+
+            # 비율 유지하면서 새로운 세로 크기 계산
+            aspect_ratio = img.height / img.width
+            new_size = (target_width, int(target_width * aspect_ratio))
+
+            # 메모리 사용량은 원본이 아니라 작업 크기에 비례 (draft 로 줄여서 디코딩, 그래도 크면 거절)
+            size = work_size(img, target_width, ocr_max_width)
+            check_pixels(img, size)
+
+            source = img.resize(size, Image.LANCZOS) if img.size != size else img.copy()
+
+        self.image = source.resize(new_size, Image.LANCZOS) if source.size != new_size else source
+        self._source = source
+        self._ocr_payload = None
+        self._encoded = {}
+
+    @property
+    def size(self):
+        return self.image.size
+
+    @property
+    def content_type(self):
+        return Image.MIME.get(self.format, 'image/jpeg')
+
+    def encode(self, format=None, **params):
+        # 같은 형식/옵션으로는 한 번만 인코딩
+        format = format or self.format
+        key = (format, tuple(sorted(params.items())))
+        if key not in self._encoded:
+            buffer = io.BytesIO()
+            self.image.save(buffer, format=format, **params)
+            self._encoded[key] = buffer.getvalue()
+        return self._encoded[key]
+
+    def text_height(self):
+        """
+        썸네일에서 추정한 글자 줄 높이(px). 글자가 없으면 None.
+        흑백으로 만든 뒤 줄마다 어두운 픽셀 비율을 구하고, 글자가 있는 줄이 이어지는 길이의 중앙값을 사용한다.
+        """
+        thumbnail = self._source.convert('L')
+        thumbnail.thumbnail((THUMBNAIL_WIDTH, THUMBNAIL_WIDTH * 8))
+        ink = ImageOps.autocontrast(thumbnail, cutoff=1).point(lambda p: 255 if p < 128 else 0)
+        rows = ink.resize((1, ink.height), Image.BOX).getdata()
+
+        runs, run = [], 0
+        for value in rows:
+            if value > 255 * INK_ROW_RATIO:
+                run += 1
+            elif run:
+                runs.append(run)
+                run = 0
+        if run:
+            runs.append(run)
+
+        if not runs:
+            return None
+        return statistics.median(runs) * self._source.width / thumbnail.width
+
+    def ocr_width(self, text_height):
+        # 글자 줄 높이가 OCR 전송 이미지에서 OCR_IMAGE_TEXT_HEIGHT(px) 정도가 되도록 폭을 정한다
+        min_width = getattr(settings, 'OCR_IMAGE_MIN_WIDTH', 768)
+        max_width = getattr(settings, 'OCR_IMAGE_MAX_WIDTH', 1600)
+
+        if text_height is None:
+            width = min_width
+        else:
+            width = self._source.width * getattr(settings, 'OCR_IMAGE_TEXT_HEIGHT', 28) / text_height
+        return int(min(max(width, min_width), max_width, self._source.width))
+
+    def ocr_payload(self):
+        """
+        Clova OCR 로 보낼 JPEG.
+        글자 크기로 폭을 정하고(작은 글자가 많을수록 크게), 흑백 변환 + 대비 보정 후 설정된 품질로 인코딩한다.
+        {'data', 'size', 'text_height'} 반환 (size 는 전송한 이미지 크기로, OCR 좌표를 되돌릴 때 사용)
+        """
+        if self._ocr_payload is not None:
+            return self._ocr_payload
+
+        text_height = self.text_height()
+        width = self.ocr_width(text_height)
+        height = max(1, int(width * self._source.height / self._source.width))
+
+        image = self._source
+        if getattr(settings, 'OCR_IMAGE_GRAYSCALE', True):
+            image = ImageOps.autocontrast(image.convert('L'), cutoff=1)
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+        if image.size != (width, height):
+            image = image.resize((width, height), Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=getattr(settings, 'OCR_IMAGE_JPEG_QUALITY', 80), optimize=True)
+
+        self._ocr_payload = {'data': buffer.getvalue(), 'size': (width, height), 'text_height': text_height and round(text_height, 1)}
+        # 큰 작업용 이미지는 더 이상 필요 없으므로 메모리에서 내린다
+        self._source = None
+        return self._ocr_payload
+
+    def annotated(self, polygons, format=None):
+        # OCR 박스를 그린 이미지 (원본 픽셀은 그대로 두고 복사본에 그림)
+        image = self.image.copy()
+        draw = ImageDraw.Draw(image)
+        for vertices in polygons:
+            draw.polygon([tuple(vertex) for vertex in vertices], outline="red", width=2)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format=format or self.format)
+        buffer.seek(0)
+        return buffer
@@ -1,39 +1,181 @@
 from dotenv import load_dotenv
-import mimetypes
+from contextlib import contextmanager
 from io import BytesIO
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
 import boto3
+import threading
 import uuid
 import os
-from PIL import Image
 
 load_dotenv()
 
+# AWS_S3_ENDPOINT_URL 을 지정하면 MinIO 같은 S3 호환 로컬 서버를 사용 (벤치마크/테스트용)
+S3_PUBLIC_URL = os.environ.get("AWS_S3_PUBLIC_URL", "https://mombobucket.s3.ap-northeast-2.amazonaws.com")
+
+# 큰 이미지는 멀티파트로 나눠서 병렬 업로드
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+)
+
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    # 프로세스당 하나만 생성 (boto3 client 는 스레드 안전, 생성 과정은 아니므로 잠금)
+    global _s3_client
+    if _s3_client is not None:
+        return _s3_client
+
+    with _s3_client_lock:
+        if _s3_client is None:
+            session = boto3.session.Session(
+                aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
+                aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"),
+            )
+            _s3_client = session.client(
+                's3',
+                region_name=os.environ.get("AWS_S3_REGION_NAME", "ap-northeast-2"),
+                endpoint_url=os.environ.get("AWS_S3_ENDPOINT_URL") or None,
+                config=Config(
+                    max_pool_connections=int(os.environ.get("AWS_S3_MAX_POOL_CONNECTIONS", 20)),
+                    connect_timeout=3,
+                    read_timeout=30,
+                    retries={'max_attempts': 3, 'mode': 'standard'},
+                ),
+            )
+    return _s3_client
+
+
+def bucket_name():
+    return os.environ.get("AWS_STORAGE_BUCKET_NAME")
+
+
+def public_url(key):
+    return f'{S3_PUBLIC_URL}/{key}'
+
+
+def presigned_upload(key, content_type, max_bytes, expires_in=600, method='post'):
+    # 클라이언트가 Django 를 거치지 않고 S3 에 바로 올릴 수 있는 서명된 요청 정보
+    client = get_s3_client()
+    if method == 'put':
+        url = client.generate_presigned_url(
+            'put_object',
+            Params={'Bucket': bucket_name(), 'Key': key, 'ContentType': content_type},
+            ExpiresIn=expires_in,
+            HttpMethod='PUT',
+        )
+        return {'method': 'PUT', 'url': url, 'headers': {'Content-Type': content_type}}
+
+    # POST 는 업로드 크기 제한을 S3 가 직접 검사
+    post = client.generate_presigned_post(
+        bucket_name(),
+        key,
+        Fields={'Content-Type': content_type},
+        Conditions=[
+            {'Content-Type': content_type},
+            ['content-length-range', 1, max_bytes],
+        ],
+        ExpiresIn=expires_in,
+    )
+    return {'method': 'POST', 'url': post['url'], 'fields': post['fields']}
+
+
+def object_size(key):
+    # 업로드된 객체 크기 (없으면 None)
+    try:
+        return get_s3_client().head_object(Bucket=bucket_name(), Key=key)['ContentLength']
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        raise
+
+
 class S3ImgUploader:
-    def __init__(self, file):
+    def __init__(self, file, content_type='image/jpeg'):
         self.file = file
+        self.content_type = content_type
 
     def upload(self, folder):
-        
+
         url = folder+'/'+uuid.uuid1().hex
-        s3r = boto3.resource('s3', aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"), aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"))
-        s3r.Bucket(os.environ.get("AWS_STORAGE_BUCKET_NAME")).put_object(Key=url, Body=self.file, ContentType='jpg')
-        
-        return url
 
-    def delete(self):
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY")
+        # 메모리 버퍼를 그대로 스트리밍 (bytes 로 받은 경우만 버퍼로 감싼다)
+        fileobj = BytesIO(self.file) if isinstance(self.file, (bytes, bytearray)) else self.file
+        get_s3_client().upload_fileobj(
+            fileobj,
+            bucket_name(),
+            url,
+            ExtraArgs={'ContentType': self.content_type},
+            Config=TRANSFER_CONFIG,
         )
 
+        return url
+
+    def delete(self):
         try:
             # S3 객체 삭제
-            s3_client.delete_object(
-                Bucket=os.environ.get("AWS_STORAGE_BUCKET_NAME"),
-                Key=str(self.file)  
+            get_s3_client().delete_object(
+                Bucket=bucket_name(),
+                Key=str(self.file)
             )
-            return True  
+            return True
         except Exception as e:
             print("S3 이미지 삭제 실패:", str(e))
             return False
+
+
+class FakeS3Client:
+    # 테스트용 메모리 S3: 서명된 업로드 URL 발급, 업로드/다운로드/삭제/조회만 흉내 낸다
+    def __init__(self):
+        self.objects = {}  # (bucket, key) -> (bytes, content_type)
+
+    def put(self, bucket, key, data, content_type='image/jpeg'):
+        # 클라이언트가 서명된 URL 로 직접 올린 것처럼 객체 추가
+        self.objects[(bucket, key)] = (data, content_type)
+
+    def generate_presigned_post(self, Bucket, Key, Fields=None, Conditions=None, ExpiresIn=3600):
+        return {'url': f'http://s3.local/{Bucket}', 'fields': {**(Fields or {}), 'key': Key, 'policy': 'fake'}}
+
+    def generate_presigned_url(self, ClientMethod, Params=None, ExpiresIn=3600, HttpMethod=None):
+        return f"http://s3.local/{Params['Bucket']}/{Params['Key']}?signature=fake"
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Config=None):
+        self.put(Bucket, Key, Fileobj.read(), (ExtraArgs or {}).get('ContentType'))
+
+    def download_fileobj(self, Bucket, Key, Fileobj, Config=None):
+        Fileobj.write(self._get(Bucket, Key)[0])
+
+    def get_object(self, Bucket, Key):
+        return {'Body': BytesIO(self._get(Bucket, Key)[0])}
+
+    def head_object(self, Bucket, Key):
+        data, content_type = self._get(Bucket, Key)
+        return {'ContentLength': len(data), 'ContentType': content_type}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def _get(self, bucket, key):
+        if (bucket, key) not in self.objects:
+            raise ClientError({'Error': {'Code': '404', 'Message': 'Not Found'}}, 'HeadObject')
+        return self.objects[(bucket, key)]
+
+
+@contextmanager
+def override_s3_client(client=None):
+    # with override_s3_client() as s3: ... (기본값은 FakeS3Client)
+    global _s3_client
+    with _s3_client_lock:
+        previous = _s3_client
+        _s3_client = client or FakeS3Client()
+    try:
+        yield _s3_client
+    finally:
+        with _s3_client_lock:
+            _s3_client = previous
@@ -0,0 +1,70 @@
+import math
+
+from .models import Ingredient, ingredient_key, level_severity
+
+# CSV/XLSX 업로드 열 순서
+COLUMNS = ['categoryId', 'effectType', 'ingredientKr', 'ingredient', 'level', 'reason', 'notes']
+
+
+def cell_text(value):
+    # 칸 값을 저장하는 문자열로 통일 (XLSX 의 숫자/날짜 칸도 CSV 로 올린 값, DB 에 저장된 값과 같게 비교되도록)
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip() or None
+
+
+def import_rows(rows, seen=None):
+    """
+    업로드 한 묶음을 성분 사전에 반영한다.
+    정규화한 한글명(normalized_name)이 같은 성분이 이미 있으면 내용을 갱신하고, 없으면 새로 만든다.
+    seen 은 같은 업로드의 앞 묶음까지 나온 키 집합 (묶음 사이에 공유해서 파일 안의 중복 이름을 찾는다).
+    (새로 만든 성분 id 목록, 갱신한 성분 id 목록, 등급이 바뀐 성분 id 목록, 중복된 이름 목록) 반환
+    """
+    if seen is None:
+        seen = set()
+    rows = [dict(zip(COLUMNS, map(cell_text, row))) for row in rows]
+
+    keys = {ingredient_key(row['ingredientKr']) for row in rows} - {None}
+    existing = {ingredient.normalized_name: ingredient
+                for ingredient in Ingredient.objects.filter(normalized_name__in=keys)}
+
+    new, unnamed, changed = {}, [], {}
+    level_changed, duplicates = set(), []
+    for row in rows:
+        key = ingredient_key(row['ingredientKr'])
+        if key is not None:
+            # 같은 파일에 같은 성분이 여러 번 있으면 마지막 값으로 저장
+            if key in seen:
+                duplicates.append(row['ingredientKr'])
+            seen.add(key)
+
+        ingredient = existing.get(key) if key is not None else None
+        if ingredient is None:
+            ingredient = new.get(key) if key is not None else None
+            if ingredient is None:
+                # bulk_create 는 save() 를 거치지 않으므로 계산 필드를 직접 채운다
+                ingredient = Ingredient(normalized_name=key)
+                if key is None:
+                    unnamed.append(ingredient)
+                else:
+                    new[key] = ingredient
+            for name, value in row.items():
+                setattr(ingredient, name, value)
+            ingredient.severity = level_severity(ingredient.level)
+            continue
+
+        if all(cell_text(getattr(ingredient, name)) == value for name, value in row.items()):
+            continue
+        if cell_text(ingredient.level) != row['level']:
+            level_changed.add(ingredient.id)
+        for name, value in row.items():
+            setattr(ingredient, name, value)
+        ingredient.severity = level_severity(ingredient.level)
+        changed[ingredient.id] = ingredient
+
+    created = Ingredient.objects.bulk_create(unnamed + list(new.values()))
+    Ingredient.objects.bulk_update(list(changed.values()), COLUMNS + ['severity'])
+
+    return [ingredient.id for ingredient in created], sorted(changed), sorted(level_changed), duplicates
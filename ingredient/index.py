@@ -0,0 +1,224 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+from .corrector import SymSpellCorrector
+from .matcher import AhoCorasick, scan_fields
+from .models import Ingredient
+from .search import NameSearchIndex
+from .serializers import IngredientSerializer
+from .utils import normalize_name
+from .versions import bump_version, current_version
+
+logger = logging.getLogger(__name__)
+
+# 성분 사전 버전 (DB 에 저장해 워커 프로세스, 분석 작업 프로세스끼리 사전 변경을 알리는 용도)
+DICTIONARY_VERSION = 'ingredient:dictionary'
+
+
+def dictionary_version():
+    return current_version(DICTIONARY_VERSION)
+
+
+def bump_dictionary_version():
+    return bump_version(DICTIONARY_VERSION)[1]
+
+
+class IngredientIndex:
+    """
+    Ingredient 테이블 전체를 메모리에 올린 읽기 전용 사전.
+    한글명/영문명의 정규화 키로 직렬화된 성분 데이터와 등급을 바로 찾는다.
+    """
+
+    def __init__(self, ingredients, version=0):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.entries = {}  # ingredient id -> {'id', 'level', 'severity', 'names', 'data'}
+        self.by_name = {}  # 정규화된 이름 -> ingredient id
+        self.names = {}    # 정규화된 이름 -> 사전에 저장된 원래 이름
+        self._automaton = None
+        self._corrector = None
+        self._search = None
+
+        ingredients = list(ingredients)
+        serialized = IngredientSerializer(ingredients, many=True).data
+        for ingredient, data in zip(ingredients, serialized):
+            self._add(ingredient, data)
+
+    @property
+    def generation(self):
+        # 분석 결과 캐시 키: 버전이 같아도 만료로 다시 만든 인덱스는 다른 세대
+        return (self.version, self.built_at)
+
+    def _add(self, ingredient, data):
+        self.entries[ingredient.id] = {
+            'id': ingredient.id,
+            'level': ingredient.level,
+            'severity': ingredient.severity,
+            'names': (ingredient.ingredientKr, ingredient.ingredient),
+            'data': dict(data),
+        }
+
+        # 한글명 키는 DB 의 normalized_name (유일) 을 그대로 사용
+        # 영문명이 다른 성분의 이름과 겹치면 먼저 등록된(id가 작은) 성분을 사용
+        for key, name in ((ingredient.normalized_name, ingredient.ingredientKr),
+                          (normalize_name(ingredient.ingredient), ingredient.ingredient)):
+            if key and key not in self.by_name:
+                self.by_name[key] = ingredient.id
+                self.names[key] = name
+
+    def updated(self, ingredients, version):
+        """
+        바뀐 성분만 다시 반영한 새 인덱스 (전체를 다시 직렬화하지 않음).
+        성분명 역색인도 바뀐 성분의 조각만 고친다.
+        """
+        ingredients = list(ingredients)
+        index = IngredientIndex((), version)
+        index.built_at = self.built_at  # 전체를 다시 읽은 시각 기준으로 만료
+        index.entries = dict(self.entries)
+        index.by_name = dict(self.by_name)
+        index.names = dict(self.names)
+
+        pks = {ingredient.id for ingredient in ingredients}
+        for pk in pks & self.entries.keys():
+            del index.entries[pk]
+        for key in [key for key, pk in index.by_name.items() if pk in pks]:
+            del index.by_name[key]
+            del index.names[key]
+
+        serialized = IngredientSerializer(ingredients, many=True).data
+        for ingredient, data in zip(ingredients, serialized):
+            index._add(ingredient, data)
+
+        if self._search is not None:
+            index._search = self._search.updated(
+                [(ingredient.id, index.entries[ingredient.id]['names']) for ingredient in ingredients]
+            )
+        return index
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, pk):
+        return self.entries.get(pk)
+
+    def lookup(self, term):
+        pk = self.by_name.get(normalize_name(term))
+        if pk is None:
+            return None
+        return self.entries[pk]
+
+    def match(self, terms):
+        # 여러 단어를 한 번에 매칭 (쿼리 없음). 같은 성분은 한 번만 반환
+        matched = []
+        missing = []
+        seen = set()
+
+        for term in terms:
+            entry = self.lookup(term)
+            if entry is None:
+                missing.append(term)
+                continue
+            if entry['id'] in seen:
+                continue
+            seen.add(entry['id'])
+            matched.append(entry)
+
+        return matched, missing
+
+    @property
+    def automaton(self):
+        # 첫 스캔 때 생성 (인덱스와 함께 교체되므로 별도 무효화 불필요)
+        if self._automaton is None:
+            self._automaton = AhoCorasick(self.by_name.items())
+        return self._automaton
+
+    @property
+    def corrector(self):
+        if self._corrector is None:
+            self._corrector = SymSpellCorrector(self.names.items())
+        return self._corrector
+
+    @property
+    def search(self):
+        # 성분명 검색용 역색인 (음절/초성/자모 조각)
+        if self._search is None:
+            self._search = NameSearchIndex((pk, entry['names']) for pk, entry in self.entries.items())
+        return self._search
+
+    def scan(self, fields):
+        # OCR 필드 전체를 한 번에 스캔해서 사전에 있는 모든 성분명을 찾는다
+        return scan_fields(self.automaton, fields)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def is_fresh(index, version):
+    # 버전이 같아도 INGREDIENT_INDEX_MAX_AGE 초가 지나면 다시 만든다
+    # (시그널 없이 바뀐 데이터(queryset.update 등)가 계속 남아 있지 않도록)
+    max_age = getattr(settings, 'INGREDIENT_INDEX_MAX_AGE', 3600)
+    return index is not None and index.version == version and time.monotonic() - index.built_at < max_age
+
+
+def get_index():
+    # 워커 프로세스당 한 번 생성하고, 사전 버전이 바뀌면 다시 생성
+    global _index
+
+    version = dictionary_version()
+    index = _index
+    if is_fresh(index, version):
+        return index
+
+    with _index_lock:
+        if not is_fresh(_index, version):
+            _index = IngredientIndex(Ingredient.objects.order_by('id'), version)
+            logger.info("성분 사전 인덱스 생성: %d개 (version=%s)", len(_index), version)
+        return _index
+
+
+def rebuild_index():
+    # 새 인덱스를 만든 뒤 참조만 교체하므로 읽는 쪽은 항상 완성된 인덱스를 본다
+    global _index
+
+    version = bump_dictionary_version()
+    index = IngredientIndex(Ingredient.objects.order_by('id'), version)
+    with _index_lock:
+        if _index is None or _index.version <= version:
+            _index = index
+    logger.info("성분 사전 인덱스 재생성: %d개 (version=%s)", len(index), version)
+    return index
+
+
+def refresh_index(ingredient_ids):
+    """
+    업로드로 바뀐 성분만 다시 읽어 현재 인덱스를 고친다.
+    다른 곳에서 먼저 사전이 바뀌어 현재 인덱스가 최신이 아니면 전체를 다시 만든다.
+    """
+    global _index
+
+    current = _index
+    previous, version = bump_version(DICTIONARY_VERSION)
+    if current is None or current.version != previous:
+        index = IngredientIndex(Ingredient.objects.order_by('id'), version)
+    else:
+        index = current.updated(Ingredient.objects.filter(pk__in=ingredient_ids).order_by('id'), version)
+
+    with _index_lock:
+        if _index is None or _index.version <= version:
+            _index = index
+    logger.info("성분 사전 인덱스 갱신: %d개 중 %d개 (version=%s)", len(index), len(ingredient_ids), version)
+    return index
+
+
+def ingredient_changed(sender, **kwargs):
+    # admin 등에서 개별 성분이 수정되면 다음 조회 시 인덱스를 다시 만든다
+    bump_dictionary_version()
+
+
+post_save.connect(ingredient_changed, sender=Ingredient)
+post_delete.connect(ingredient_changed, sender=Ingredient)
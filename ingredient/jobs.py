@@ -0,0 +1,345 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .imgUpload import bucket_name, get_s3_client, presigned_upload
+from .models import AnalysisJob, UserAnalysisResult
+from .pipeline import run_analysis
+
+logger = logging.getLogger(__name__)
+
+
+def job_setting(name, default):
+    return getattr(settings, name, default)
+
+
+def save_upload(image_file):
+    # 업로드 이미지를 작업 디렉터리에 저장하고 경로 반환
+    upload_dir = job_setting('ANALYSIS_JOB_UPLOAD_DIR', settings.BASE_DIR / 'uploads' / 'jobs')
+    os.makedirs(upload_dir, exist_ok=True)
+
+    extension = os.path.splitext(image_file.name or '')[1]
+    path = os.path.join(upload_dir, uuid.uuid4().hex + extension)
+    with open(path, 'wb') as f:
+        for chunk in image_file.chunks():
+            f.write(chunk)
+    return path
+
+
+def enqueue_job(user_analysis_result, source):
+    job = AnalysisJob.objects.create(uar_id=user_analysis_result, source=source)
+    wake_local_workers()
+    return job
+
+
+def enqueue_analysis(user, image_file):
+    # 업로드를 저장하고 작업을 등록한 뒤 바로 UserAnalysisResult 반환
+    source = save_upload(image_file)
+
+    user_analysis_result = UserAnalysisResult.objects.create(
+        user_id=user,
+        image=None,
+        elapsed_time=None
+    )
+    enqueue_job(user_analysis_result, source)
+
+    return user_analysis_result
+
+
+def direct_upload_key(user_analysis_result):
+    # 클라이언트가 S3 에 직접 올리는 원본 이미지 위치
+    return f'uploads/{user_analysis_result.pk}/original'
+
+
+def create_direct_upload(user, content_type, method='post'):
+    # 분석 번호를 먼저 만들고, 그 번호로 원본 이미지를 올릴 서명된 요청 정보 반환
+    user_analysis_result = UserAnalysisResult.objects.create(
+        user_id=user,
+        image=None,
+        elapsed_time=None
+    )
+    upload = presigned_upload(
+        direct_upload_key(user_analysis_result),
+        content_type,
+        max_bytes=job_setting('ANALYSIS_UPLOAD_MAX_BYTES', 20 * 1024 * 1024),
+        expires_in=job_setting('ANALYSIS_UPLOAD_URL_EXPIRES', 600),
+        method=method,
+    )
+    return user_analysis_result, upload
+
+
+def discard_direct_upload(user_analysis_result):
+    # 시작할 수 없는 직접 업로드(크기 초과, 기한 만료)의 S3 원본과 분석 번호를 지운다
+    key = direct_upload_key(user_analysis_result)
+    try:
+        get_s3_client().delete_object(Bucket=bucket_name(), Key=key)
+    except Exception as e:
+        logger.warning("S3 원본 삭제 실패 (%s): %s", key, e)
+        return False
+    # 그 사이 다른 요청이 분석을 시작했으면 남겨 둔다
+    UserAnalysisResult.objects.filter(
+        pk=user_analysis_result.pk, image__isnull=True, job__isnull=True,
+    ).delete()
+    return True
+
+
+def expire_direct_uploads(limit=100):
+    # 업로드 URL 기한이 지나도록 시작하지 않은 직접 업로드를 정리하고 정리한 개수 반환
+    expires = job_setting('ANALYSIS_UPLOAD_URL_EXPIRES', 600) + job_setting('ANALYSIS_UPLOAD_EXPIRE_GRACE', 3600)
+    stale = UserAnalysisResult.objects.filter(
+        image__isnull=True, job__isnull=True, created_at__lt=timezone.now() - timedelta(seconds=expires),
+    ).order_by('pk')[:limit]
+
+    expired = sum(discard_direct_upload(user_analysis_result) for user_analysis_result in stale)
+    if expired:
+        logger.info("시작하지 않은 직접 업로드 %d개 정리", expired)
+    return expired
+
+
+_last_expired_at = None
+_expire_lock = threading.Lock()
+
+
+def expire_direct_uploads_periodically():
+    # 워커 폴링마다 부르지만 ANALYSIS_UPLOAD_EXPIRE_INTERVAL 초에 한 번만 정리한다
+    global _last_expired_at
+    now = time.monotonic()
+    with _expire_lock:
+        if _last_expired_at is not None and now - _last_expired_at < job_setting('ANALYSIS_UPLOAD_EXPIRE_INTERVAL', 300):
+            return 0
+        _last_expired_at = now
+    return expire_direct_uploads()
+
+
+def enqueue_direct_upload(user_analysis_result):
+    # S3 에 올라간 원본으로 분석 작업 등록
+    source = f's3://{bucket_name()}/{direct_upload_key(user_analysis_result)}'
+    return enqueue_job(user_analysis_result, source)
+
+
+def split_s3_source(source):
+    # 's3://bucket/key' -> (bucket, key)
+    bucket, _, key = source[len('s3://'):].partition('/')
+    return bucket, key
+
+
+@contextmanager
+def open_source(source):
+    # 작업 원본 이미지 열기 (S3 원본은 일정 크기까지만 메모리에 두고 넘으면 임시 파일 사용)
+    if not source.startswith('s3://'):
+        with open(source, 'rb') as image_file:
+            yield image_file
+        return
+
+    bucket, key = split_s3_source(source)
+    spool_size = getattr(settings, 'FILE_UPLOAD_MAX_MEMORY_SIZE', 2621440)
+    with tempfile.SpooledTemporaryFile(max_size=spool_size) as image_file:
+        get_s3_client().download_fileobj(bucket, key, image_file)
+        image_file.seek(0)
+        yield image_file
+
+
+def retry_delay(attempts):
+    # 실패할 때마다 두 배씩 늘어나는 재시도 대기 시간(초), ANALYSIS_JOB_RETRY_MAX_DELAY 까지
+    delay = job_setting('ANALYSIS_JOB_RETRY_DELAY', 10) * 2 ** max(attempts - 1, 0)
+    return min(delay, job_setting('ANALYSIS_JOB_RETRY_MAX_DELAY', 300))
+
+
+def claim_next_job():
+    # 조건부 UPDATE 로 pending 작업 하나를 running 으로 가져온다 (여러 워커가 동시에 호출해도 한 곳만 성공)
+    # 재시도 대기 중(next_attempt_at 이 미래)인 작업은 건너뛴다
+    while True:
+        job = AnalysisJob.objects.filter(
+            Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=timezone.now()),
+            status=AnalysisJob.PENDING,
+        ).order_by('id').first()
+        if job is None:
+            return None
+
+        claimed = AnalysisJob.objects.filter(pk=job.pk, status=AnalysisJob.PENDING).update(
+            status=AnalysisJob.RUNNING,
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def recover_stale_jobs():
+    # 워커가 죽어서 running 상태로 남은 작업을 다시 대기열로 돌린다
+    timeout = job_setting('ANALYSIS_JOB_TIMEOUT', 300)
+    max_attempts = job_setting('ANALYSIS_JOB_MAX_ATTEMPTS', 3)
+    stale_before = timezone.now() - timedelta(seconds=timeout)
+
+    stale = AnalysisJob.objects.filter(status=AnalysisJob.RUNNING, started_at__lt=stale_before)
+
+    # 더 시도할 수 없는 작업은 실패 처리하고 원본 이미지를 지운다 (다른 워커가 먼저 처리한 작업은 건너뜀)
+    failed = 0
+    for job in stale.filter(attempts__gte=max_attempts).only('id', 'source'):
+        if AnalysisJob.objects.filter(pk=job.pk, status=AnalysisJob.RUNNING).update(
+            status=AnalysisJob.FAILED,
+            error="작업 시간이 초과되었습니다.",
+            finished_at=timezone.now(),
+        ):
+            remove_source(job)
+            failed += 1
+
+    retried = stale.update(status=AnalysisJob.PENDING, next_attempt_at=None)
+    if failed or retried:
+        logger.warning("멈춘 분석 작업 처리: 재시도 %d개, 실패 %d개", retried, failed)
+    return retried
+
+
+def run_job(job):
+    max_attempts = job_setting('ANALYSIS_JOB_MAX_ATTEMPTS', 3)
+
+    try:
+        with open_source(job.source) as image_file:
+            run_analysis(image_file, user_analysis_result=job.uar_id)
+    except Exception as e:
+        logger.exception("분석 작업 실패 (job=%s, attempts=%s)", job.pk, job.attempts)
+        job.error = str(e)
+        if job.attempts < max_attempts:
+            # 외부 API 장애가 계속되어도 바로 다시 가져가지 않도록 대기 후 재시도
+            job.status = AnalysisJob.PENDING
+            job.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+        else:
+            job.status = AnalysisJob.FAILED
+            job.finished_at = timezone.now()
+            remove_source(job)
+        job.save(update_fields=['status', 'error', 'finished_at', 'next_attempt_at'])
+        return False
+
+    job.status = AnalysisJob.DONE
+    job.error = None
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    remove_source(job)
+    return True
+
+
+def remove_source(job):
+    if job.source.startswith('s3://'):
+        bucket, key = split_s3_source(job.source)
+        try:
+            get_s3_client().delete_object(Bucket=bucket, Key=key)
+        except Exception as e:
+            logger.warning("S3 원본 삭제 실패 (%s): %s", job.source, e)
+        return
+
+    try:
+        os.remove(job.source)
+    except OSError:
+        pass
+
+
+def run_pending_jobs(limit=None):
+    # 대기 중인 작업을 현재 스레드에서 처리하고 처리한 개수 반환
+    processed = 0
+    recover_stale_jobs()
+    expire_direct_uploads()
+    while limit is None or processed < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
+
+
+class AnalysisWorkerPool:
+    """
+    DB 작업 큐를 폴링하는 로컬 워커 스레드 묶음.
+    새 작업이 등록되면 wake() 로 바로 깨우고, 그 외에는 poll_interval 마다 확인한다.
+    """
+
+    def __init__(self, workers=2, poll_interval=2.0):
+        self.pid = os.getpid()
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._event = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'analysis-worker-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def wake(self):
+        self._event.set()
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        self._event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            close_old_connections()
+            try:
+                recover_stale_jobs()
+                expire_direct_uploads_periodically()
+                job = claim_next_job()
+                if job is not None:
+                    run_job(job)
+                    continue
+            except Exception:
+                logger.exception("분석 워커 오류")
+            finally:
+                close_old_connections()
+
+            self._event.wait(self.poll_interval)
+            self._event.clear()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def start_local_workers():
+    # 웹 프로세스 안에서 워커 스레드를 한 번만 띄운다
+    # (fork 전에 만든 풀은 스레드가 자식 프로세스로 복사되지 않으므로 프로세스마다 새로 띄움)
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = AnalysisWorkerPool(
+                workers=local_worker_count(),
+                poll_interval=job_setting('ANALYSIS_JOB_POLL_INTERVAL', 2.0),
+            )
+            _pool.start()
+    return _pool
+
+
+def local_worker_count():
+    # 웹 프로세스 안에서 띄울 워커 수 (0 이면 run_analysis_workers 프로세스가 처리)
+    return job_setting('ANALYSIS_JOB_LOCAL_WORKERS', 2)
+
+
+def wake_local_workers():
+    # ANALYSIS_JOB_LOCAL_WORKERS 가 0 이면 run_analysis_workers 프로세스가 처리하므로 아무것도 하지 않는다
+    if local_worker_count() > 0:
+        start_local_workers().wake()
+
+
+def start_workers_on_startup():
+    """
+    ANALYSIS_JOB_START_ON_STARTUP 이 켜져 있으면 앱을 불러올 때 워커를 띄운다 (재시작 전에 남은 pending 작업 처리).
+    명령/스크립트 프로세스에서 워커가 뜨지 않도록 서버 실행 환경에서만 켠다.
+    gunicorn --preload 는 fork 전에 앱을 불러오므로 끄고, post_fork 훅에서 start_local_workers() 를 호출한다.
+    """
+    if job_setting('ANALYSIS_JOB_START_ON_STARTUP', False) and local_worker_count() > 0:
+        start_local_workers()
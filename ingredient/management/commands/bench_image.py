@@ -0,0 +1,108 @@
+import io
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageDraw
+
+from ingredient.image import AnalysisImage
+from ingredient.utils import draw_boxes_on_image, ocr_fields, resize_image_width
+
+
+def sample_ocr_result(width, height, count=60):
+    # 라벨 사진에서 나오는 정도의 박스 개수를 흉내 낸 OCR 결과
+    fields = []
+    for i in range(count):
+        x, y = (i % 6) * width // 6, (i // 6) * height // 10
+        vertices = [{'x': x, 'y': y}, {'x': x + width // 7, 'y': y}, {'x': x + width // 7, 'y': y + 20}, {'x': x, 'y': y + 20}]
+        fields.append({'inferText': f'성분{i}', 'boundingPoly': {'vertices': vertices}})
+    return {'images': [{'fields': fields}]}
+
+
+def sample_image(width=4032, height=3024):
+    # 휴대폰 카메라 크기의 JPEG
+    img = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(img)
+    for y in range(0, height, 40):
+        draw.line((0, y, width, y), fill=(y % 255, 80, 160), width=3)
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def run_legacy(data, ocr_result):
+    resized = resize_image_width(io.BytesIO(data), 1024)
+    payload = resized.getvalue()
+    annotated, texts = draw_boxes_on_image(resized, ocr_result)
+    return payload, annotated
+
+
+def run_pipeline(data, ocr_result):
+    image = AnalysisImage(io.BytesIO(data), 1024)
+    payload = image.ocr_payload()['data']
+    annotated = image.annotated([field['vertices'] for field in ocr_fields(ocr_result)])
+    return payload, annotated
+
+
+VARIANTS = {'legacy': run_legacy, 'pipeline': run_pipeline}
+
+
+class Command(BaseCommand):
+    help = "리사이즈 + 박스 표시 과정의 스캔당 CPU 시간과 최대 메모리(RSS)를 기존 방식과 비교합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('image', nargs='?', help="측정할 이미지 (없으면 4032x3024 JPEG 생성)")
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--variant', choices=list(VARIANTS), help="(내부용) 한 가지 방식만 측정")
+
+    def handle(self, *args, **options):
+        if options['variant']:
+            self.measure(options)
+            return
+
+        # 최대 RSS 는 프로세스 단위로만 잴 수 있으므로 방식마다 별도 프로세스에서 측정
+        results = {}
+        for variant in VARIANTS:
+            command = [sys.executable, sys.argv[0], 'bench_image', '--variant', variant, '--repeat', str(options['repeat'])]
+            if options['image']:
+                command.insert(3, options['image'])
+            output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+            results[variant] = json.loads(output.strip().splitlines()[-1])
+
+        for variant, result in results.items():
+            self.stdout.write(
+                f"{variant:>8}: 스캔당 CPU {result['cpu_ms']:.1f}ms, "
+                f"최대 RSS {result['peak_rss_mb']:.1f}MB (시작 시 {result['base_rss_mb']:.1f}MB), "
+                f"OCR 전송 {result['payload_bytes']}B"
+            )
+
+    def measure(self, options):
+        if options['image']:
+            with open(options['image'], 'rb') as f:
+                data = f.read()
+        else:
+            data = sample_image()
+
+        with Image.open(io.BytesIO(data)) as img:
+            width = 1024
+            height = int(1024 * img.height / img.width)
+        ocr_result = sample_ocr_result(width, height)
+
+        run = VARIANTS[options['variant']]
+        base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        started = time.process_time()
+        for _ in range(options['repeat']):
+            payload, annotated = run(data, ocr_result)
+        cpu_ms = (time.process_time() - started) * 1000 / options['repeat']
+
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        self.stdout.write(json.dumps({
+            'cpu_ms': cpu_ms,
+            'base_rss_mb': base_rss / 1024,
+            'peak_rss_mb': peak_rss / 1024,
+            'payload_bytes': len(payload),
+        }))
@@ -0,0 +1,129 @@
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ingredient.index import get_index
+from ingredient.utils import ocr_fields, remote_natural_language_processing
+
+# 저장소에 포함된 익명 샘플 (의약품 라벨의 OCR 단어 형식, 제품명/제조사 없이 성분 표기와 흔한 OCR 오타만 담음)
+DEFAULT_SAMPLES = Path(__file__).resolve().parents[2] / 'samples' / 'nlp_samples.jsonl'
+
+
+def load_samples(path):
+    # JSON 배열 또는 JSON Lines 파일
+    # 각 샘플: {"texts": [...], "expected": [...]} 또는 Clova OCR 응답 원문 ({"images": ...})
+    with open(path, encoding='utf-8') as f:
+        content = f.read().strip()
+
+    if content.startswith('['):
+        records = json.loads(content)
+    else:
+        records = [json.loads(line) for line in content.splitlines() if line.strip()]
+
+    samples = []
+    for record in records:
+        if 'images' in record:
+            record = {'ocr': record}
+        if 'ocr' in record:
+            texts = [field['text'] for field in ocr_fields(record['ocr'])]
+        else:
+            texts = record['texts']
+        samples.append({'texts': texts, 'expected': record.get('expected')})
+    return samples
+
+
+def percentile(values, ratio):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+class Command(BaseCommand):
+    help = "기록된 OCR 결과로 로컬 교정기와 NLP 서버의 정확도/지연 시간을 비교합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('samples', nargs='?', default=str(DEFAULT_SAMPLES),
+                            help="기록된 OCR 결과 파일 (JSON 또는 JSON Lines, 없으면 저장소에 포함된 샘플)")
+        parser.add_argument('--backends', default='local,remote', help="비교할 방식 (local, remote)")
+        parser.add_argument('--repeat', type=int, default=1, help="샘플당 반복 횟수")
+
+    def handle(self, *args, **options):
+        samples = load_samples(options['samples'])
+        if not samples:
+            raise CommandError("샘플이 없습니다.")
+
+        index = get_index()
+        started = time.perf_counter()
+        corrector = index.corrector
+        self.stdout.write(f"사전 {len(index)}개, 교정기 생성 {(time.perf_counter() - started) * 1000:.1f}ms")
+
+        backends = {
+            'local': corrector.correct,
+            'remote': remote_natural_language_processing,
+        }
+
+        results = {}
+        for name in options['backends'].split(','):
+            if name not in backends:
+                raise CommandError(f"알 수 없는 방식입니다: {name}")
+            results[name] = self.run_backend(backends[name], samples, index, options['repeat'])
+
+        for name, result in results.items():
+            self.report(name, result, samples, results)
+
+    def run_backend(self, correct, samples, index, repeat):
+        latencies = []
+        matched = []
+        errors = 0
+
+        for sample in samples:
+            ids = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                try:
+                    corrected = correct(sample['texts'])
+                except Exception:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+                ids = {entry['id'] for entry in index.match(corrected)[0]}
+            matched.append(ids)
+
+        return {'latencies': latencies, 'matched': matched, 'errors': errors}
+
+    def report(self, name, result, samples, results):
+        latencies = result['latencies']
+        self.stdout.write(f"\n[{name}] 샘플 {len(samples)}개, 실패 {result['errors']}회")
+        if not latencies:
+            return
+
+        self.stdout.write(
+            f"  지연 시간(ms) 평균 {statistics.mean(latencies):.2f} / "
+            f"p50 {percentile(latencies, 0.5):.2f} / p95 {percentile(latencies, 0.95):.2f}"
+        )
+
+        # 정답이 있으면 정밀도/재현율, 없으면 NLP 서버 결과와의 일치율
+        true_positive = predicted = actual = 0
+        agreement = []
+        index = get_index()
+        remote_matched = results['remote']['matched'] if 'remote' in results else [None] * len(samples)
+        for sample, ids, remote_ids in zip(samples, result['matched'], remote_matched):
+            if ids is None:
+                continue
+            if sample['expected'] is not None:
+                expected = {entry['id'] for entry in index.match(sample['expected'])[0]}
+                true_positive += len(ids & expected)
+                predicted += len(ids)
+                actual += len(expected)
+            elif remote_ids is not None and name != 'remote':
+                union = ids | remote_ids
+                agreement.append(len(ids & remote_ids) / len(union) if union else 1.0)
+
+        if actual or predicted:
+            precision = true_positive / predicted if predicted else 0.0
+            recall = true_positive / actual if actual else 0.0
+            self.stdout.write(f"  정밀도 {precision:.3f} / 재현율 {recall:.3f}")
+        if agreement:
+            self.stdout.write(f"  NLP 서버 결과 일치율(Jaccard) {statistics.mean(agreement):.3f}")
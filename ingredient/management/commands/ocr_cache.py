@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from ingredient.cache import get_ocr_cache
+
+
+class Command(BaseCommand):
+    help = "OCR 결과 캐시 상태를 확인하거나 비웁니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--purge', action='store_true', help="캐시를 모두 삭제")
+
+    def handle(self, *args, **options):
+        cache = get_ocr_cache()
+        if cache is None:
+            self.stdout.write("OCR 캐시가 비활성화되어 있습니다. (OCR_CACHE_ENABLED)")
+            return
+
+        if options['purge']:
+            # 세대 표시 파일이 바뀌므로 실행 중인 서버도 다음 조회 때 메모리 캐시를 비운다
+            removed = cache.purge()
+            self.stdout.write(f"OCR 캐시 파일 {removed}개를 삭제했습니다.")
+            return
+
+        # 적중률은 이 명령 프로세스에서는 항상 0 이므로 디스크 상태만 출력
+        stats = cache.stats()
+        for key in ('disk_items', 'disk_bytes'):
+            self.stdout.write(f"{key}: {stats[key]}")
+        self.stdout.write("적중률은 서버의 /status/ocr-cache/ (관리자) 에서 확인하세요.")
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from ingredient.models import RescoreJob
+from ingredient.rescore import create_rescore_job, run_rescore_job, run_unfinished_jobs
+
+
+class Command(BaseCommand):
+    help = "성분 등급이 바뀐 뒤 저장된 분석 결과의 위험 수준/등급별 개수를 다시 계산합니다. 중단된 작업은 이어서 진행합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ingredient-ids', help="등급이 바뀐 성분 id 목록 (쉼표로 구분). 새 작업을 만든다")
+        parser.add_argument('--all', action='store_true', help="모든 분석 결과를 다시 계산하는 새 작업을 만든다")
+        parser.add_argument('--batch-size', type=int, default=500, help="한 번에 다시 계산할 분석 결과 수")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        if options['ingredient_ids'] or options['all']:
+            ingredient_ids = None
+            if options['ingredient_ids']:
+                ingredient_ids = [int(pk) for pk in options['ingredient_ids'].split(',') if pk.strip()]
+            job = create_rescore_job(ingredient_ids)
+            self.stdout.write(f"재계산 작업 {job.pk} 생성: 대상 {job.total}개")
+            jobs = [run_rescore_job(job, batch_size, self.report)]
+        else:
+            pending = RescoreJob.objects.exclude(status=RescoreJob.DONE).count()
+            self.stdout.write(f"남은 재계산 작업 {pending}개")
+            jobs = run_unfinished_jobs(batch_size, self.report)
+
+        for job in jobs:
+            self.stdout.write(self.style.SUCCESS(f"작업 {job.pk} 완료: {job.processed}개"))
+
+    def report(self, job, rate):
+        percent = job.processed / job.total * 100 if job.total else 100.0
+        remaining = max(job.total - job.processed, 0)
+        eta = f"{remaining / rate:.1f}s" if rate else "-"
+        self.stdout.write(
+            f"[작업 {job.pk}] {job.processed}/{job.total} ({percent:.1f}%), "
+            f"{rate:.0f}개/s, 남은 시간 {eta}, 마지막 분석 번호 {job.last_uar_id}"
+        )
@@ -0,0 +1,35 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from ingredient.jobs import AnalysisWorkerPool, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "DB 작업 큐에 등록된 성분 분석 작업을 처리하는 워커를 실행합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help="워커 스레드 수")
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="대기열 확인 주기(초)")
+        parser.add_argument('--once', action='store_true', help="대기 중인 작업만 처리하고 종료")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            processed = run_pending_jobs()
+            self.stdout.write(f"처리한 작업 {processed}개")
+            return
+
+        pool = AnalysisWorkerPool(workers=options['workers'], poll_interval=options['poll_interval'])
+        pool.start()
+        self.stdout.write(f"분석 워커 {options['workers']}개 실행 중 (종료: Ctrl+C)")
+
+        stopped = []
+        signal.signal(signal.SIGTERM, lambda *args: stopped.append(True))
+        try:
+            while not stopped:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            pool.stop()
@@ -0,0 +1,136 @@
+import unicodedata
+from collections import deque
+
+from .utils import normalize_name
+
+
+class AhoCorasick:
+    """
+    여러 성분명을 한 번에 찾는 Aho-Corasick 오토마톤.
+    검색 시간은 사전 크기와 상관없이 텍스트 길이에 비례한다.
+    """
+
+    def __init__(self, patterns):
+        # patterns: (정규화된 패턴 문자열, 값) 목록
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for pattern, value in patterns:
+            if pattern:
+                self._add(pattern, value)
+        self._build()
+
+    def _add(self, pattern, value):
+        state = 0
+        for ch in pattern:
+            next_state = self.goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][ch] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        self.output[state].append((len(pattern), value))
+
+    def _build(self):
+        # BFS로 실패 링크를 만들고, 실패 링크 쪽 출력을 미리 합쳐둔다
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fail = self.fail[state]
+                while fail and ch not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.goto[fail].get(ch, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def __len__(self):
+        return len(self.goto)
+
+    def scan(self, text):
+        # (시작 위치, 끝 위치, 값) 을 모두 반환 (겹치는 결과 포함)
+        hits = []
+        state = 0
+        for position, ch in enumerate(text):
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            for length, value in self.output[state]:
+                hits.append((position + 1 - length, position + 1, value))
+        return hits
+
+
+def normalize_with_offsets(text):
+    # normalize_name과 같은 규칙으로 정규화하면서, 각 문자의 원본 위치를 함께 기록
+    text = unicodedata.normalize('NFC', text)
+    normalized = []
+    offsets = []
+    for position, ch in enumerate(text):
+        for normalized_ch in normalize_name(ch):
+            normalized.append(normalized_ch)
+            offsets.append(position)
+    return ''.join(normalized), offsets
+
+
+def is_boundary(raw, position):
+    # 원문의 position 위치 글자가 단어 경계인지 (텍스트 끝, 필드 구분자, 공백, 쉼표 등 글자가 아닌 문자)
+    return position < 0 or position >= len(raw) or not raw[position].isalpha()
+
+
+def scan_fields(automaton, fields, separator=' '):
+    """
+    OCR 필드들을 이어 붙인 텍스트를 한 번에 스캔한다.
+    필드 경계에서 나뉜 성분명도 찾을 수 있고, 결과마다 원문 위치와 해당 필드의 박스를 돌려준다.
+    앞뒤가 한글/영문 등 글자로 이어지는 결과는 다른 단어의 일부이므로 제외한다
+    (예: '페녹시에탄올' 속 '에탄올', '니코틴산아미드' 속 '니코틴산').
+    """
+    raw_parts = []
+    normalized_parts = []
+    positions = []  # 정규화된 문자 -> (필드 번호, 이어 붙인 원문에서의 위치)
+    raw_length = 0
+
+    for field_no, field in enumerate(fields):
+        if field_no:
+            raw_parts.append(separator)
+            raw_length += len(separator)
+
+        raw_text = unicodedata.normalize('NFC', field['text'])
+        normalized, offsets = normalize_with_offsets(raw_text)
+        normalized_parts.append(normalized)
+        positions.extend((field_no, raw_length + offset) for offset in offsets)
+
+        raw_parts.append(raw_text)
+        raw_length += len(raw_text)
+
+    raw = ''.join(raw_parts)
+    hits = []
+
+    for start, end, value in automaton.scan(''.join(normalized_parts)):
+        first_field, raw_start = positions[start]
+        last_field, raw_end = positions[end - 1]
+        raw_end += 1
+        if not (is_boundary(raw, raw_start - 1) and is_boundary(raw, raw_end)):
+            continue
+        hits.append({
+            'id': value,
+            'text': raw[raw_start:raw_end],
+            'start': raw_start,
+            'end': raw_end,
+            'fields': list(range(first_field, last_field + 1)),
+            'boxes': [fields[no]['vertices'] for no in range(first_field, last_field + 1)],
+        })
+
+    return hits
+
+
+def drop_nested_hits(hits):
+    # 더 긴 성분명 안에 포함된 짧은 성분명 결과는 제외 (예: 긴 복합 성분명 속 단일 성분명)
+    kept = []
+    for hit in sorted(hits, key=lambda x: (x['start'], -(x['end'] - x['start']))):
+        if kept and hit['end'] <= kept[-1]['end']:
+            continue
+        kept.append(hit)
+    return kept
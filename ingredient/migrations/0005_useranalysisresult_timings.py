@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingredient', '0004_analysisjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useranalysisresult',
+            name='timings',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingredient', '0005_useranalysisresult_timings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useranalysisresult',
+            name='annotated_image',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='useranalysisresult',
+            name='image_key',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='useranalysisresult',
+            name='polygons',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='useranalysisresult',
+            name='image',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:19
+
+from django.db import migrations, models
+
+
+def backfill_snapshot(apps, schema_editor):
+    # 기존 분석 결과의 요약을 성분 결과에서 한 번에 계산
+    UserAnalysisResult = apps.get_model('ingredient', 'UserAnalysisResult')
+    IngredientResult = apps.get_model('ingredient', 'IngredientResult')
+
+    matches = {}
+    rows = IngredientResult.objects.order_by('id').values_list('uar_id_id', 'ingredient_id_id', 'ingredient_id__level')
+    for uar_id, ingredient_id, level in rows.iterator():
+        matches.setdefault(uar_id, []).append((ingredient_id, level))
+
+    batch = []
+    for result in UserAnalysisResult.objects.filter(image__isnull=False).only('id').iterator():
+        levels = [level for _, level in matches.get(result.id, [])]
+        result.level1_count = levels.count('1등급')
+        result.level2_count = levels.count('2등급')
+        result.risk_level = 'high' if result.level1_count else 'middle' if result.level2_count else 'low'
+        result.ingredient_ids = [ingredient_id for ingredient_id, _ in matches.get(result.id, [])]
+        batch.append(result)
+        if len(batch) >= 500:
+            UserAnalysisResult.objects.bulk_update(batch, ['risk_level', 'level1_count', 'level2_count', 'ingredient_ids'])
+            batch = []
+    if batch:
+        UserAnalysisResult.objects.bulk_update(batch, ['risk_level', 'level1_count', 'level2_count', 'ingredient_ids'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingredient', '0006_useranalysisresult_lazy_annotated_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useranalysisresult',
+            name='ingredient_ids',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='useranalysisresult',
+            name='level1_count',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='useranalysisresult',
+            name='level2_count',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='useranalysisresult',
+            name='risk_level',
+            field=models.CharField(blank=True, max_length=10, null=True),
+        ),
+        migrations.RunPython(backfill_snapshot, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:22
+
+import re
+
+from django.db import migrations, models
+
+
+def backfill_severity(apps, schema_editor):
+    # 등급 문자열 종류가 몇 개 안 되므로 종류별로 UPDATE 한 번씩
+    Ingredient = apps.get_model('ingredient', 'Ingredient')
+
+    levels = Ingredient.objects.exclude(level__isnull=True).values_list('level', flat=True).distinct()
+    for level in list(levels):
+        match = re.search(r'(\d+)\s*등급', level)
+        if match:
+            Ingredient.objects.filter(level=level).update(severity=int(match.group(1)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingredient', '0008_rescorejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='severity',
+            field=models.SmallIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_severity, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['severity', 'ingredientKr'], name='ingredient__severit_762a6e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['ingredientKr'], name='ingredient__ingredi_ace9bb_idx'),
+        ),
+    ]
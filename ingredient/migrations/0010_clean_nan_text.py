@@ -0,0 +1,25 @@
+# Generated by Django 5.1.2 on 2026-10-18 20:41
+
+from django.db import migrations
+
+TEXT_FIELDS = ['categoryId', 'effectType', 'ingredientKr', 'ingredient', 'level', 'reason', 'notes']
+
+
+def clean_nan_text(apps, schema_editor):
+    # 예전 엑셀 업로드(pandas)에서 빈 칸이 문자열 'nan' 으로 저장된 값을 빈 값(NULL)으로 바꾼다.
+    # 다음 마이그레이션에서 한글명 'nan' 이 성분 조회 키가 되지 않도록 먼저 실행한다.
+    # 원래 'nan' 이었던 칸을 구분할 수 없으므로 되돌리지 않는다.
+    Ingredient = apps.get_model('ingredient', 'Ingredient')
+    for name in TEXT_FIELDS:
+        Ingredient.objects.filter(**{name: 'nan'}).update(**{name: None})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingredient', '0009_ingredient_severity'),
+    ]
+
+    operations = [
+        migrations.RunPython(clean_nan_text, migrations.RunPython.noop),
+    ]
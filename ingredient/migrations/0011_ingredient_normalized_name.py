@@ -0,0 +1,110 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:23
+
+import unicodedata
+
+from django.db import migrations, models
+
+# 마이그레이션은 앱 코드가 바뀌어도 같은 결과를 내야 하므로 ingredient.utils.normalize_name 을 복사해 둔다
+BRACKET_TABLE = str.maketrans({
+    '[': '(', '{': '(', '〔': '(', '【': '(', '〈': '(', '《': '(', '「': '(', '『': '(',
+    ']': ')', '}': ')', '〕': ')', '】': ')', '〉': ')', '》': ')', '」': ')', '』': ')',
+})
+
+
+def normalize_name(name):
+    if name is None:
+        return ''
+
+    name = unicodedata.normalize('NFKC', str(name))
+    name = name.translate(BRACKET_TABLE)
+    return ''.join(name.split()).casefold()
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """
+    정규화한 한글명이 같은 성분을 먼저 등록된(id가 작은) 성분 하나로 합친다.
+    성분 사전 조회는 이미 먼저 등록된 성분을 사용했으므로 분석 결과는 그 성분을 가리키게 바꾸고,
+    합쳐서 지운 성분은 마이그레이션 출력에 남긴다 (필요하면 다른 한글명으로 다시 등록).
+    """
+    Ingredient = apps.get_model('ingredient', 'Ingredient')
+    IngredientResult = apps.get_model('ingredient', 'IngredientResult')
+    UserAnalysisResult = apps.get_model('ingredient', 'UserAnalysisResult')
+    RescoreJob = apps.get_model('ingredient', 'RescoreJob')
+
+    kept = {}
+    merged = {}  # 지울 성분 id -> 남길 성분 id
+    for ingredient in Ingredient.objects.order_by('id').only('id', 'ingredientKr', 'ingredient', 'level').iterator():
+        key = normalize_name(ingredient.ingredientKr) or None
+        if key is None:
+            continue
+        if key not in kept:
+            kept[key] = ingredient
+            continue
+        first = kept[key]
+        merged[ingredient.id] = first.id
+        print(f"\n  성분 합침: {ingredient.id} {ingredient.ingredientKr} ({ingredient.ingredient}, {ingredient.level})"
+              f" -> {first.id} ({first.ingredient}, {first.level})", end='')
+    if not merged:
+        return
+
+    # 분석 결과의 성분을 남길 성분으로 바꾸고, 한 분석에 같은 성분이 두 번 남으면 하나만 둔다
+    uar_ids = set(IngredientResult.objects.filter(ingredient_id__in=merged).values_list('uar_id', flat=True))
+    for duplicate, first in merged.items():
+        IngredientResult.objects.filter(ingredient_id=duplicate).update(ingredient_id=first)
+    seen = set()
+    repeated = []
+    for result in IngredientResult.objects.filter(uar_id__in=uar_ids).order_by('id').only('id', 'uar_id', 'ingredient_id'):
+        pair = (result.uar_id_id, result.ingredient_id_id)
+        if pair in seen:
+            repeated.append(result.id)
+        seen.add(pair)
+    IngredientResult.objects.filter(pk__in=repeated).delete()
+
+    for user_analysis_result in UserAnalysisResult.objects.filter(pk__in=uar_ids, ingredient_ids__isnull=False):
+        ingredient_ids = [merged.get(pk, pk) for pk in user_analysis_result.ingredient_ids]
+        user_analysis_result.ingredient_ids = list(dict.fromkeys(ingredient_ids))
+        user_analysis_result.save(update_fields=['ingredient_ids'])
+
+    Ingredient.objects.filter(pk__in=merged).delete()
+
+    # 저장된 분석 요약(등급별 개수, 위험 수준)은 rescore_analyses 로 다시 계산
+    if uar_ids:
+        RescoreJob.objects.create(ingredient_ids=sorted(set(merged.values())), total=len(uar_ids))
+
+
+def backfill_normalized_name(apps, schema_editor):
+    Ingredient = apps.get_model('ingredient', 'Ingredient')
+
+    batch = []
+    for ingredient in Ingredient.objects.order_by('id').only('id', 'ingredientKr').iterator():
+        ingredient.normalized_name = normalize_name(ingredient.ingredientKr) or None
+        if ingredient.normalized_name is None:
+            continue
+        batch.append(ingredient)
+        if len(batch) >= 500:
+            Ingredient.objects.bulk_update(batch, ['normalized_name'])
+            batch = []
+    if batch:
+        Ingredient.objects.bulk_update(batch, ['normalized_name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingredient', '0010_clean_nan_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='normalized_name',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True),
+        ),
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+        migrations.RunPython(backfill_normalized_name, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='ingredient',
+            name='normalized_name',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True, unique=True),
+        ),
+    ]
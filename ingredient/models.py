@@ -1,26 +1,148 @@
+import re
+
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .utils import normalize_name
+
 User = get_user_model()
 
+LEVEL_PATTERN = re.compile(r'(\d+)\s*등급')
+
+
+def level_severity(level):
+    # '1등급' -> 1, '2등급' -> 2 (숫자가 작을수록 위험). 등급이 없거나 형식이 다르면 None
+    match = LEVEL_PATTERN.search(level or '')
+    return int(match.group(1)) if match else None
+
+
+def ingredient_key(name):
+    # 성분 사전 조회 키 (normalize_name). 빈 이름은 None
+    return normalize_name(name) or None
+
 
 class Ingredient(models.Model):
     categoryId = models.CharField(max_length=50,null=True, blank=True)
     effectType = models.CharField(max_length=50,null=True, blank=True)
     ingredientKr = models.CharField(max_length=50,null=True, blank=True)
+    normalized_name = models.CharField(max_length=100, null=True, blank=True, unique=True, editable=False)  # ingredientKr 의 조회 키 (저장 시 자동 계산)
     ingredient = models.CharField(max_length=50,null=True, blank=True)
     level = models.CharField(max_length=50,null=True, blank=True)
+    severity = models.SmallIntegerField(null=True, blank=True)  # level 의 숫자 (정렬/위험 성분 집계용, 저장 시 자동 계산)
     reason = models.TextField(null=True,blank=True)
     notes = models.TextField(null=True,blank=True)
 
+    class Meta:
+        indexes = [
+            # 등급순 정렬(성분 사전, 검색)을 인덱스 순서대로 읽기 위함
+            models.Index(fields=['severity', 'ingredientKr']),
+            models.Index(fields=['ingredientKr']),
+        ]
+
+    def validate_unique(self, exclude=None):
+        # normalized_name 은 폼에 없는 필드라 기본 검사에서 빠지므로, 한글명으로 계산한 키를 직접 확인 (관리자 화면 오류 표시)
+        super().validate_unique(exclude)
+        key = ingredient_key(self.ingredientKr)
+        if key is None or (exclude and 'ingredientKr' in exclude):
+            return
+        if Ingredient.objects.filter(normalized_name=key).exclude(pk=self.pk).exists():
+            raise ValidationError({'ingredientKr': "같은 이름의 성분이 이미 있습니다."})
+
+    def save(self, *args, **kwargs):
+        self.severity = level_severity(self.level)
+        self.normalized_name = ingredient_key(self.ingredientKr)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'level' in update_fields:
+                update_fields.add('severity')
+            if 'ingredientKr' in update_fields:
+                update_fields.add('normalized_name')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
 
 class UserAnalysisResult(models.Model):
     user_id = models.ForeignKey(User, on_delete=models.CASCADE)
-    image = models.CharField(max_length=50,null=True, blank=True)
-    elapsed_time = models.IntegerField(null=True, blank=True)
+    image = models.CharField(max_length=255,null=True, blank=True)  # 분석에 사용한 (리사이즈된) 이미지 URL
+    image_key = models.CharField(max_length=255,null=True, blank=True)  # 위 이미지의 S3 key
+    polygons = models.JSONField(null=True, blank=True)  # OCR 박스 좌표 [[[x, y], ...], ...]
+    annotated_image = models.CharField(max_length=255,null=True, blank=True)  # 박스를 그린 이미지 URL (처음 요청할 때 생성)
+    # 분석 요약 (저장 시 계산, 성분 사전이 바뀌면 조회할 때 다시 계산)
+    risk_level = models.CharField(max_length=10, null=True, blank=True)  # low - middle - high
+    level1_count = models.IntegerField(null=True, blank=True)
+    level2_count = models.IntegerField(null=True, blank=True)
+    ingredient_ids = models.JSONField(null=True, blank=True)  # 매칭된 성분 id 목록
+    elapsed_time = models.IntegerField(null=True, blank=True)  # 분석 소요 시간(ms)
+    timings = models.JSONField(null=True, blank=True)  # 단계별 소요 시간(ms)
     created_at = models.DateTimeField(auto_now_add=True)
 
 
 class IngredientResult(models.Model):
     uar_id = models.ForeignKey(UserAnalysisResult, on_delete=models.CASCADE)
-    ingredient_id = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
\ No newline at end of file
+    ingredient_id = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            # 등급이 바뀐 성분을 포함한 분석 결과를 테이블 조회 없이 인덱스만으로 찾기 위함
+            models.Index(fields=['ingredient_id', 'uar_id']),
+        ]
+
+
+class AnalysisJob(models.Model):
+    # 비동기 성분 분석 작업 큐 (별도 브로커 없이 DB 테이블을 큐로 사용)
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'pending'),
+        (RUNNING, 'running'),
+        (DONE, 'done'),
+        (FAILED, 'failed'),
+    ]
+
+    uar_id = models.OneToOneField(UserAnalysisResult, on_delete=models.CASCADE, related_name='job')
+    source = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)  # 실패 후 재시도 가능한 시각
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+
+
+class RescoreJob(models.Model):
+    # 성분 등급 변경 후 저장된 분석 요약 재계산 작업 (last_uar_id 까지 처리됨, 중단되면 이어서 진행)
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    STATUS_CHOICES = [
+        (PENDING, 'pending'),
+        (RUNNING, 'running'),
+        (DONE, 'done'),
+    ]
+
+    ingredient_ids = models.JSONField(null=True, blank=True)  # 등급이 바뀐 성분 (None 이면 전체 재계산)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    total = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)
+    last_uar_id = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+
+class DataVersion(models.Model):
+    # 메모리 사전/캐시의 데이터 버전 (워커 프로세스끼리 공유, 데이터가 바뀌면 증가)
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    previous = models.BigIntegerField(default=0)  # 마지막 증가 직전 버전 (바뀐 부분만 반영할 수 있는지 확인용)
+    updated_at = models.DateTimeField(auto_now=True)
@@ -1,7 +1,8 @@
 import dotenv
-import requests
 import mimetypes
 import os
+from mombo.http import get_upstream
+from .cache import get_ocr_cache
 
 dotenv.load_dotenv()
 CLOVA_OCR_SECRET = os.environ['CLOVA_OCR_SECRET']
@@ -9,14 +10,23 @@ CLOVA_OCR_URL = os.environ['CLOVA_OCR_URL']
 
 
 class OCR:
-    def __init__(self, file):
+    def __init__(self, file, file_name='image.jpg'):
         self.file = file
+        self.file_name = file_name
 
     def scanText(self):
-        # InMemoryUploadedFile 객체에서 파일을 가져옴
-        file_obj = self.file  # InMemoryUploadedFile 객체
-        file_name = 'image.png'  # 원하는 파일 이름 지정
-        file_format = file_name.split('.')[-1]  # 파일 형식 추출
+        # 파일 객체에서 이미지 바이트를 가져옴 (캐시 키 계산과 전송에 같은 바이트 사용)
+        file_obj = self.file.read()
+
+        # 같은 이미지를 이미 인식한 적이 있으면 OCR API 를 호출하지 않음
+        cache = get_ocr_cache()
+        if cache is not None:
+            cached = cache.get(file_obj)
+            if cached is not None:
+                return cached
+
+        file_name = self.file_name
+        file_format = file_name.split('.')[-1].lower()  # 파일 형식 추출
 
         # MIME 타입을 파일 이름으로부터 추론
         mime_type = mimetypes.guess_type(file_name)[0] or 'application/octet-stream'  # 기본 MIME 타입 설정
@@ -35,7 +45,10 @@ class OCR:
         }
 
         # POST 요청 전송
-        response = requests.post(CLOVA_OCR_URL, headers=headers, files=files, data=data)
+        response = get_upstream('clova_ocr').post(CLOVA_OCR_URL, headers=headers, files=files, data=data)
+
+        if cache is not None and response.status_code == 200:
+            cache.set(file_obj, response.text)
 
         # 응답 텍스트 반환
         return response.text
\ No newline at end of file
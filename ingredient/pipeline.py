@@ -0,0 +1,248 @@
+import io
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .cache import get_analysis_cache
+from .imgUpload import S3ImgUploader, public_url
+from .index import get_index
+from .matcher import drop_nested_hits
+from .models import IngredientResult, UserAnalysisResult
+from .ocr import OCR
+from .image import AnalysisImage
+from .render import analysis_image_url, render_in_background
+from .snapshot import analysis_message, snapshot_fields
+from .utils import natural_language_processing, ocr_fields, scale_ocr_result
+
+logger = logging.getLogger(__name__)
+
+
+def correct_texts(ocr_result):
+    # OCR 단어를 교정. 이미 분석한 적 있는 단어 목록이면 캐시된 결과를 그대로 사용
+    texts = [field['text'] for field in ocr_fields(ocr_result)]
+
+    cached = get_analysis_cache().get(texts, get_index().generation)
+    if cached is not None:
+        return texts, cached
+
+    return texts, {'corrected': natural_language_processing(texts), 'ids': None}
+
+
+def match_ingredients(nlp, ocr_result):
+    texts, result = nlp
+    index = get_index()
+
+    if result['ids'] is not None:
+        return [index.get(pk) for pk in result['ids'] if index.get(pk) is not None]
+
+    # 메모리 성분 사전으로 한 번에 매칭 (성분당 DB 조회 없음)
+    matches, missing = index.match(list(set(result['corrected'])))
+    logger.debug("사전에 없는 단어 %d개: %s", len(missing), missing)
+
+    # OCR 필드 경계와 상관없이 원문 전체에서 찾은 성분 추가
+    matched_ids = {match['id'] for match in matches}
+    for hit in drop_nested_hits(index.scan(ocr_fields(ocr_result))):
+        if hit['id'] not in matched_ids:
+            matched_ids.add(hit['id'])
+            matches.append(index.get(hit['id']))
+
+    get_analysis_cache().set(texts, index.generation, result['corrected'], [match['id'] for match in matches])
+    return matches
+
+
+def scan_text(image, payload):
+    # 전송용 이미지로 OCR 후 박스 좌표를 표시용 이미지 크기로 맞춘다
+    ocr_result = OCR(io.BytesIO(payload['data']), 'image.jpg').scanText()
+    return scale_ocr_result(ocr_result, image.size[0] / payload['size'][0])
+
+
+class Stage:
+    # 파이프라인 단계: deps 단계들의 결과를 인자로 받아 실행
+    # inline=True 인 단계(DB 작업)는 스레드 풀이 아니라 호출한 스레드에서 실행
+    # cleanup 은 다른 단계가 실패했을 때 이 단계의 결과를 되돌리는 함수 (S3 업로드 삭제 등)
+    def __init__(self, func, deps=(), inline=False, cleanup=None):
+        self.func = func
+        self.deps = deps
+        self.inline = inline
+        self.cleanup = cleanup
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, round((time.perf_counter() - started) * 1000, 1)
+
+
+def timed_in_pool(func, *args):
+    # 풀 스레드에서 열린 DB 연결(성분 사전 생성 등)을 남기지 않는다
+    try:
+        return timed(func, *args)
+    finally:
+        close_old_connections()
+
+
+def run_stages(stages, executor):
+    """
+    단계들을 의존 관계 순서대로 실행한다.
+    서로 의존하지 않는 단계는 스레드 풀에서 동시에 실행되므로,
+    전체 시간은 각 단계 시간의 합이 아니라 가장 긴 의존 경로에 가까워진다.
+    (결과, 단계별 소요 시간(ms)) 반환
+    """
+    results = {}
+    timings = {}
+    pending = dict(stages)
+    running = {}
+
+    try:
+        while pending or running:
+            ready = [name for name, stage in pending.items() if all(dep in results for dep in stage.deps)]
+            inline = []
+            for name in ready:
+                stage = pending.pop(name)
+                args = [results[dep] for dep in stage.deps]
+                if stage.inline:
+                    inline.append((name, stage, args))
+                else:
+                    running[executor.submit(timed_in_pool, stage.func, *args)] = name
+
+            if inline:
+                for name, stage, args in inline:
+                    results[name], timings[name] = timed(stage.func, *args)
+                continue
+
+            if not running:
+                raise ValueError(f"실행할 수 없는 단계가 있습니다: {list(pending)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name], timings[name] = future.result()
+    except BaseException:
+        # 이미 실행 중인 단계는 취소할 수 없으므로 끝나기를 기다렸다가 결과를 함께 정리한다
+        for future in running:
+            future.cancel()
+        for future, name in running.items():
+            if future.cancelled():
+                continue
+            try:
+                results[name], timings[name] = future.result()
+            except Exception:
+                pass
+        cleanup_stages(stages, results)
+        raise
+
+    return results, timings
+
+
+def cleanup_stages(stages, results):
+    # 끝난 단계 중 cleanup 이 있는 단계의 결과를 되돌린다 (정리 실패는 기록만 하고 원래 오류를 올림)
+    for name, stage in stages.items():
+        if stage.cleanup is None or name not in results:
+            continue
+        try:
+            stage.cleanup(results[name])
+        except Exception:
+            logger.exception("분석 단계 결과 정리 실패 (%s)", name)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    # 모든 분석 요청이 함께 쓰는 크기 제한 스레드 풀
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'ANALYSIS_PIPELINE_WORKERS', 8),
+                thread_name_prefix='analysis-stage',
+            )
+    return _executor
+
+
+def save_results(user, user_analysis_result, image_key, ocr_result, matches, timings):
+    """
+    분석 결과 저장을 트랜잭션 하나로 처리 (결과 행 생성/갱신 + 성분 결과 bulk_create).
+    결과 행에는 위험 수준/등급별 개수/성분 id 요약을 함께 저장한다.
+    박스를 그린 이미지는 만들지 않고 좌표만 저장 (render.render_annotated_image 에서 필요할 때 그림)
+    """
+    fields = {
+        **snapshot_fields(matches),
+        'image': public_url(image_key),
+        'image_key': image_key,
+        'polygons': [field['vertices'] for field in ocr_fields(ocr_result)],
+        'annotated_image': None,
+        'elapsed_time': int(timings['total']),
+        'timings': timings,
+    }
+
+    with transaction.atomic():
+        if user_analysis_result is None:
+            user_analysis_result = UserAnalysisResult.objects.create(user_id=user, **fields)
+        else:
+            # 작업 재시도 등으로 이전에 저장된 결과가 있으면 교체
+            for name, value in fields.items():
+                setattr(user_analysis_result, name, value)
+            user_analysis_result.save(update_fields=list(fields))
+            IngredientResult.objects.filter(uar_id=user_analysis_result).delete()
+
+        IngredientResult.objects.bulk_create([
+            IngredientResult(uar_id=user_analysis_result, ingredient_id_id=match['id'])
+            for match in matches
+        ])
+
+    return user_analysis_result
+
+
+def run_analysis(image_file, user=None, user_analysis_result=None):
+    """
+    이미지 한 장에 대한 성분 분석 전체 과정.
+
+    resize -> prepare -> ocr -> nlp -> match ---> save
+          \-> upload ----------------------------/
+    DB 쓰기는 마지막 save 에서 트랜잭션 하나로만 한다.
+    OCR/NLP/저장 중 하나라도 실패하면 먼저 올린 이미지는 S3 에서 지운다.
+    user_analysis_result 를 넘기면(작업 모드) 그 결과 행을 채우고, 없으면 새로 만든다.
+    박스를 그린 이미지는 응답 후 백그라운드에서(또는 처음 조회할 때) 만든다.
+    timings 에는 단계별 시간(ms)과 함께 OCR 전송 크기(ocr_bytes)와 폭(ocr_width)을 남긴다.
+    (UserAnalysisResult, 응답 메시지) 반환
+    """
+    started = time.perf_counter()
+
+    # 결과 행은 마지막에 만들므로, 작업 모드가 아니면 분석 번호 대신 공용 폴더에 올린다
+    folder = f'{user_analysis_result.id}' if user_analysis_result is not None else 'analysis'
+
+    # 이미지는 한 번만 디코딩하고, OCR 전송용/업로드용 결과만 각각 인코딩
+    stages = {
+        'resize': Stage(lambda: AnalysisImage(image_file, 1024)),
+        'prepare': Stage(lambda image: image.ocr_payload(), deps=('resize',)),
+        'ocr': Stage(scan_text, deps=('resize', 'prepare')),
+        'upload': Stage(lambda image: S3ImgUploader(image.encode(), image.content_type).upload(folder), deps=('resize',),
+                        cleanup=lambda key: S3ImgUploader(key).delete()),
+        'nlp': Stage(correct_texts, deps=('ocr',)),
+        'match': Stage(match_ingredients, deps=('nlp', 'ocr')),
+    }
+
+    results, timings = run_stages(stages, get_executor())
+
+    timings['total'] = round((time.perf_counter() - started) * 1000, 1)
+    timings['ocr_bytes'] = len(results['prepare']['data'])
+    timings['ocr_width'] = results['prepare']['size'][0]
+
+    try:
+        uar, timings['save'] = timed(
+            save_results, user, user_analysis_result, results['upload'], results['ocr'], results['match'], dict(timings)
+        )
+    except Exception:
+        cleanup_stages(stages, results)
+        raise
+    logger.info("성분 분석 단계별 소요 시간(ms): %s", timings)
+
+    render_in_background(uar.id, results['resize'])
+
+    return uar, analysis_message(results['match'], analysis_image_url(uar))
@@ -0,0 +1,101 @@
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core import signing
+from django.db import close_old_connections
+from django.urls import reverse
+
+from .image import AnalysisImage
+from .imgUpload import S3ImgUploader, bucket_name, get_s3_client, public_url
+from .models import UserAnalysisResult
+
+logger = logging.getLogger(__name__)
+
+_signer = signing.Signer(salt='ingredient.analysis-image')
+
+
+def image_token(user_analysis_result):
+    # 인증 헤더 없이 <img> 로 불러올 수 있도록 분석 번호에 서명한 값
+    return _signer.sign(str(user_analysis_result.pk))
+
+
+def uar_id_from_token(token):
+    # 잘못된 토큰이면 None
+    try:
+        return int(_signer.unsign(token))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def analysis_image_url(user_analysis_result):
+    # 박스를 그린 이미지가 이미 있으면 그 URL, 아니면 처음 요청할 때 그려 주는 API 경로
+    if user_analysis_result.annotated_image:
+        return user_analysis_result.annotated_image
+    if user_analysis_result.polygons is None:
+        # 박스 좌표를 따로 저장하기 전의 분석 결과는 image 가 이미 박스를 그린 이미지
+        return user_analysis_result.image
+    return reverse('ingredient:analysis-image', args=[image_token(user_analysis_result)])
+
+
+def render_annotated_image(user_analysis_result, image=None):
+    """
+    저장된 OCR 박스를 분석 이미지에 그려 S3 에 올리고 URL 반환. 이미 그린 적 있으면 그대로 반환.
+    image(AnalysisImage)가 없으면 S3 에서 분석 이미지를 내려받는다.
+    """
+    if user_analysis_result.annotated_image or user_analysis_result.polygons is None:
+        return analysis_image_url(user_analysis_result)
+
+    if image is None:
+        response = get_s3_client().get_object(Bucket=bucket_name(), Key=user_analysis_result.image_key)
+        image = AnalysisImage(io.BytesIO(response['Body'].read()))
+
+    annotated = image.annotated(user_analysis_result.polygons)
+    key = S3ImgUploader(annotated, image.content_type).upload(f'{user_analysis_result.pk}')
+    url = public_url(key)
+
+    # 동시에 여러 요청이 그렸으면 먼저 저장한 것만 남긴다
+    updated = UserAnalysisResult.objects.filter(
+        pk=user_analysis_result.pk, annotated_image__isnull=True
+    ).update(annotated_image=url)
+    if not updated:
+        S3ImgUploader(key).delete()
+        user_analysis_result.refresh_from_db(fields=['annotated_image'])
+        return user_analysis_result.annotated_image
+
+    user_analysis_result.annotated_image = url
+    return url
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_render_executor():
+    # 이미지 생성 전용 스레드 풀 (미리 그리기가 분석 요청의 파이프라인 스레드를 차지하지 않도록)
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'ANALYSIS_RENDER_WORKERS', 2),
+                thread_name_prefix='analysis-render',
+            )
+    return _executor
+
+
+def render_in_background(uar_id, image):
+    # 응답을 보낸 뒤 이미지 생성 스레드에서 미리 그려 둔다 (실패해도 첫 요청 때 다시 그림)
+    if not getattr(settings, 'ANALYSIS_RENDER_IN_BACKGROUND', True):
+        return None
+
+    def render():
+        try:
+            render_annotated_image(UserAnalysisResult.objects.get(pk=uar_id), image)
+        except Exception:
+            logger.exception("분석 이미지 생성 실패 (uar=%s)", uar_id)
+        finally:
+            close_old_connections()
+
+    return get_render_executor().submit(render)
@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import IngredientResult, RescoreJob, UserAnalysisResult
+
+logger = logging.getLogger(__name__)
+
+
+def affected_analyses(ingredient_ids, after=0):
+    # 바뀐 성분을 포함한 분석 결과 id (오름차순). ingredient_ids 가 None 이면 전체
+    if ingredient_ids is None:
+        queryset = UserAnalysisResult.objects.filter(pk__gt=after, ingredient_ids__isnull=False)
+        return queryset.order_by('pk').values_list('pk', flat=True)
+
+    # (ingredient_id, uar_id) 인덱스만 읽는다
+    queryset = IngredientResult.objects.filter(ingredient_id__in=ingredient_ids, uar_id__gt=after)
+    return queryset.order_by('uar_id').values_list('uar_id', flat=True).distinct()
+
+
+def create_rescore_job(ingredient_ids=None):
+    if ingredient_ids is not None:
+        ingredient_ids = sorted(set(ingredient_ids))
+    return RescoreJob.objects.create(
+        ingredient_ids=ingredient_ids,
+        total=affected_analyses(ingredient_ids).count(),
+    )
+
+
+def level_count(severity):
+    counts = (
+        IngredientResult.objects
+        .filter(uar_id=OuterRef('pk'), ingredient_id__severity=severity)
+        .values('uar_id')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def rescore_batch(uar_ids):
+    """
+    분석 결과 묶음의 등급별 개수와 위험 수준을 UPDATE 두 번으로 다시 계산 (행마다 파이썬 처리 없음).
+    성분 id 목록은 등급 변경과 상관없으므로 그대로 둔다.
+    """
+    results = UserAnalysisResult.objects.filter(pk__in=uar_ids)
+    results.update(level1_count=level_count(1), level2_count=level_count(2))
+    results.update(risk_level=Case(
+        When(level1_count__gt=0, then=Value('high')),
+        When(level2_count__gt=0, then=Value('middle')),
+        default=Value('low'),
+    ))
+
+
+def run_rescore_job(job, batch_size=500, progress=None):
+    """
+    last_uar_id 다음부터 batch_size 개씩 재계산한다.
+    묶음마다 재계산과 진행 위치 저장을 한 트랜잭션으로 처리하므로, 중간에 멈춰도 다시 실행하면 이어서 진행한다.
+    progress(job, rate) 는 묶음마다 호출된다 (rate: 초당 처리한 분석 결과 수)
+    """
+    RescoreJob.objects.filter(pk=job.pk).update(status=RescoreJob.RUNNING)
+    job.status = RescoreJob.RUNNING
+
+    started = time.perf_counter()
+    processed_at_start = job.processed
+
+    while True:
+        uar_ids = list(affected_analyses(job.ingredient_ids, after=job.last_uar_id)[:batch_size])
+        if not uar_ids:
+            break
+
+        with transaction.atomic():
+            rescore_batch(uar_ids)
+            RescoreJob.objects.filter(pk=job.pk).update(
+                last_uar_id=uar_ids[-1],
+                processed=F('processed') + len(uar_ids),
+            )
+        job.last_uar_id = uar_ids[-1]
+        job.processed += len(uar_ids)
+
+        if progress is not None:
+            elapsed = time.perf_counter() - started
+            progress(job, (job.processed - processed_at_start) / elapsed if elapsed else 0.0)
+
+    job.status = RescoreJob.DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at', 'updated_at'])
+    logger.info("분석 요약 재계산 완료 (job=%s, %d개)", job.pk, job.processed)
+    return job
+
+
+def run_unfinished_jobs(batch_size=500, progress=None):
+    # 대기 중이거나 중단된 작업을 만든 순서대로 이어서 처리
+    jobs = RescoreJob.objects.exclude(status=RescoreJob.DONE).order_by('pk')
+    return [run_rescore_job(job, batch_size, progress) for job in jobs]
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_rescore_executor():
+    # 재계산 전용 스레드 풀 (오래 걸리는 재계산이 분석 요청의 파이프라인 스레드를 차지하지 않도록)
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'RESCORE_WORKERS', 1),
+                thread_name_prefix='rescore',
+            )
+    return _executor
+
+
+def start_rescore_job(job):
+    # 요청을 막지 않도록 재계산 스레드에서 실행 (프로세스가 중간에 끝나면 rescore_analyses 명령으로 이어서)
+    if not getattr(settings, 'RESCORE_IN_BACKGROUND', True):
+        return None
+
+    def run():
+        try:
+            run_rescore_job(job)
+        except Exception:
+            logger.exception("분석 요약 재계산 실패 (job=%s)", job.pk)
+        finally:
+            close_old_connections()
+
+    return get_rescore_executor().submit(run)
@@ -0,0 +1,182 @@
+from django.conf import settings
+
+from .corrector import edit_distance
+from .hangul import chosung, decompose, is_chosung_only
+from .utils import normalize_name
+
+
+def grams(text):
+    # 한 글자, 두 글자 조각 (검색어 길이에 따라 골라 쓴다)
+    return {text[i:i + n] for n in (1, 2) for i in range(len(text) - n + 1)}
+
+
+def query_grams(text):
+    # 검색어는 두 글자 조각만 (한 글자 검색어는 그 글자 자체)
+    if len(text) < 2:
+        return {text}
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class NameSearchIndex:
+    """
+    성분명 역색인. 정규화한 한글명/영문명으로 세 가지 조각 목록을 만든다.
+    - 음절: 부분 문자열 검색 ('피린' -> 아스피린)
+    - 초성: 초성만 입력한 검색 ('ㅇㅅㅍㄹ' -> 아스피린)
+    - 자모: 오타 검색 ('아스피른' -> 아스피린, 자모 편집 거리)
+    조각 -> 성분 id 집합(frozenset)은 만든 뒤 바꾸지 않으므로, 갱신할 때는 바뀐 조각만 새 집합으로 교체한 복사본을 만든다.
+    """
+
+    def __init__(self, names=()):
+        # names: (ingredient id, 이름 목록)
+        self.keys = {}       # ingredient id -> [(정규화된 이름, 초성, 자모), ...]
+        self.syllables = {}  # 조각 -> ingredient id 집합
+        self.chosungs = {}
+        self.jamos = {}
+
+        postings = {'syllables': {}, 'chosungs': {}, 'jamos': {}}
+        for pk, pk_names in names:
+            self._add(pk, pk_names, postings)
+        for attr, grams_by_key in postings.items():
+            setattr(self, attr, {gram: frozenset(ids) for gram, ids in grams_by_key.items()})
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _add(self, pk, names, postings):
+        keys = []
+        for name in names:
+            key = normalize_name(name)
+            if key and all(key != existing[0] for existing in keys):
+                keys.append((key, chosung(key), decompose(key)))
+        if not keys:
+            return
+
+        self.keys[pk] = keys
+        for key, cho, jamo in keys:
+            for attr, text in (('syllables', key), ('chosungs', cho), ('jamos', jamo)):
+                for gram in grams(text):
+                    postings[attr].setdefault(gram, set()).add(pk)
+
+    def updated(self, names, removed=()):
+        """
+        names 의 성분을 새 이름으로 다시 색인하고 removed 의 성분을 뺀 복사본 반환 (나머지 조각은 공유).
+        """
+        index = NameSearchIndex()
+        index.keys = dict(self.keys)
+
+        changed = {attr: {} for attr in ('syllables', 'chosungs', 'jamos')}
+        current = {attr: getattr(self, attr) for attr in changed}
+
+        def touch(attr, gram):
+            if gram not in changed[attr]:
+                changed[attr][gram] = set(current[attr].get(gram, ()))
+            return changed[attr][gram]
+
+        pks = {pk for pk, _ in names} | set(removed)
+        for pk in pks:
+            for key, cho, jamo in index.keys.pop(pk, ()):
+                for attr, text in (('syllables', key), ('chosungs', cho), ('jamos', jamo)):
+                    for gram in grams(text):
+                        touch(attr, gram).discard(pk)
+
+        added = {attr: {} for attr in changed}
+        for pk, pk_names in names:
+            if pk not in removed:
+                index._add(pk, pk_names, added)
+        for attr, grams_by_key in added.items():
+            for gram, ids in grams_by_key.items():
+                touch(attr, gram).update(ids)
+
+        for attr, grams_by_key in changed.items():
+            postings = dict(current[attr])
+            for gram, ids in grams_by_key.items():
+                if ids:
+                    postings[gram] = frozenset(ids)
+                else:
+                    postings.pop(gram, None)
+            setattr(index, attr, postings)
+        return index
+
+    def _candidates(self, postings, text):
+        # 검색어의 조각이 모두 들어 있는 성분 (작은 집합부터 교집합)
+        sets = sorted((postings.get(gram, frozenset()) for gram in query_grams(text)), key=len)
+        if not sets or not sets[0]:
+            return set()
+        result = set(sets[0])
+        for ids in sets[1:]:
+            result &= ids
+            if not result:
+                break
+        return result
+
+    def find(self, keyword, max_distance=2):
+        """
+        keyword 와 맞는 성분 id 목록.
+        초성만 입력했으면 초성 부분 문자열, 아니면 이름 부분 문자열로 찾고,
+        부분 문자열로 하나도 못 찾으면 자모 편집 거리 max_distance 이하인 이름을 가까운 순으로 반환한다.
+        """
+        # 초성 검색어는 정규화(NFKC)하면 호환 자모가 조합형 자모로 바뀌므로 공백만 지운다
+        initials = ''.join(str(keyword).split())
+        if is_chosung_only(initials):
+            candidates = self._candidates(self.chosungs, initials)
+            return self._ranked(candidates, initials, 1)
+
+        key = normalize_name(keyword)
+        if not key:
+            return []
+
+        matched = self._ranked(self._candidates(self.syllables, key), key, 0)
+        if matched:
+            return matched
+        return [pk for pk, _ in self.similar(key, max_distance)]
+
+    def _ranked(self, candidates, text, position):
+        """
+        이름(position: 0 정규화된 이름, 1 초성)에 text 가 들어 있는 성분을 관련도순으로.
+        이름과 같은 성분, 이름이 text 로 시작하는 성분, 중간에 들어 있는 성분 순이고, 그 안에서는 짧은 이름, id 순.
+        """
+        ranks = []
+        for pk in candidates:
+            keys = [names[position] for names in self.keys[pk] if text in names[position]]
+            if keys:
+                ranks.append((min((0 if name == text else 1 if name.startswith(text) else 2, len(name)) for name in keys), pk))
+        return [pk for _, pk in sorted(ranks)]
+
+    def similar(self, keyword, max_distance=2):
+        # (ingredient id, 거리) 목록. 짧은 검색어는 허용 거리를 줄인다 (자모 4개당 1)
+        jamo = decompose(normalize_name(keyword))
+        max_distance = min(max_distance, len(jamo) // 4)
+        if max_distance == 0:
+            return []
+
+        # 편집 한 번에 두 글자 조각은 최대 두 개까지 달라지므로, 남은 조각 수로 후보를 먼저 거른다
+        query = query_grams(jamo)
+        required = len(query) - 2 * max_distance
+        if required <= 0:
+            return []
+        counts = {}
+        for gram in query:
+            for pk in self.jamos.get(gram, ()):
+                counts[pk] = counts.get(pk, 0) + 1
+
+        results = []
+        for pk, count in counts.items():
+            if count < required:
+                continue
+            distance = min(edit_distance(jamo, name_jamo, max_distance) for _, _, name_jamo in self.keys[pk])
+            if distance <= max_distance:
+                results.append((pk, distance))
+        results.sort(key=lambda item: (item[1], item[0]))
+        return results
+
+
+def search_ingredients(keyword):
+    """
+    성분명 검색. 역색인으로 찾은 id 로 조회해서 등급순((severity, ingredientKr) 인덱스)으로 정렬한다.
+    id 목록이 SQL 변수 개수 제한을 넘지 않도록 관련도순 상위 SEARCH_INGREDIENT_MAX_MATCHES 개만 사용한다.
+    """
+    from .index import get_index
+    from .models import Ingredient
+
+    ids = get_index().search.find(keyword)[:getattr(settings, 'SEARCH_INGREDIENT_MAX_MATCHES', 500)]
+    return Ingredient.objects.filter(pk__in=ids).order_by('severity', 'ingredientKr', 'pk')
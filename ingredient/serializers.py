@@ -5,13 +5,13 @@ from .models import Ingredient, UserAnalysisResult, IngredientResult
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
-        fields = '__all__'
+        exclude = ['severity', 'normalized_name']
 
 
 class UserAnalysisResultSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserAnalysisResult
-        fields = ['id','user_id', 'image', 'elapsed_time', 'created_at']
+        fields = ['id','user_id', 'image', 'risk_level', 'level1_count', 'level2_count', 'elapsed_time', 'created_at']
 
 
 class IngredientResultSerializer(serializers.ModelSerializer):
@@ -0,0 +1,82 @@
+from .index import get_index
+from .models import IngredientResult, UserAnalysisResult
+
+SNAPSHOT_FIELDS = ['risk_level', 'level1_count', 'level2_count', 'ingredient_ids']
+
+
+# 위험 성분으로 집계하는 severity -> 응답의 등급 이름
+RISK_LEVELS = {1: "1등급", 2: "2등급"}
+
+
+def risk_level(level_counts):
+    # 위험 수준 결정
+    if level_counts["1등급"] > 0:
+        return "high"
+    elif level_counts["2등급"] > 0:
+        return "middle"
+    return "low"
+
+
+def level_counts(matches):
+    counts = dict.fromkeys(RISK_LEVELS.values(), 0)
+    for match in matches:
+        if match['severity'] in RISK_LEVELS:
+            counts[RISK_LEVELS[match['severity']]] += 1
+    return counts
+
+
+def severity_key(match):
+    # 등급이 없는 성분은 맨 뒤로
+    return (match['severity'] is None, match['severity'] or 0)
+
+
+def analysis_message(matches, image_url):
+    counts = level_counts(matches)
+    sorted_ingredients = [match['data'] for match in sorted(matches, key=severity_key)]
+
+    return {
+        "riskLevel": risk_level(counts),
+        "analysisImage": image_url,
+        "riskIngredientCount": {
+            'total': counts["1등급"] + counts["2등급"],
+            '1등급': counts["1등급"],
+            '2등급': counts["2등급"],
+        },
+        "ingredientAnalysis": sorted_ingredients
+    }
+
+
+def snapshot_fields(matches):
+    # UserAnalysisResult 에 함께 저장하는 분석 요약 (상세/목록 조회 시 다시 계산하지 않음)
+    counts = level_counts(matches)
+    return {
+        'risk_level': risk_level(counts),
+        'level1_count': counts["1등급"],
+        'level2_count': counts["2등급"],
+        'ingredient_ids': [match['id'] for match in matches],
+    }
+
+
+def snapshot_message(user_analysis_result, image_url):
+    """
+    저장된 성분 id 목록과 메모리 성분 사전으로 분석 결과 응답을 만든다 (성분 조회 쿼리 없음).
+    사전이 바뀌어(등급 수정, 성분 삭제) 저장된 요약과 달라졌으면 그 자리에서 다시 저장한다.
+    """
+    ingredient_ids = user_analysis_result.ingredient_ids
+    if ingredient_ids is None:
+        # 요약을 저장하기 전의 분석 결과
+        ingredient_ids = list(
+            IngredientResult.objects.filter(uar_id=user_analysis_result)
+            .order_by('id').values_list('ingredient_id', flat=True)
+        )
+
+    index = get_index()
+    matches = [index.get(pk) for pk in ingredient_ids if index.get(pk) is not None]
+
+    fields = snapshot_fields(matches)
+    if any(getattr(user_analysis_result, name) != value for name, value in fields.items()):
+        UserAnalysisResult.objects.filter(pk=user_analysis_result.pk).update(**fields)
+        for name, value in fields.items():
+            setattr(user_analysis_result, name, value)
+
+    return analysis_message(matches, image_url)
@@ -1,3 +1,1236 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+from datetime import timedelta
+from importlib import import_module
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import requests
+from django.apps import apps as django_apps
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import F
+from django.forms import modelform_factory
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from openpyxl import Workbook
+from PIL import Image, ImageDraw
+from rest_framework.test import APIClient
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from .cache import OCRCache
+from .corrector import SymSpellCorrector
+from .image import AnalysisImage, decode_size
+from .importer import import_rows
+from . import imgUpload
+from .imgUpload import (
+    TRANSFER_CONFIG, FakeS3Client, S3ImgUploader, bucket_name, get_s3_client, override_s3_client, presigned_upload, public_url,
+)
+from .jobs import (
+    claim_next_job, expire_direct_uploads, recover_stale_jobs, run_job, run_pending_jobs, start_workers_on_startup,
+)
+from .index import DICTIONARY_VERSION, dictionary_version, get_index
+from .models import AnalysisJob, DataVersion, Ingredient, IngredientResult, RescoreJob, UserAnalysisResult, level_severity
+from .pipeline import correct_texts, match_ingredients, run_analysis, save_results
+from .render import analysis_image_url, image_token
+from .rescore import create_rescore_job, run_rescore_job, run_unfinished_jobs, start_rescore_job
+from .search import NameSearchIndex
+from .snapshot import snapshot_message
+from .utils import normalize_name, ocr_fields, scale_ocr_result
+from mombo.http import CircuitBreaker, CircuitOpenError, FakeResponse, FakeSession, override_upstream
+from user.models import User
+
+OCR_RESULT = json.dumps({'images': [{'fields': [
+    {'inferText': '아스피린', 'boundingPoly': {'vertices': [{'x': 10, 'y': 10}, {'x': 90, 'y': 10}, {'x': 90, 'y': 40}, {'x': 10, 'y': 40}]}},
+]}]})
+
+
+def read_status(name):
+    # /proc/self/status 의 메모리 항목 (kB)
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(name + ':'):
+                return int(line.split()[1])
+    return None
+
+
+def reset_peak_rss():
+    # VmHWM(최대 RSS)을 현재 RSS 로 초기화
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+
+
+def jpeg_upload(width, height, name='label.jpg'):
+    # 픽셀 수는 크지만 압축이 잘 되어 파일은 작은 사진 (전체 디코딩하면 width*height*3 byte 필요)
+    img = Image.new('RGB', (width, height), (240, 235, 220))
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=90)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@skipUnless(sys.platform.startswith('linux'), "최대 RSS 측정은 리눅스 /proc 사용")
+@override_settings(OCR_CACHE_ENABLED=False, ANALYSIS_RENDER_IN_BACKGROUND=False)
+class AnalysisUploadMemoryTest(TransactionTestCase):
+    # 큰 사진을 연속으로 올려도 최대 RSS 가 원본 해상도가 아닌 작업 크기에 비례하는지 확인
+
+    RSS_CEILING_KB = 120 * 1024
+
+    def setUp(self):
+        Ingredient.objects.create(ingredientKr='아스피린', ingredient='Aspirin', level='2등급')
+        self.user = User.objects.create(email='memory@test.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        try:
+            reset_peak_rss()
+        except OSError:
+            self.skipTest("/proc/self/clear_refs 를 사용할 수 없습니다.")
+
+    def post_image(self, image):
+        return self.client.post('/ingredient/analysis/', {'image': image}, format='multipart')
+
+    def test_large_photos_peak_rss(self):
+        # 8000x6000 사진은 그대로 디코딩하면 약 144MB
+        uploads = [jpeg_upload(8000, 6000) for _ in range(5)]
+
+        with override_s3_client(), mock.patch('ingredient.ocr.OCR.scanText', return_value=OCR_RESULT):
+            self.post_image(jpeg_upload(1200, 900))  # 스레드 풀, 성분 사전 등 처음 한 번 만드는 것들
+
+            reset_peak_rss()
+            baseline = read_status('VmRSS')
+            for upload in uploads:
+                response = self.post_image(upload)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['riskLevel'], 'middle')
+            peak = read_status('VmHWM')
+
+        self.assertEqual(UserAnalysisResult.objects.count(), 6)
+        self.assertLess(peak - baseline, self.RSS_CEILING_KB)
+
+    @override_settings(ANALYSIS_IMAGE_MAX_PIXELS=10_000_000)
+    def test_rejects_huge_png_before_decoding(self):
+        # PNG 는 줄여서 디코딩할 수 없으므로 헤더의 해상도만 보고 거절
+        img = Image.new('L', (6000, 6000))
+        buffer = io.BytesIO()
+        img.save(buffer, format='PNG')
+        upload = SimpleUploadedFile('label.png', buffer.getvalue(), content_type='image/png')
+        del img, buffer
+
+        reset_peak_rss()
+        baseline = read_status('VmRSS')
+        response = self.post_image(upload)
+        peak = read_status('VmHWM')
+
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(UserAnalysisResult.objects.exists())
+        self.assertLess(peak - baseline, 20 * 1024)
+
+    @override_settings(ANALYSIS_UPLOAD_MAX_BYTES=1024 * 1024)
+    def test_rejects_oversized_upload(self):
+        upload = SimpleUploadedFile('label.jpg', b'\xff' * (2 * 1024 * 1024), content_type='image/jpeg')
+
+        response = self.post_image(upload)
+
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(UserAnalysisResult.objects.exists())
+
+
+class DictionaryQueryCountTest(TestCase):
+    # 성분 사전 페이지와 전체 개수를 쿼리 한 번으로 가져오는지 확인
+
+    def setUp(self):
+        Ingredient.objects.bulk_create([
+            Ingredient(ingredientKr=f'성분{i:02d}', level='1등급' if i % 3 == 0 else '2등급', severity=1 if i % 3 == 0 else 2)
+            for i in range(30)
+        ])
+        self.user = User.objects.create(email='dictionary@test.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_dictionary_by_level(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/ingredient/dictionary/', {'sort': 'level', 'page': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 30)
+        self.assertEqual(response.json()['results']['maxPage'], 2)
+        self.assertEqual(len(response.json()['results']['ingredients']), 10)
+        self.assertTrue(all(item['level'] == '2등급' for item in response.json()['results']['ingredients']))
+
+    def test_dictionary_by_name(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/ingredient/dictionary/', {'sort': 'name', 'order': 'desc'})
+
+        self.assertEqual(response.json()['results']['ingredients'][0]['ingredientKr'], '성분29')
+
+    def test_dictionary_cursor(self):
+        # 커서 방식은 몇 번째 페이지든 쿼리 한 번
+        pages = []
+        url, params = '/ingredient/dictionary/', {'sort': 'name', 'cursor': '', 'page_size': 7}
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json())
+            url, params = response.json()['next'], None
+
+        names = [item['ingredientKr'] for page in pages for item in page['results']['ingredients']]
+        self.assertEqual(names, [f'성분{i:02d}' for i in range(30)])
+        self.assertEqual(len(pages), 5)
+        self.assertIsNone(pages[0]['previous'])
+        self.assertNotIn('count', pages[0])
+
+        # previous 로 앞 페이지를 그대로 돌려받는다
+        with self.assertNumQueries(1):
+            response = self.client.get(pages[2]['previous'])
+        self.assertEqual(response.json()['results'], pages[1]['results'])
+
+    def test_dictionary_cursor_nulls(self):
+        # 이름이 없는 성분도 빠지거나 겹치지 않고 페이지 정렬 순서대로 나온다
+        Ingredient.objects.create(ingredientKr=None, ingredient='Unknown', level='2등급')
+        Ingredient.objects.create(ingredientKr=None, ingredient='Unknown', level='등급 없음')
+
+        ids = []
+        url, params = '/ingredient/dictionary/', {'sort': 'level', 'order': 'desc', 'cursor': '', 'page_size': 4}
+        while url:
+            response = self.client.get(url, params)
+            ids += [item['id'] for item in response.json()['results']['ingredients']]
+            url, params = response.json()['next'], None
+
+        self.assertEqual(ids, list(Ingredient.objects.order_by('-severity', '-ingredientKr', '-id').values_list('id', flat=True)))
+
+    def test_dictionary_invalid_cursor(self):
+        response = self.client.get('/ingredient/dictionary/', {'sort': 'name', 'cursor': 'invalid'})
+        self.assertEqual(response.status_code, 404)
+
+
+class IngredientIndexVersionTest(TestCase):
+    # 다른 프로세스(워커, 분석 작업 프로세스)에서 올린 사전 버전을 보고 인덱스를 다시 만드는지 확인
+
+    def setUp(self):
+        Ingredient.objects.create(ingredientKr='아스피린', ingredient='Aspirin', level='2등급')
+
+    def change_in_other_process(self):
+        # 시그널 없이 성분을 추가하고, 다른 프로세스처럼 DB 의 버전만 올린다
+        Ingredient.objects.bulk_create([Ingredient(ingredientKr='이부프로펜', normalized_name='이부프로펜', level='1등급', severity=1)])
+        DataVersion.objects.filter(name=DICTIONARY_VERSION).update(version=F('version') + 1)
+
+    def test_version_is_shared_through_database(self):
+        index = get_index()
+        self.assertIsNotNone(index.lookup('아스피린'))
+
+        self.change_in_other_process()
+        with override_settings(DATA_VERSION_CHECK_INTERVAL=0):
+            self.assertEqual(dictionary_version(), DataVersion.objects.get(name=DICTIONARY_VERSION).version)
+            self.assertIsNot(get_index(), index)
+            self.assertEqual(get_index().lookup('이부프로펜')['level'], '1등급')
+
+    def test_version_is_rechecked_after_interval(self):
+        index = get_index()
+        self.change_in_other_process()
+
+        # 확인 주기 안에서는 마지막으로 확인한 버전을 그대로 쓴다 (쿼리 없음)
+        with override_settings(DATA_VERSION_CHECK_INTERVAL=60), self.assertNumQueries(0):
+            self.assertIs(get_index(), index)
+
+    def test_rebuilds_after_max_age(self):
+        index = get_index()
+        Ingredient.objects.filter(ingredientKr='아스피린').update(level='1등급')  # 시그널 없이 변경
+
+        with override_settings(INGREDIENT_INDEX_MAX_AGE=0):
+            self.assertEqual(get_index().lookup('아스피린')['level'], '1등급')
+        self.assertIsNot(get_index(), index)
+
+    def test_bump_records_previous_version(self):
+        before = dictionary_version()
+        Ingredient.objects.create(ingredientKr='카페인', level='2등급')
+        self.assertGreater(dictionary_version(), before)
+        self.assertEqual(DataVersion.objects.get(name=DICTIONARY_VERSION).previous, before)
+
+    def test_analysis_cache_follows_index_generation(self):
+        ocr = ocr_result('아스피린')
+        texts, result = correct_texts(ocr)
+        match_ingredients((texts, result), ocr)
+        self.assertIsNotNone(correct_texts(ocr)[1]['ids'])
+
+        # 다른 프로세스에서 올린 사전 버전
+        self.change_in_other_process()
+        with override_settings(DATA_VERSION_CHECK_INTERVAL=0):
+            self.assertIsNone(correct_texts(ocr)[1]['ids'])
+            match_ingredients(correct_texts(ocr), ocr)
+            self.assertIsNotNone(correct_texts(ocr)[1]['ids'])
+
+        # 버전은 같지만 만료로 다시 만든 인덱스
+        with override_settings(INGREDIENT_INDEX_MAX_AGE=0):
+            self.assertIsNone(correct_texts(ocr)[1]['ids'])
+
+
+def ocr_result(*texts):
+    # 필드마다 가로로 한 칸씩 놓인 OCR 응답
+    return {'images': [{'fields': [
+        {'inferText': text, 'boundingPoly': {'vertices': [{'x': i * 100, 'y': 0}, {'x': i * 100 + 90, 'y': 0}, {'x': i * 100 + 90, 'y': 30}, {'x': i * 100, 'y': 30}]}}
+        for i, text in enumerate(texts)
+    ]}]}
+
+
+class IngredientScanTest(TestCase):
+    # OCR 원문 스캔은 단어 경계에서 시작하고 끝나는 성분명만 찾는다
+
+    def setUp(self):
+        Ingredient.objects.create(ingredientKr='에탄올', ingredient='Ethanol', level='2등급')
+        Ingredient.objects.create(ingredientKr='니코틴산', ingredient='Nicotinic Acid', level='2등급')
+        Ingredient.objects.create(ingredientKr='소듐라우릴설페이트', ingredient='Sodium Lauryl Sulfate', level='2등급')
+
+    def scan(self, *texts):
+        return [get_index().get(hit['id'])['data']['ingredientKr'] for hit in get_index().scan(ocr_fields(ocr_result(*texts)))]
+
+    def test_ignores_names_inside_longer_words(self):
+        self.assertEqual(self.scan('정제수, 페녹시에탄올', 'Phenoxyethanol', '니코틴산아미드'), [])
+
+    def test_finds_names_between_separators(self):
+        self.assertEqual(self.scan('정제수,에탄올,글리세린'), ['에탄올'])
+        self.assertEqual(self.scan('(Ethanol)'), ['에탄올'])
+        self.assertEqual(self.scan('니코틴산'), ['니코틴산'])
+
+    def test_finds_multi_word_name_across_fields(self):
+        hits = get_index().scan(ocr_fields(ocr_result('정제수, 소듐 라우릴', '설페이트, 향료')))
+        self.assertEqual(len(hits), 1)
+        self.assertEqual(hits[0]['text'], '소듐 라우릴 설페이트')
+        self.assertEqual(hits[0]['fields'], [0, 1])
+
+    def test_match_ingredients_does_not_raise_risk_for_substrings(self):
+        result = ocr_result('페녹시에탄올', '니코틴산아미드', '소듐', '라우릴설페이트')
+        texts = [field['text'] for field in ocr_fields(result)]
+
+        matches = match_ingredients((texts, {'corrected': texts, 'ids': None}), result)
+
+        self.assertEqual([match['data']['ingredientKr'] for match in matches], ['소듐라우릴설페이트'])
+
+
+class SymSpellCorrectorTest(SimpleTestCase):
+    # 자모 단위 편집 거리로 OCR 오타를 사전의 성분명으로 교정
+
+    def setUp(self):
+        names = ['아스피린', '이부프로펜', '코데인', '철', 'Aspirin', 'Ibuprofen']
+        self.corrector = SymSpellCorrector((normalize_name(name), name) for name in names)
+
+    def test_corrects_jamo_level_typos(self):
+        self.assertEqual(self.corrector.lookup('아스피른'), ('아스피린', 1))  # 모음 하나
+        self.assertEqual(self.corrector.lookup('코대인'), ('코데인', 1))
+        self.assertEqual(self.corrector.lookup('이부프로펜'), ('이부프로펜', 0))
+
+    def test_corrects_latin_typos_and_transpositions(self):
+        self.assertEqual(self.corrector.lookup('aspirn'), ('Aspirin', 1))
+        self.assertEqual(self.corrector.lookup('Ibuprofne'), ('Ibuprofen', 1))  # 인접 문자 자리바꿈
+
+    def test_short_words_have_smaller_edit_budget(self):
+        # 자모 5개 미만은 정확히 같아야 하고, 10개 미만은 거리 1까지만 허용
+        self.assertEqual(self.corrector.lookup('철'), ('철', 0))
+        self.assertIsNone(self.corrector.lookup('칠'))
+        self.assertIsNone(self.corrector.lookup('아스프른'))  # 아스피린과 거리 2
+
+    def test_correct_splits_fields_and_keeps_unknown_words(self):
+        self.assertEqual(self.corrector.correct(['아스피른, 이부프로펜', '정제수']), ['아스피린', '이부프로펜', '정제수'])
+
+
+class BenchNlpCommandTest(TestCase):
+    def test_runs_with_bundled_samples(self):
+        Ingredient.objects.create(ingredientKr='아스피린', ingredient='Aspirin', level='2등급')
+        out = io.StringIO()
+
+        call_command('bench_nlp', '--backends', 'local', stdout=out)
+
+        self.assertIn('[local] 샘플 15개, 실패 0회', out.getvalue())
+
+
+@override_settings(ANALYSIS_JOB_LOCAL_WORKERS=0, ANALYSIS_JOB_MAX_ATTEMPTS=2, ANALYSIS_JOB_RETRY_DELAY=10)
+class AnalysisJobQueueTest(TestCase):
+    # DB 작업 큐: 중복 없이 가져가기, 실패 후 대기 재시도, 멈춘 작업 복구
+
+    def setUp(self):
+        self.user = User.objects.create(email='jobs@test.com')
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def create_job(self, **fields):
+        path = os.path.join(self.directory.name, f'{AnalysisJob.objects.count()}.jpg')
+        with open(path, 'wb') as f:
+            f.write(b'image')
+        uar = UserAnalysisResult.objects.create(user_id=self.user)
+        return AnalysisJob.objects.create(uar_id=uar, source=path, **fields)
+
+    def test_claim_takes_each_job_once(self):
+        first, second = self.create_job(), self.create_job()
+
+        claimed = [claim_next_job(), claim_next_job()]
+
+        self.assertEqual([job.pk for job in claimed], [first.pk, second.pk])
+        self.assertTrue(all(job.status == AnalysisJob.RUNNING and job.attempts == 1 for job in claimed))
+        self.assertIsNone(claim_next_job())
+
+    @mock.patch('ingredient.jobs.run_analysis', side_effect=RuntimeError("OCR 서버 오류"))
+    def test_failed_job_waits_before_retry(self, run_analysis):
+        job = self.create_job()
+
+        with self.assertLogs('ingredient.jobs', 'ERROR'):
+            self.assertFalse(run_job(claim_next_job()))
+        job.refresh_from_db()
+        self.assertEqual(job.status, AnalysisJob.PENDING)
+        self.assertAlmostEqual((job.next_attempt_at - timezone.now()).total_seconds(), 10, delta=2)
+        self.assertIsNone(claim_next_job())  # 대기 시간 전에는 다시 가져가지 않는다
+
+        AnalysisJob.objects.filter(pk=job.pk).update(next_attempt_at=timezone.now())
+        with self.assertLogs('ingredient.jobs', 'ERROR'):
+            self.assertFalse(run_job(claim_next_job()))
+        job.refresh_from_db()
+        self.assertEqual(job.status, AnalysisJob.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertFalse(os.path.exists(job.source))
+
+    def test_recover_stale_jobs(self):
+        long_ago = timezone.now() - timedelta(hours=1)
+        retried = self.create_job(status=AnalysisJob.RUNNING, attempts=1, started_at=long_ago)
+        exhausted = self.create_job(status=AnalysisJob.RUNNING, attempts=2, started_at=long_ago)
+        running = self.create_job(status=AnalysisJob.RUNNING, attempts=1, started_at=timezone.now())
+
+        with self.assertLogs('ingredient.jobs', 'WARNING'):
+            self.assertEqual(recover_stale_jobs(), 1)
+
+        statuses = dict(AnalysisJob.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {
+            retried.pk: AnalysisJob.PENDING,
+            exhausted.pk: AnalysisJob.FAILED,
+            running.pk: AnalysisJob.RUNNING,
+        })
+        self.assertFalse(os.path.exists(exhausted.source))  # 실패 처리된 작업의 원본도 지운다
+        self.assertTrue(os.path.exists(retried.source))
+
+    def test_status_poll_starts_local_workers(self):
+        job = self.create_job()
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with override_settings(ANALYSIS_JOB_LOCAL_WORKERS=1), mock.patch('ingredient.jobs.start_local_workers') as start:
+            response = client.get('/ingredient/analysis/detail', {'uarNo': job.uar_id_id})
+
+        self.assertEqual(response.status_code, 202)
+        start.assert_called_once_with()
+
+    def test_workers_start_on_startup_only_when_enabled(self):
+        with mock.patch('ingredient.jobs.start_local_workers') as start:
+            with override_settings(ANALYSIS_JOB_LOCAL_WORKERS=2, ANALYSIS_JOB_START_ON_STARTUP=False):
+                start_workers_on_startup()
+            start.assert_not_called()
+
+            with override_settings(ANALYSIS_JOB_LOCAL_WORKERS=2, ANALYSIS_JOB_START_ON_STARTUP=True):
+                start_workers_on_startup()
+            start.assert_called_once_with()
+
+    @mock.patch('ingredient.jobs.run_analysis', side_effect=RuntimeError("https://internal.test/ocr 500"))
+    def test_failed_job_hides_internal_error(self, run_analysis):
+        job = self.create_job(attempts=1)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with self.assertLogs('ingredient.jobs', 'ERROR'):
+            run_job(claim_next_job())
+        response = client.get('/ingredient/analysis/detail', {'uarNo': job.uar_id_id})
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, AnalysisJob.FAILED)
+        self.assertIn('internal.test', job.error)  # 관리자 화면용
+        self.assertEqual(response.json()['error'], "이미지 분석에 실패했습니다. 다시 시도해주세요.")
+
+
+@override_settings(OCR_CACHE_ENABLED=False, ANALYSIS_RENDER_IN_BACKGROUND=False)
+class AnalysisPipelineCleanupTest(TransactionTestCase):
+    # 업로드 단계는 OCR 과 동시에 실행되므로, 뒤 단계가 실패하면 올린 이미지를 지워야 한다
+
+    def setUp(self):
+        Ingredient.objects.create(ingredientKr='아스피린', ingredient='Aspirin', level='2등급')
+        self.user = User.objects.create(email='pipeline@test.com')
+
+    def analysis_objects(self, s3):
+        return [key for bucket, key in s3.objects if key.startswith('analysis/')]
+
+    def test_ocr_failure_deletes_uploaded_image(self):
+        with override_s3_client() as s3, mock.patch('ingredient.ocr.OCR.scanText', side_effect=RuntimeError("OCR 실패")):
+            with self.assertRaises(RuntimeError):
+                run_analysis(jpeg_upload(800, 600), user=self.user)
+
+            self.assertEqual(self.analysis_objects(s3), [])
+        self.assertFalse(UserAnalysisResult.objects.exists())
+
+    def test_nlp_failure_deletes_uploaded_image(self):
+        with override_s3_client() as s3, mock.patch('ingredient.ocr.OCR.scanText', return_value=OCR_RESULT), \
+                mock.patch('ingredient.pipeline.natural_language_processing', side_effect=RuntimeError("NLP 실패")):
+            with self.assertRaises(RuntimeError):
+                run_analysis(jpeg_upload(800, 600), user=self.user)
+
+            self.assertEqual(self.analysis_objects(s3), [])
+
+    def test_success_keeps_uploaded_image(self):
+        with override_s3_client() as s3, mock.patch('ingredient.ocr.OCR.scanText', return_value=OCR_RESULT):
+            uar, message = run_analysis(jpeg_upload(800, 600), user=self.user)
+
+            self.assertEqual(self.analysis_objects(s3), [uar.image_key])
+        self.assertEqual(message['riskLevel'], 'middle')
+
+
+class OCRCacheTest(TestCase):
+    # 같은 디렉터리를 쓰는 두 OCRCache 로 서버 프로세스와 관리 명령 프로세스를 흉내낸다
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.image = jpeg_upload(64, 64).read()
+
+    def tearDown(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+        os.rmdir(self.directory)
+
+    def test_purge_from_other_process_drops_memory_entries(self):
+        server = OCRCache(self.directory)
+        server.set(self.image, OCR_RESULT)
+        self.assertEqual(server.get(self.image), OCR_RESULT)
+
+        command = OCRCache(self.directory)
+        self.assertEqual(command.purge(), 1)
+
+        self.assertIsNone(server.get(self.image))
+        self.assertEqual(server.stats()['disk_items'], 0)
+
+        server.set(self.image, OCR_RESULT)
+        self.assertEqual(OCRCache(self.directory).get(self.image), OCR_RESULT)
+
+    def test_finds_entries_written_by_other_worker(self):
+        other_image = jpeg_upload(64, 48).read()
+        for distance in (None, 4):
+            first = OCRCache(self.directory, phash_distance=distance)
+            second = OCRCache(self.directory, phash_distance=distance)
+            first.purge()
+            self.assertIsNone(first.get(self.image))
+            self.assertIsNone(first.get(other_image))
+
+            second.set(self.image, OCR_RESULT)
+            second.set(other_image, '{"images": []}')
+
+            self.assertEqual(first.get(self.image), OCR_RESULT)
+            self.assertEqual(first.get(other_image), '{"images": []}')
+            self.assertEqual(first.stats()['misses'], 2)
+
+    def test_eviction_counts_files_from_all_workers(self):
+        size = len(OCR_RESULT.encode('utf-8'))
+        workers = [OCRCache(self.directory, max_bytes=size * 3) for _ in range(2)]
+        for i in range(6):
+            workers[i % 2].set(jpeg_upload(16 + i * 8, 16).read(), OCR_RESULT)
+
+        self.assertLessEqual(workers[0].stats()['disk_bytes'], size * 3)
+        self.assertEqual(workers[1].stats()['disk_items'], 3)
+        self.assertEqual(
+            [name for name in os.listdir(self.directory) if name.endswith('.tmp')], [])
+
+    def test_status_view_reports_serving_process_stats(self):
+        admin = User.objects.create(email='admin@test.com', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        cache = OCRCache(self.directory)
+        cache.set(self.image, OCR_RESULT)
+        cache.get(self.image)
+        cache.get(jpeg_upload(32, 32).read())
+
+        with mock.patch('mombo.views.get_ocr_cache', return_value=cache):
+            response = client.get('/status/ocr-cache/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['ocrCache']['hits'], 1)
+        self.assertEqual(response.data['ocrCache']['misses'], 1)
+
+        client.force_authenticate(User.objects.create(email='user@test.com'))
+        self.assertEqual(client.get('/status/ocr-cache/').status_code, 403)
+
+
+def responses(*items):
+    # 호출마다 items 를 차례로 돌려주는(예외면 발생시키는) FakeSession handler
+    items = list(items)
+
+    def handler(method, url, **kwargs):
+        item = items.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+    return handler
+
+
+@mock.patch('mombo.http.time.sleep')
+class UpstreamTest(SimpleTestCase):
+    # 재시도/백오프와 회로 차단기 상태 전이 (closed -> open -> half-open -> closed)
+
+    def test_retries_gateway_errors_with_backoff(self, sleep):
+        session = FakeSession(responses(FakeResponse(503), FakeResponse(502), FakeResponse(200, json={'ok': True})))
+        with override_upstream('test', session, retries=2, backoff=0.2) as upstream, \
+                mock.patch('mombo.http.random.uniform', side_effect=lambda low, high: high):
+            response = upstream.get('https://upstream.test/')
+
+        self.assertEqual(response.json(), {'ok': True})
+        self.assertEqual(len(session.calls), 3)
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [0.2, 0.4])
+        self.assertEqual(upstream.stats()['retries'], 2)
+        self.assertEqual(upstream.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_does_not_retry_read_timeout(self, sleep):
+        session = FakeSession(responses(requests.ReadTimeout(), FakeResponse(200)))
+        with override_upstream('test', session, retries=2) as upstream:
+            with self.assertRaises(requests.ReadTimeout):
+                upstream.get('https://upstream.test/')
+
+        self.assertEqual(len(session.calls), 1)
+        sleep.assert_not_called()
+
+    def test_post_retries_only_requests_never_sent(self, sleep):
+        # 보낸 뒤 끊긴 연결이나 502/503/504 는 서버가 이미 처리(과금)했을 수 있으므로 POST 는 재시도하지 않는다
+        for error in (requests.ConnectionError(), FakeResponse(503)):
+            session = FakeSession(responses(error, FakeResponse(200)))
+            with override_upstream('test', session, retries=2) as upstream:
+                try:
+                    upstream.post('https://upstream.test/')
+                except requests.ConnectionError:
+                    pass
+            self.assertEqual(len(session.calls), 1)
+
+        refused = requests.ConnectionError(MaxRetryError(None, '/', NewConnectionError(None, 'refused')))
+        session = FakeSession(responses(requests.ConnectTimeout(), refused, FakeResponse(200)))
+        with override_upstream('test', session, retries=2) as upstream:
+            self.assertEqual(upstream.post('https://upstream.test/').status_code, 200)
+        self.assertEqual(len(session.calls), 3)
+        sleep.assert_called()
+
+    def test_circuit_opens_half_opens_and_closes(self, sleep):
+        session = FakeSession(responses(requests.ConnectionError(), requests.ConnectionError(), FakeResponse(200)))
+        with override_upstream('test', session, retries=0, failure_threshold=2, reset_timeout=30) as upstream:
+            for _ in range(2):
+                with self.assertRaises(requests.ConnectionError):
+                    upstream.get('https://upstream.test/')
+            self.assertEqual(upstream.breaker.state, CircuitBreaker.OPEN)
+
+            # 열려 있는 동안은 요청을 보내지 않는다
+            with self.assertRaises(CircuitOpenError):
+                upstream.get('https://upstream.test/')
+            self.assertEqual(len(session.calls), 2)
+
+            # reset_timeout 이 지나면 시험 요청 하나를 보내고, 성공하면 닫힌다
+            upstream.breaker.opened_at -= 30
+            self.assertEqual(upstream.get('https://upstream.test/').status_code, 200)
+            self.assertEqual(upstream.breaker.state, CircuitBreaker.CLOSED)
+            self.assertEqual(upstream.stats()['rejected'], 1)
+
+    def test_failed_half_open_trial_reopens(self, sleep):
+        session = FakeSession(responses(FakeResponse(500), FakeResponse(500), FakeResponse(200)))
+        with override_upstream('test', session, retries=0, failure_threshold=1, reset_timeout=30) as upstream:
+            upstream.get('https://upstream.test/')
+            upstream.breaker.opened_at -= 30
+            upstream.get('https://upstream.test/')
+            self.assertEqual(upstream.breaker.state, CircuitBreaker.OPEN)
+
+            with self.assertRaises(CircuitOpenError):
+                upstream.get('https://upstream.test/')
+
+    def test_unexpected_error_in_half_open_trial_does_not_stick(self, sleep):
+        session = FakeSession(responses(FakeResponse(500), ValueError("bad response"), FakeResponse(200)))
+        with override_upstream('test', session, retries=0, failure_threshold=1, reset_timeout=30) as upstream:
+            upstream.get('https://upstream.test/')
+            upstream.breaker.opened_at -= 30
+            with self.assertRaises(ValueError):
+                upstream.get('https://upstream.test/')
+            self.assertEqual(upstream.breaker.state, CircuitBreaker.OPEN)
+
+            upstream.breaker.opened_at -= 30
+            self.assertEqual(upstream.get('https://upstream.test/').status_code, 200)
+            self.assertEqual(upstream.breaker.state, CircuitBreaker.CLOSED)
+
+
+@override_settings(OCR_CACHE_ENABLED=False)
+class AnalysisUpstreamFailureTest(TransactionTestCase):
+    # OCR 서버 장애는 500 이 아니라 503 으로 응답하고, 올린 사진은 지운다
+
+    def setUp(self):
+        self.user = User.objects.create(email='upstream@test.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @mock.patch('mombo.http.time.sleep')
+    def test_ocr_outage_returns_503(self, sleep):
+        session = FakeSession(responses(requests.ConnectTimeout(), requests.ConnectTimeout()))
+        with override_s3_client() as s3, override_upstream('clova_ocr', session, retries=1, failure_threshold=1):
+            response = self.client.post('/ingredient/analysis/', {'image': jpeg_upload(800, 600)}, format='multipart')
+            self.assertEqual(response.status_code, 503)
+
+            # 회로가 열린 뒤에는 OCR 서버를 부르지 않고 바로 503
+            response = self.client.post('/ingredient/analysis/', {'image': jpeg_upload(800, 600)}, format='multipart')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(len(session.calls), 2)
+            self.assertEqual([key for bucket, key in s3.objects if key.startswith('analysis/')], [])
+        self.assertFalse(UserAnalysisResult.objects.exists())
+
+
+S3_ENV = {
+    'AWS_ACCESS_KEY_ID': 'test-key',
+    'AWS_SECRET_ACCESS_KEY': 'test-secret',
+    'AWS_STORAGE_BUCKET_NAME': 'test-bucket',
+    'AWS_S3_REGION_NAME': 'ap-northeast-2',
+    'AWS_S3_MAX_POOL_CONNECTIONS': '7',
+}
+
+
+@mock.patch.dict(os.environ, S3_ENV)
+@mock.patch.object(imgUpload, '_s3_client', None)
+class S3ClientTest(SimpleTestCase):
+    # 서명은 로컬에서 계산하므로 실제 boto3 client 로 확인 (네트워크 요청 없음)
+
+    def test_client_is_created_once(self):
+        client = get_s3_client()
+        self.assertIs(get_s3_client(), client)
+        self.assertEqual(client.meta.config.max_pool_connections, 7)
+
+    def test_presigned_post_limits_content_length(self):
+        upload = presigned_upload('direct/1/label', 'image/jpeg', 1024)
+
+        self.assertEqual(upload['method'], 'POST')
+        self.assertEqual(upload['fields']['key'], 'direct/1/label')
+        policy = json.loads(base64.b64decode(upload['fields']['policy']))
+        self.assertIn(['content-length-range', 1, 1024], policy['conditions'])
+        self.assertIn({'Content-Type': 'image/jpeg'}, policy['conditions'])
+
+    def test_presigned_put(self):
+        upload = presigned_upload('direct/1/label', 'image/png', 1024, method='put')
+
+        self.assertEqual(upload['method'], 'PUT')
+        self.assertIn('/direct/1/label?', upload['url'])
+        self.assertIn('Signature', upload['url'])
+        self.assertEqual(upload['headers'], {'Content-Type': 'image/png'})
+
+    def test_upload_streams_with_multipart_config(self):
+        fake = FakeS3Client()
+        s3 = mock.Mock(wraps=fake)
+        with override_s3_client(s3):
+            key = S3ImgUploader(b'jpeg-bytes').upload('analysis')
+
+        kwargs = s3.upload_fileobj.call_args.kwargs
+        self.assertIs(kwargs['Config'], TRANSFER_CONFIG)
+        self.assertEqual(kwargs['ExtraArgs'], {'ContentType': 'image/jpeg'})
+        self.assertTrue(key.startswith('analysis/'))
+        self.assertEqual(fake.objects[('test-bucket', key)][0], b'jpeg-bytes')
+        self.assertEqual(TRANSFER_CONFIG.multipart_threshold, 8 * 1024 * 1024)
+
+
+def image_bytes(img, format='JPEG'):
+    buffer = io.BytesIO()
+    img.save(buffer, format=format)
+    buffer.seek(0)
+    return buffer
+
+
+class AnalysisImageDecodeTest(SimpleTestCase):
+    # 큰 JPEG 는 draft 로 줄여서 한 번만 디코딩하고, 같은 인코딩은 다시 하지 않는다
+
+    def test_large_jpeg_is_decoded_at_reduced_scale(self):
+        with Image.open(image_bytes(Image.new('RGB', (8000, 6000)))) as img:
+            self.assertEqual(decode_size(img, (1600, 1200)), (2000, 1500))
+
+    def test_png_is_decoded_at_full_size(self):
+        with Image.open(image_bytes(Image.new('RGB', (4000, 3000)), 'PNG')) as img:
+            self.assertEqual(decode_size(img, (1600, 1200)), (4000, 3000))
+
+    def test_work_and_display_sizes(self):
+        image = AnalysisImage(image_bytes(Image.new('RGB', (8000, 6000))), target_width=1024, ocr_max_width=1600)
+
+        self.assertEqual(image.size, (1024, 768))
+        self.assertEqual(image._source.size, (1600, 1200))
+        self.assertEqual(image.content_type, 'image/jpeg')
+
+    def test_encodes_each_format_once(self):
+        image = AnalysisImage(image_bytes(Image.new('RGB', (2000, 1500))))
+
+        with mock.patch.object(Image.Image, 'save', autospec=True, side_effect=Image.Image.save) as save:
+            first = image.encode()
+            self.assertIs(image.encode(), first)
+            image.encode('PNG')
+        self.assertEqual(save.call_count, 2)
+
+
+def label_image(line_height, size=(1600, 1200)):
+    # 흰 바탕에 line_height 높이의 검은 글자 줄이 줄 높이 두 배 간격으로 있는 사진
+    img = Image.new('RGB', size, (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    for top in range(line_height, size[1] - line_height, line_height * 3):
+        draw.rectangle([100, top, size[0] - 100, top + line_height - 1], fill=(0, 0, 0))
+    return image_bytes(img)
+
+
+@override_settings(OCR_IMAGE_MIN_WIDTH=768, OCR_IMAGE_MAX_WIDTH=1600, OCR_IMAGE_TEXT_HEIGHT=28, OCR_IMAGE_GRAYSCALE=True)
+class OCRPayloadTest(SimpleTestCase):
+    # OCR 전송 이미지는 글자 크기에 맞춘 폭의 흑백 JPEG
+
+    def payload(self, line_height):
+        return AnalysisImage(label_image(line_height), target_width=1024).ocr_payload()
+
+    def test_width_follows_text_height(self):
+        payload = self.payload(40)
+
+        self.assertAlmostEqual(payload['text_height'], 40, delta=4)
+        self.assertAlmostEqual(payload['size'][0], 1600 * 28 / 40, delta=100)
+        with Image.open(io.BytesIO(payload['data'])) as img:
+            self.assertEqual(img.format, 'JPEG')
+            self.assertEqual(img.mode, 'L')
+            self.assertEqual(img.size, payload['size'])
+
+    def test_width_is_clamped(self):
+        self.assertEqual(self.payload(8)['size'][0], 1600)    # 작은 글자: 최대 폭
+        self.assertEqual(self.payload(150)['size'][0], 768)   # 큰 글자: 최소 폭
+
+    def test_payload_is_built_once_and_releases_source(self):
+        image = AnalysisImage(label_image(40), target_width=1024)
+        payload = image.ocr_payload()
+
+        self.assertIs(image.ocr_payload(), payload)
+        self.assertIsNone(image._source)
+        self.assertEqual(image.size, (1024, 768))  # 표시용 이미지는 그대로
+
+    def test_ocr_boxes_are_scaled_to_display_size(self):
+        result = scale_ocr_result(OCR_RESULT, 1024 / 1600)
+        vertices = result['images'][0]['fields'][0]['boundingPoly']['vertices']
+        self.assertEqual(vertices[2], {'x': 57.6, 'y': 25.6})
+
+
+class AnalysisImageRenderTest(TestCase):
+    # 박스 이미지는 서명된 주소로 처음 요청할 때 한 번만 그려서 올린다
+
+    def setUp(self):
+        self.user = User.objects.create(email='render@test.com')
+        self.client = APIClient()
+        self.s3 = self.enterContext(override_s3_client())
+        self.s3.put(bucket_name(), 'analysis/label', image_bytes(Image.new('RGB', (1024, 768))).getvalue())
+        self.uar = UserAnalysisResult.objects.create(
+            user_id=self.user, image=public_url('analysis/label'), image_key='analysis/label',
+            polygons=[[[10, 10], [90, 10], [90, 40], [10, 40]]],
+        )
+
+    def test_url_is_signed(self):
+        url = analysis_image_url(self.uar)
+        self.assertEqual(url, f'/ingredient/analysis/image/{image_token(self.uar)}/')
+
+        other = UserAnalysisResult.objects.create(user_id=self.user, image=self.uar.image, polygons=[])
+        forged = image_token(self.uar).replace(str(self.uar.pk), str(other.pk), 1)
+        self.assertEqual(self.client.get(f'/ingredient/analysis/image/{forged}/').status_code, 404)
+
+    def test_renders_once_on_first_request(self):
+        url = analysis_image_url(self.uar)
+
+        response = self.client.get(url)  # 인증 없이 <img> 로 불러오는 요청
+        self.assertEqual(response.status_code, 302)
+        self.uar.refresh_from_db()
+        self.assertEqual(response['Location'], self.uar.annotated_image)
+        self.assertEqual(len(self.s3.objects), 2)
+
+        self.assertEqual(self.client.get(url)['Location'], self.uar.annotated_image)
+        self.assertEqual(len(self.s3.objects), 2)
+        self.assertEqual(analysis_image_url(self.uar), self.uar.annotated_image)
+
+    def test_legacy_result_uses_stored_image(self):
+        legacy = UserAnalysisResult.objects.create(user_id=self.user, image='https://s3.test/annotated.jpg')
+        self.assertEqual(analysis_image_url(legacy), 'https://s3.test/annotated.jpg')
+
+
+@override_settings(ANALYSIS_JOB_LOCAL_WORKERS=0, OCR_CACHE_ENABLED=False, ANALYSIS_RENDER_IN_BACKGROUND=False)
+@mock.patch.dict(os.environ, {'AWS_STORAGE_BUCKET_NAME': 'test-bucket'})
+class DirectUploadTest(TransactionTestCase):
+    # upload-url 로 S3 에 직접 올린 뒤 start 로 작업 등록, 워커가 S3 원본으로 분석
+
+    def setUp(self):
+        Ingredient.objects.create(ingredientKr='아스피린', ingredient='Aspirin', level='2등급')
+        self.user = User.objects.create(email='direct@test.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.s3 = self.enterContext(override_s3_client())
+
+    def upload(self):
+        response = self.client.post('/ingredient/analysis/upload-url/', {'contentType': 'image/jpeg'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.s3.put(bucket_name(), response.data['upload']['fields']['key'], jpeg_upload(800, 600).read())
+        return response.data['uarNo']
+
+    def start(self, uar_no):
+        return self.client.post('/ingredient/analysis/start/', {'uarNo': uar_no}, format='json')
+
+    def test_upload_start_and_run(self):
+        uar_no = self.upload()
+
+        response = self.start(uar_no)
+        self.assertEqual(response.status_code, 202)
+        job = AnalysisJob.objects.get(uar_id=uar_no)
+        self.assertEqual(job.source, f's3://test-bucket/uploads/{uar_no}/original')
+        self.assertEqual(self.start(uar_no).status_code, 409)
+
+        with mock.patch('ingredient.ocr.OCR.scanText', return_value=OCR_RESULT):
+            self.assertEqual(run_pending_jobs(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, AnalysisJob.DONE)
+        self.assertEqual(UserAnalysisResult.objects.get(pk=uar_no).risk_level, 'middle')
+        self.assertNotIn(('test-bucket', f'uploads/{uar_no}/original'), self.s3.objects)  # 원본은 지운다
+
+    def test_concurrent_start_returns_409(self):
+        uar_no = self.upload()
+        uar = UserAnalysisResult.objects.get(pk=uar_no)
+
+        def other_request_wins(key):
+            # 작업 존재 여부를 확인한 뒤 다른 요청이 먼저 작업을 등록한 경우
+            AnalysisJob.objects.create(uar_id=uar, source='s3://other')
+            return 1024
+
+        with mock.patch('ingredient.views.object_size', side_effect=other_request_wins):
+            response = self.start(uar_no)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(AnalysisJob.objects.get(uar_id=uar_no).source, 's3://other')
+
+    @override_settings(ANALYSIS_UPLOAD_MAX_BYTES=1024)
+    def test_oversized_upload_is_removed(self):
+        uar_no = self.upload()
+
+        response = self.start(uar_no)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(('test-bucket', f'uploads/{uar_no}/original'), self.s3.objects)
+        self.assertFalse(UserAnalysisResult.objects.filter(pk=uar_no).exists())
+
+    def test_expires_unstarted_uploads(self):
+        started, fresh, stale = self.upload(), self.upload(), self.upload()
+        self.start(started)
+        UserAnalysisResult.objects.filter(pk__in=[started, stale]).update(created_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(expire_direct_uploads(), 1)
+
+        self.assertEqual(sorted(UserAnalysisResult.objects.values_list('pk', flat=True)), [started, fresh])
+        self.assertEqual({key for bucket, key in self.s3.objects},
+                         {f'uploads/{started}/original', f'uploads/{fresh}/original'})
+
+    def test_unstarted_upload_is_hidden_from_history(self):
+        started = self.upload()
+        self.start(started)
+        self.upload()  # URL 만 받고 시작하지 않음
+        finished = UserAnalysisResult.objects.create(user_id=self.user, image='https://s3.test/label.jpg')
+
+        response = self.client.get('/user/profile/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(item['id'] for item in response.data['user_analysis_results']), [started, finished.pk])
+
+
+class SaveResultsTest(TestCase):
+    # 결과 행과 성분 결과는 트랜잭션 하나로 저장 (중간에 실패하면 아무것도 남지 않음)
+
+    def setUp(self):
+        self.user = User.objects.create(email='save@test.com')
+        self.aspirin = Ingredient.objects.create(ingredientKr='아스피린', ingredient='Aspirin', level='2등급')
+        self.caffeine = Ingredient.objects.create(ingredientKr='카페인', ingredient='Caffeine', level='1등급')
+
+    def save(self, matches, user_analysis_result=None):
+        index = get_index()
+        return save_results(self.user, user_analysis_result, 'analysis/label', OCR_RESULT,
+                            [index.get(ingredient.pk) for ingredient in matches], {'total': 12.5})
+
+    def test_failure_rolls_back_result_row(self):
+        with mock.patch.object(IngredientResult.objects, 'bulk_create', side_effect=RuntimeError("DB 오류")):
+            with self.assertRaises(RuntimeError):
+                self.save([self.aspirin])
+
+        self.assertFalse(UserAnalysisResult.objects.exists())
+
+    def test_retry_replaces_previous_results(self):
+        uar = self.save([self.aspirin, self.caffeine])
+        self.assertEqual(uar.risk_level, 'high')
+
+        uar = self.save([self.aspirin], uar)
+
+        self.assertEqual(list(IngredientResult.objects.values_list('uar_id', 'ingredient_id')), [(uar.pk, self.aspirin.pk)])
+        uar.refresh_from_db()
+        self.assertEqual((uar.risk_level, uar.level1_count, uar.level2_count), ('middle', 0, 1))
+        self.assertEqual(uar.polygons, [[[10, 10], [90, 10], [90, 40], [10, 40]]])
+
+
+@override_settings(DATA_VERSION_CHECK_INTERVAL=0)
+class SnapshotTest(TestCase):
+    # 저장된 분석 요약은 성분 사전이 바뀌면 조회할 때 고쳐 저장된다
+
+    def setUp(self):
+        self.user = User.objects.create(email='snapshot@test.com')
+        self.aspirin = Ingredient.objects.create(ingredientKr='아스피린', ingredient='Aspirin', level='2등급')
+        self.caffeine = Ingredient.objects.create(ingredientKr='카페인', ingredient='Caffeine', level='3등급')
+        self.uar = UserAnalysisResult.objects.create(
+            user_id=self.user, image='https://s3.test/label.jpg', risk_level='middle', level1_count=0, level2_count=1,
+            ingredient_ids=[self.aspirin.pk, self.caffeine.pk],
+        )
+
+    def test_current_snapshot_is_not_rewritten(self):
+        get_index()
+        with mock.patch.object(UserAnalysisResult.objects, 'filter') as filter:
+            message = snapshot_message(self.uar, self.uar.image)
+
+        filter.assert_not_called()
+        self.assertEqual(message['riskLevel'], 'middle')
+        self.assertEqual([item['id'] for item in message['ingredientAnalysis']], [self.aspirin.pk, self.caffeine.pk])
+
+    def test_level_change_heals_snapshot(self):
+        self.caffeine.level = '1등급'
+        self.caffeine.save()
+
+        message = snapshot_message(self.uar, self.uar.image)
+
+        self.assertEqual(message['riskLevel'], 'high')
+        self.assertEqual(message['ingredientAnalysis'][0]['id'], self.caffeine.pk)  # 위험한 성분부터
+        self.uar.refresh_from_db()
+        self.assertEqual((self.uar.risk_level, self.uar.level1_count, self.uar.level2_count), ('high', 1, 1))
+
+    def test_deleted_ingredient_is_dropped(self):
+        self.aspirin.delete()
+
+        message = snapshot_message(self.uar, self.uar.image)
+
+        self.assertEqual(message['riskLevel'], 'low')
+        self.uar.refresh_from_db()
+        self.assertEqual(self.uar.ingredient_ids, [self.caffeine.pk])
+
+    def test_legacy_result_is_summarized(self):
+        legacy = UserAnalysisResult.objects.create(user_id=self.user, image='https://s3.test/old.jpg')
+        IngredientResult.objects.create(uar_id=legacy, ingredient_id=self.aspirin)
+
+        self.assertEqual(snapshot_message(legacy, legacy.image)['riskLevel'], 'middle')
+        legacy.refresh_from_db()
+        self.assertEqual((legacy.risk_level, legacy.ingredient_ids), ('middle', [self.aspirin.pk]))
+
+
+class RescoreJobTest(TestCase):
+    # 등급이 바뀐 성분을 포함한 분석 요약만 묶음 단위로 다시 계산하고, 중단되면 이어서 진행
+
+    def setUp(self):
+        self.user = User.objects.create(email='rescore@test.com')
+        self.aspirin = Ingredient.objects.create(ingredientKr='아스피린', ingredient='Aspirin', level='2등급')
+        self.caffeine = Ingredient.objects.create(ingredientKr='카페인', ingredient='Caffeine', level='3등급')
+
+        self.affected = [self.analysis(self.aspirin, self.caffeine) for _ in range(5)]
+        self.other = self.analysis(self.aspirin)
+
+        # 시그널 없이 등급 변경 (관리 도구로 한꺼번에 바꾼 경우)
+        Ingredient.objects.filter(pk=self.caffeine.pk).update(level='1등급', severity=1)
+
+    def analysis(self, *ingredients):
+        uar = UserAnalysisResult.objects.create(
+            user_id=self.user, risk_level='middle', level1_count=0, level2_count=1,
+            ingredient_ids=[ingredient.pk for ingredient in ingredients],
+        )
+        IngredientResult.objects.bulk_create([IngredientResult(uar_id=uar, ingredient_id=ingredient) for ingredient in ingredients])
+        return uar
+
+    def risk_levels(self, results):
+        levels = dict(UserAnalysisResult.objects.values_list('pk', 'risk_level'))
+        return [levels[uar.pk] for uar in results]
+
+    def test_resumes_from_checkpoint(self):
+        job = create_rescore_job([self.caffeine.pk])
+        self.assertEqual(job.total, 5)
+
+        def crash(job, rate):
+            raise KeyboardInterrupt
+
+        # 첫 묶음을 저장한 뒤 중단
+        with self.assertRaises(KeyboardInterrupt):
+            run_rescore_job(job, batch_size=2, progress=crash)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed, job.last_uar_id), (RescoreJob.RUNNING, 2, self.affected[1].pk))
+        self.assertEqual(self.risk_levels(self.affected), ['high', 'high', 'middle', 'middle', 'middle'])
+
+        [job] = run_unfinished_jobs(batch_size=2)
+
+        self.assertEqual((job.status, job.processed), (RescoreJob.DONE, 5))
+        self.assertEqual(self.risk_levels(self.affected), ['high'] * 5)
+        self.assertEqual(self.risk_levels([self.other]), ['middle'])
+        self.assertEqual(
+            set(UserAnalysisResult.objects.filter(pk__in=[uar.pk for uar in self.affected]).values_list('level1_count', 'level2_count')),
+            {(1, 1)},
+        )
+
+    def test_background_rescore_does_not_use_pipeline_threads(self):
+        job = create_rescore_job([self.caffeine.pk])
+        threads = []
+
+        with mock.patch('ingredient.rescore.run_rescore_job', side_effect=lambda job: threads.append(threading.current_thread().name)):
+            start_rescore_job(job).result(timeout=5)
+
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('rescore'))
+
+    def test_command_reports_progress(self):
+        out = io.StringIO()
+
+        call_command('rescore_analyses', '--ingredient-ids', str(self.caffeine.pk), '--batch-size', '2', stdout=out)
+
+        self.assertIn('대상 5개', out.getvalue())
+        self.assertIn('5/5 (100.0%)', out.getvalue())
+        self.assertEqual(self.risk_levels(self.affected), ['high'] * 5)
+
+
+class IngredientSeverityTest(TestCase):
+    # 등급 문자열의 숫자를 severity 로 저장하고, 등급순 정렬은 문자열이 아니라 숫자 순서
+
+    def test_level_severity(self):
+        cases = {'1등급': 1, '2 등급': 2, '임부금기 10등급': 10, '등급 없음': None, '': None, None: None}
+        for level, severity in cases.items():
+            self.assertEqual(level_severity(level), severity, level)
+
+    def test_save_keeps_severity_in_sync(self):
+        ingredient = Ingredient.objects.create(ingredientKr='아스피린', level='2등급')
+        ingredient.level = '1등급'
+        ingredient.save(update_fields=['level'])
+
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.severity, 1)
+
+    def test_dictionary_sorts_by_number(self):
+        for name, level in [('가', '10등급'), ('나', '2등급'), ('다', '1등급'), ('라', None)]:
+            Ingredient.objects.create(ingredientKr=name, level=level)
+        client = APIClient()
+        client.force_authenticate(User.objects.create(email='severity@test.com'))
+
+        response = client.get('/ingredient/dictionary/', {'sort': 'level'})
+
+        levels = [item['level'] for item in response.json()['results']['ingredients']]
+        self.assertEqual(levels[-3:], ['1등급', '2등급', '10등급'])
+
+
+@override_settings(SPREADSHEET_BATCH_SIZE=2, RESCORE_IN_BACKGROUND=False)
+class IngredientImportTest(TestCase):
+    # 정규화한 한글명이 같은 성분은 새로 만들지 않고 갱신, 파일 안의 중복 이름은 묶음이 달라도 알려 준다
+
+    def setUp(self):
+        self.aspirin = Ingredient.objects.create(ingredientKr='아스피린', ingredient='Aspirin', level='2등급')
+        self.client = APIClient()
+
+    def upload(self, *rows):
+        content = 'categoryId,effectType,ingredientKr,ingredient,level,reason,notes\n' + ''.join(f'{row}\n' for row in rows)
+        upload = SimpleUploadedFile('ingredients.csv', content.encode('utf-8'), content_type='text/csv')
+        return self.client.post('/ingredient/upload/', {'file': upload}, format='multipart')
+
+    def test_upsert_and_duplicates(self):
+        response = self.upload(
+            'A,진통,아스 피린,Aspirin,1등급,태아 위험,',
+            'B,각성,카페인(무수),Caffeine,2등급,,',
+            'B,각성,카페인[무수],Caffeine,3등급,,',
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 2))
+        self.assertEqual(response.data['duplicates'], ['카페인[무수]'])
+        self.assertEqual(Ingredient.objects.count(), 2)
+
+        self.aspirin.refresh_from_db()
+        self.assertEqual((self.aspirin.ingredientKr, self.aspirin.level, self.aspirin.severity), ('아스 피린', '1등급', 1))
+        self.assertEqual(response.data['rescoreJob']['total'], 0)
+        self.assertEqual(get_index().lookup('카페인(무수)')['level'], '3등급')
+
+    def test_unchanged_rows_are_not_updated(self):
+        response = self.upload('A,진통,아스피린,Aspirin,2등급,,')
+
+        self.assertEqual((response.data['created'], response.data['updated']), (0, 1))
+        response = self.upload('A,진통,아스피린,Aspirin,2등급,,')
+        self.assertEqual((response.data['created'], response.data['updated']), (0, 0))
+        self.assertNotIn('duplicates', response.data)
+
+    def test_xlsx_number_cells_are_not_changes(self):
+        # XLSX 의 숫자 칸(12, 3.0)도 저장된 문자열과 같은 값으로 비교
+        def upload():
+            workbook = Workbook()
+            workbook.active.append(['categoryId', 'effectType', 'ingredientKr', 'ingredient', 'level', 'reason', 'notes'])
+            workbook.active.append([12, '진통', '아스피린', 'Aspirin', '2등급', None, 3.0])
+            buffer = io.BytesIO()
+            workbook.save(buffer)
+            file = SimpleUploadedFile('ingredients.xlsx', buffer.getvalue())
+            return self.client.post('/ingredient/upload/', {'file': file}, format='multipart')
+
+        self.assertEqual(upload().data['updated'], 1)
+        self.aspirin.refresh_from_db()
+        self.assertEqual((self.aspirin.categoryId, self.aspirin.notes), ('12', '3'))
+        self.assertEqual(upload().data['updated'], 0)
+
+    def test_failed_upload_saves_nothing(self):
+        # 첫 묶음은 저장되고 두 번째 묶음에서 실패
+        batches = []
+
+        def failing_import(rows, seen):
+            if batches:
+                raise RuntimeError("DB 오류")
+            batches.append(rows)
+            return import_rows(rows, seen)
+
+        with mock.patch('ingredient.views.import_rows', side_effect=failing_import):
+            with self.assertRaises(RuntimeError):
+                self.upload('A,진통,카페인,Caffeine,1등급,,', 'A,진통,아스피린,Aspirin,1등급,,', 'A,진통,이부프로펜,Ibuprofen,2등급,,')
+
+        self.assertEqual(list(Ingredient.objects.values_list('ingredientKr', 'level')), [('아스피린', '2등급')])
+        self.assertFalse(RescoreJob.objects.exists())
+
+    def test_duplicate_name_is_a_form_error(self):
+        form = modelform_factory(Ingredient, fields='__all__')({'ingredientKr': '아스 피린', 'level': '1등급'})
+
+        self.assertFalse(form.is_valid())
+        self.assertIn('ingredientKr', form.errors)
+
+        form = modelform_factory(Ingredient, fields='__all__')({'ingredientKr': '아스피린', 'level': '1등급'}, instance=self.aspirin)
+        self.assertTrue(form.is_valid())
+
+    def test_migration_merges_duplicate_names(self):
+        merge_duplicate_names = import_module('ingredient.migrations.0011_ingredient_normalized_name').merge_duplicate_names
+        combination, other = Ingredient.objects.bulk_create([
+            Ingredient(ingredientKr='아스피린', ingredient='Aspirin + Caffeine', level='1등급'),
+            Ingredient(ingredientKr='카페인', ingredient='Caffeine', level='2등급'),
+        ])
+        user = User.objects.create(email='merge@test.com')
+        uar = UserAnalysisResult.objects.create(user_id=user, ingredient_ids=[self.aspirin.pk, combination.pk, other.pk])
+        IngredientResult.objects.bulk_create([
+            IngredientResult(uar_id=uar, ingredient_id=ingredient) for ingredient in (self.aspirin, combination, other)
+        ])
+
+        with mock.patch('builtins.print'):
+            merge_duplicate_names(django_apps, None)
+
+        self.assertFalse(Ingredient.objects.filter(pk=combination.pk).exists())
+        uar.refresh_from_db()
+        self.assertEqual(uar.ingredient_ids, [self.aspirin.pk, other.pk])
+        self.assertEqual(sorted(IngredientResult.objects.values_list('ingredient_id', flat=True)), [self.aspirin.pk, other.pk])
+        self.assertEqual(RescoreJob.objects.get().ingredient_ids, [self.aspirin.pk])
+
+
+class NameSearchIndexRankTest(SimpleTestCase):
+    # 같은 이름, 앞부분이 같은 이름, 중간에 들어 있는 이름 순 (그 안에서는 짧은 이름, id 순)
+
+    def setUp(self):
+        self.index = NameSearchIndex([
+            (1, ('저용량아스피린', 'Low Dose Aspirin')),
+            (2, ('아스피린정100', None)),
+            (3, ('아스피린', 'Aspirin')),
+            (4, ('아스피린라이신', 'Aspirin Lysine')),
+        ])
+
+    def test_substring_rank(self):
+        self.assertEqual(self.index.find('아스피린'), [3, 4, 2, 1])
+        self.assertEqual(self.index.find('aspirin'), [3, 4, 1])
+
+    def test_chosung_rank(self):
+        self.assertEqual(self.index.find('ㅇㅅㅍㄹ'), [3, 4, 2, 1])
+
+    def test_typo_falls_back_to_distance(self):
+        self.assertEqual(self.index.find('아스피른')[0], 3)
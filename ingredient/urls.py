@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import IngredientAnalysis, IngredientUploadAPIView, Dictionary, AnalysisDetail
+from .views import IngredientAnalysis, IngredientUploadAPIView, Dictionary, AnalysisDetail, AnalysisImageRender, AnalysisUploadURL, AnalysisStart
 
 app_name = 'ingredient'
 
@@ -8,4 +8,7 @@ urlpatterns = [
     path('upload/', IngredientUploadAPIView.as_view(), name='ingredient-upload'),
     path('dictionary/', Dictionary.as_view(), name='ingredient-dictionary'),
     path('analysis/detail', AnalysisDetail.as_view(), name='analysis-detail'),
+    path('analysis/upload-url/', AnalysisUploadURL.as_view(), name='analysis-upload-url'),
+    path('analysis/start/', AnalysisStart.as_view(), name='analysis-start'),
+    path('analysis/image/<str:token>/', AnalysisImageRender.as_view(), name='analysis-image'),
 ]
\ No newline at end of file
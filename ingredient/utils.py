@@ -1,7 +1,29 @@
 from PIL import Image, ImageDraw
 import io
 import json
-import requests
+import unicodedata
+import logging
+from django.conf import settings
+from mombo.http import get_upstream
+
+logger = logging.getLogger(__name__)
+
+# 괄호 변형을 소괄호로 통일하기 위한 변환 테이블
+BRACKET_TABLE = str.maketrans({
+    '[': '(', '{': '(', '〔': '(', '【': '(', '〈': '(', '《': '(', '「': '(', '『': '(',
+    ']': ')', '}': ')', '〕': ')', '】': ')', '〉': ')', '》': ')', '」': ')', '』': ')',
+})
+
+
+def normalize_name(name):
+    # 성분명 비교용 키 생성 (전각/반각, NFC/NFD, 공백, 괄호, 대소문자 차이 제거)
+    if name is None:
+        return ''
+
+    name = unicodedata.normalize('NFKC', str(name))
+    name = name.translate(BRACKET_TABLE)
+    return ''.join(name.split()).casefold()
+
 
 def resize_image_width(image_file, target_width):
     # 이미지 열기
@@ -25,10 +47,37 @@ def resize_image_width(image_file, target_width):
 
 
 def natural_language_processing(text):
+    # settings.INGREDIENT_NLP_BACKEND 에 따라 성분명 교정 방식 선택
+    # local: 프로세스 내 교정기 / remote: NLP 서버 / local_fallback: 교정 못한 단어만 NLP 서버로
+    from .index import get_index
+
+    backend = getattr(settings, 'INGREDIENT_NLP_BACKEND', 'local')
+
+    if backend == 'remote':
+        return remote_natural_language_processing(text)
+
+    corrector = get_index().corrector
+    if backend != 'local_fallback':
+        return corrector.correct(text)
+
+    results = corrector.correct_tokens(text)
+    unresolved = [token for token, result in results if result is None]
+    if not unresolved:
+        return [result[0] for token, result in results]
+
+    try:
+        remote_result = remote_natural_language_processing(unresolved)
+    except Exception as e:
+        logger.warning("NLP 서버 호출 실패, 로컬 교정 결과만 사용: %s", e)
+        remote_result = unresolved
+
+    return [result[0] for token, result in results if result is not None] + list(remote_result)
+
+
+def remote_natural_language_processing(text):
     
     # API 엔드포인트
-    # url = 'http://3.38.183.235:8001/correct_ingredients/'
-    url = 'http://127.0.0.1:8001/correct_ingredients/'
+    url = getattr(settings, 'NLP_SERVER_URL', 'http://127.0.0.1:8001/correct_ingredients/')
 
     # JSON 데이터
     data = {
@@ -42,12 +91,42 @@ def natural_language_processing(text):
     }
 
     # POST 요청 보내기
-    response = requests.post(url, json=data, headers=headers)
+    response = get_upstream('nlp').post(url, json=data, headers=headers)
 
     # 응답 출력
     return response.json()['corrected_ingredients']      # JSON 형식의 응답 데이터
 
 
+def ocr_fields(ocr_result):
+    # OCR 결과에서 필드별 텍스트와 박스 좌표 추출
+    if isinstance(ocr_result, str):
+        ocr_result = json.loads(ocr_result)
+
+    fields = []
+    for field in ocr_result['images'][0]['fields']:
+        vertices = field['boundingPoly']['vertices']
+        fields.append({
+            'text': field.get('inferText', ''),
+            'vertices': [(vertex['x'], vertex['y']) for vertex in vertices],
+        })
+    return fields
+
+
+def scale_ocr_result(ocr_result, scale):
+    # OCR 전송 이미지 좌표를 표시용 이미지 좌표로 변환
+    if isinstance(ocr_result, str):
+        ocr_result = json.loads(ocr_result)
+    if scale == 1:
+        return ocr_result
+
+    for image in ocr_result.get('images', []):
+        for field in image.get('fields', []):
+            for vertex in field['boundingPoly']['vertices']:
+                vertex['x'] = round(vertex.get('x', 0) * scale, 1)
+                vertex['y'] = round(vertex.get('y', 0) * scale, 1)
+    return ocr_result
+
+
 def draw_boxes_on_image(image_path, ocr_result):
 
     # ocr_result가 JSON 문자열일 경우, 파이썬 딕셔너리로 변환
@@ -61,16 +140,12 @@ def draw_boxes_on_image(image_path, ocr_result):
     extracted_texts = []  # 추출된 텍스트를 저장할 리스트
     
     # OCR 결과에서 boundingPoly 추출
-    for field in ocr_result['images'][0]['fields']:
-        vertices = field['boundingPoly']['vertices']
-        points = [(vertex['x'], vertex['y']) for vertex in vertices]
-
+    for field in ocr_fields(ocr_result):
         # 사각형 그리기
-        draw.polygon(points, outline="red", width=2)
+        draw.polygon(field['vertices'], outline="red", width=2)
 
         # OCR 추출된 텍스트 확인
-        infer_text = field.get('inferText', '')
-        extracted_texts.append(infer_text)  # 텍스트 추가
+        extracted_texts.append(field['text'])  # 텍스트 추가
 
     # 메모리 버퍼에 리사이즈된 이미지 저장
     img_byte_arr = io.BytesIO()
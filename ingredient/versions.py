@@ -0,0 +1,50 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from .models import DataVersion
+
+_checked = {}  # 이름 -> (버전, DB 에서 확인한 시각)
+_lock = threading.Lock()
+
+
+def current_version(name):
+    """
+    DB 에 저장된 공유 버전. 요청마다 조회하지 않도록 DATA_VERSION_CHECK_INTERVAL 초 동안은
+    마지막으로 확인한 값을 쓴다 (다른 프로세스의 변경은 최대 그 시간 뒤에 보인다).
+    """
+    interval = getattr(settings, 'DATA_VERSION_CHECK_INTERVAL', 2)
+    checked = _checked.get(name)
+    if checked is not None and time.monotonic() - checked[1] < interval:
+        return checked[0]
+
+    version = DataVersion.objects.filter(name=name).values_list('version', flat=True).first() or 0
+    with _lock:
+        _checked[name] = (version, time.monotonic())
+    return version
+
+
+def bump_version(name):
+    """
+    버전을 올리고 (직전 버전, 새 버전) 반환.
+    트랜잭션이 롤백되어도 같은 번호를 다시 쓰지 않도록 현재 시각(마이크로초)보다 작아지지 않게 올린다.
+    """
+    stamp = time.time_ns() // 1000
+    with transaction.atomic():
+        updated = DataVersion.objects.filter(name=name).update(
+            previous=F('version'), version=Greatest(F('version') + 1, Value(stamp)),
+        )
+        if not updated:
+            DataVersion.objects.get_or_create(name=name)
+            DataVersion.objects.filter(name=name).update(
+                previous=F('version'), version=Greatest(F('version') + 1, Value(stamp)),
+            )
+        previous, version = DataVersion.objects.filter(name=name).values_list('previous', 'version').get()
+
+    with _lock:
+        _checked[name] = (version, time.monotonic())
+    return previous, version
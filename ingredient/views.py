@@ -1,32 +1,54 @@
+import requests
 from drf_spectacular.utils import OpenApiExample, extend_schema, inline_serializer, OpenApiParameter, OpenApiResponse
-from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.shortcuts import get_object_or_404, redirect
 from rest_framework import serializers
 from rest_framework.views import APIView
 from rest_framework import status
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser
-from .serializers import IngredientSerializer, UserAnalysisResultSerializer, IngredientResultSerializer
-from .models import Ingredient, UserAnalysisResult, IngredientResult
-from .imgUpload import S3ImgUploader
-from .ocr import OCR
-from .utils import draw_boxes_on_image, natural_language_processing, resize_image_width
+from .serializers import IngredientSerializer, UserAnalysisResultSerializer
+from .models import Ingredient, UserAnalysisResult, AnalysisJob
+from .importer import import_rows
+from .index import refresh_index
+from .image import ImageTooLarge, check_image
+from .imgUpload import object_size
+from .jobs import (
+    create_direct_upload, direct_upload_key, discard_direct_upload, enqueue_analysis, enqueue_direct_upload, wake_local_workers,
+)
+from .pipeline import run_analysis
+from .rescore import create_rescore_job, start_rescore_job
+from .render import analysis_image_url, render_annotated_image, uar_id_from_token
+from .snapshot import snapshot_message
 from user.serializers import ProfileSerializer
 from user.models import Profile
-import pandas as pd
+from mombo.pagination import KeysetPagination, WindowCountPagination, keyset_requested
+from mombo.uploads import limit_upload_size, spreadsheet_rows
+from PIL import UnidentifiedImageError
 
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# 작업 모드 분석이 실패했을 때 사용자에게 보여 주는 문구
+ANALYSIS_FAILED_MESSAGE = "이미지 분석에 실패했습니다. 다시 시도해주세요."
+
 # 페이징 처리 클래스
-class IngredientPagination(PageNumberPagination):
+class IngredientPagination(WindowCountPagination):
     page_size = 20  # 한 페이지에 20개 항목
     page_size_query_param = 'page_size'
     max_page_size = 100  # 최대 페이지 크기 제한
 
 
+# 커서 페이징 처리 클래스 (cursor 파라미터가 있을 때, 깊은 페이지도 OFFSET 없이 조회)
+class IngredientCursorPagination(KeysetPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
 class Dictionary(APIView):
     @extend_schema(
         summary="성분 사전 API",
@@ -40,6 +62,12 @@ class Dictionary(APIView):
                 enum=[ 'name', 'level']  # 선택 가능한 값 제한
             ),
             OpenApiParameter(name='page', description='페이지 번호 (정수 값)', required=False, type=int),
+            OpenApiParameter(
+                name='cursor',
+                description="커서 (있으면 page 대신 커서 방식으로 응답, 첫 페이지는 빈 값, 다음/이전 페이지는 next/previous 링크 사용)",
+                required=False,
+                type=str,
+            ),
             OpenApiParameter(
                 name='order', 
                 description="정렬 순서", 
@@ -66,6 +94,23 @@ class Dictionary(APIView):
                             ]
                         },
                     ),
+                    OpenApiExample(
+                        name="200_OK_CURSOR",
+                        value={
+                            "next": "https://api.example.com/ingredient/dictionary/?sort=name&cursor=eyJvIjpbImluZ3...",
+                            "previous": None,
+                            "results": {
+                                "ingredients": [
+                                    {
+                                        "id": 1,
+                                        "ingredientKr": "성분 예시",
+                                        "ingredientDescription": "이 성분은 예시 설명입니다."
+                                    }
+                                ],
+                                "page_size": 20,
+                            }
+                        },
+                    ),
                     OpenApiExample(
                         name="400_BAD_REQUEST",
                         value={
@@ -99,23 +144,34 @@ class Dictionary(APIView):
                 ingredients = Ingredient.objects.all().order_by('ingredientKr')  # 기준 오름차순
         elif sort == 'level':
             if order == 'desc':
-                ingredients = Ingredient.objects.all().order_by('-level')  # 내림차순
+                ingredients = Ingredient.objects.all().order_by('-severity', '-ingredientKr')  # 내림차순
             else:
-                ingredients = Ingredient.objects.all().order_by('level')  # 오름차순
+                ingredients = Ingredient.objects.all().order_by('severity', 'ingredientKr')  # 오름차순
         else:
             return Response({"message": "잘못된 정렬 기준입니다."}, status=status.HTTP_400_BAD_REQUEST)
 
+        # 커서 방식 (전체 개수 없이 (정렬 키, id) 다음부터 조회)
+        if keyset_requested(request):
+            paginator = IngredientCursorPagination()
+            paginated_ingredients = paginator.paginate_queryset(ingredients, request)
+
+            response_data = {
+                "ingredients": IngredientSerializer(paginated_ingredients, many=True).data,
+                "page_size": paginator.page_size,
+            }
+
+            return paginator.get_paginated_response(response_data)
 
         # 페이징 처리
         paginator = IngredientPagination()
         paginated_ingredients = paginator.paginate_queryset(ingredients, request)
 
         ingredients_serializer = IngredientSerializer(paginated_ingredients, many=True).data
-        maxPage = (ingredients.count() + paginator.page_size - 1) // paginator.page_size
+        maxPage = (paginator.count + paginator.page_size - 1) // paginator.page_size
 
         response_data = {
             "ingredients": ingredients_serializer,
-            "count": ingredients.count(),  # 총 항목 수
+            "count": paginator.count,  # 총 항목 수
             "page": page,
             "page_size": paginator.page_size,
             "maxPage": maxPage,
@@ -145,9 +201,18 @@ class IngredientAnalysis(APIView):
         name="Ingredient_API",
         fields={
             "image": serializers.FileField(required=True),  # 필수로 설정
+            "mode": serializers.ChoiceField(choices=['sync', 'async'], required=False),  # async: 작업 등록 후 바로 응답
         },
     ),
     examples=[
+        OpenApiExample(
+            response_only=True,
+            name="202_ACCEPTED",
+            value={
+                "uarNo": 1,  # analysis/detail 로 진행 상태와 결과 조회
+                "status": "pending",
+            }
+        ),
         OpenApiExample(
             response_only=True,
             name="200_OK",
@@ -190,6 +255,20 @@ class IngredientAnalysis(APIView):
                 "message": "401_UNAUTHORIZED",
             },
         ),
+        OpenApiExample(
+            response_only=True,
+            name="413_REQUEST_ENTITY_TOO_LARGE",
+            value={
+                "message": "413_REQUEST_ENTITY_TOO_LARGE",
+            },
+        ),
+        OpenApiExample(
+            response_only=True,
+            name="503_SERVICE_UNAVAILABLE",
+            value={
+                "message": "503_SERVICE_UNAVAILABLE",
+            },
+        ),
     ],
     )
     def post(self, request):
@@ -201,68 +280,40 @@ class IngredientAnalysis(APIView):
 
         profile = Profile.objects.get(user=user)
         serializer = ProfileSerializer(profile)  # 프로필 직렬화
-        
-        req_img = request.FILES['image']
-        resize_image = resize_image_width(req_img, 1024)
-        
-        ocr = OCR(resize_image)
-        ocr_result = ocr.scanText()
-        
-        img, text = draw_boxes_on_image(resize_image, ocr_result)
-        nlp_result = natural_language_processing(text)
-        nlp_set = list(set(nlp_result))
-        
-        user_analysis_result = UserAnalysisResult.objects.create(
-            user_id=user,
-            image=None,
-            elapsed_time=None
-        )
-        
-        uploader = S3ImgUploader(img)
-        image_url = uploader.upload(f'{user_analysis_result.id}')
-        
-        user_analysis_result.image = f'https://mombobucket.s3.ap-northeast-2.amazonaws.com/{image_url}'
-        user_analysis_result.save()
-        
-        matched_ingredients = []
-        level_counts = {"1등급": 0, "2등급": 0}
-        
-        for term in nlp_set:
-            try:
-                match = Ingredient.objects.get(ingredientKr__exact=term)
-                match_data_serializer = IngredientSerializer(match)
-                matched_ingredients.append(match_data_serializer.data)
-                
-                if match.level in level_counts:
-                    level_counts[match.level] += 1
-                
-                IngredientResult.objects.create(
-                    uar_id=user_analysis_result,
-                    ingredient_id=match
-                )
-            except Exception as e:
-                continue
-        
-        # 위험 수준 결정
-        if level_counts["1등급"] > 0:
-            riskLevel = "high"
-        elif level_counts["2등급"] > 0:
-            riskLevel = "middle"
-        else:
-            riskLevel = "low"
-            
-        sorted_ingredients = sorted(matched_ingredients, key=lambda x: x['level'])
+
+        # 너무 큰 업로드는 본문을 읽기 전에 413 으로 거절 (작은 파일은 메모리, 큰 파일은 임시 파일에 저장)
+        limit_upload_size(request, settings.ANALYSIS_UPLOAD_MAX_BYTES)
+        req_img = request.FILES.get('image')
+        if not req_img:
+            return Response({"error": "이미지가 제공되지 않았습니다."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 픽셀을 디코딩하기 전에 헤더로 크기 검사
+        try:
+            check_image(req_img)
+        except ImageTooLarge:
+            return Response({"error": "이미지 해상도가 너무 큽니다."}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        except UnidentifiedImageError:
+            return Response({"error": "이미지 파일이 아닙니다."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 작업 모드: 업로드만 저장하고 바로 결과 번호 반환 (분석은 워커가 처리, 결과는 analysis/detail 로 조회)
+        if request.data.get('mode', request.GET.get('mode')) == 'async':
+            user_analysis_result = enqueue_analysis(user, req_img)
+            return Response({
+                "uarNo": user_analysis_result.id,
+                "status": AnalysisJob.PENDING,
+            }, status=status.HTTP_202_ACCEPTED)
+
+        try:
+            user_analysis_result, result = run_analysis(req_img, user=user)
+        except requests.RequestException:
+            # OCR/NLP 서버 장애(재시도 실패, 회로 열림)는 잠시 후 다시 시도하도록 503
+            return Response({"error": "성분 분석 서버에 연결할 수 없습니다. 잠시 후 다시 시도해주세요."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        result["analysisImage"] = request.build_absolute_uri(result["analysisImage"])
 
         message = {
-            "riskLevel": riskLevel,
+            "riskLevel": result["riskLevel"],
             "user" : serializer.data,
-            "analysisImage" : f'https://mombobucket.s3.ap-northeast-2.amazonaws.com/{image_url}',
-            "riskIngredientCount": {
-                'total': level_counts["1등급"] + level_counts["2등급"],
-                '1등급':level_counts["1등급"],
-                '2등급':level_counts["2등급"],
-                },
-            "ingredientAnalysis": sorted_ingredients
+            **result,
         }
 
         return Response(message, status=status.HTTP_200_OK)
@@ -284,10 +335,19 @@ class AnalysisDetail(APIView):
     tags=["Ingredient"],
     responses=UserAnalysisResultSerializer,
     examples=[
+        OpenApiExample(
+            response_only=True,
+            name="202_ACCEPTED",
+            value={
+                "uarNo": 1,
+                "status": "running",  # pending - running - done - failed
+            }
+        ),
         OpenApiExample(
             response_only=True,
             name="200_OK",
             value={
+                "status": "done",
                 "riskLevel": "high",  # low - middle - high 3단계로 구성
                 "analysisImage": "image/AWS_S3_URL",  # S3 이미지 URL
                 "riskIngredientCount": {
@@ -348,87 +408,245 @@ class AnalysisDetail(APIView):
             return Response({"error": "UAR 번호가 제공되지 않았습니다."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            user_analysis_result = UserAnalysisResult.objects.get(pk=uar_id)
+            user_analysis_result = UserAnalysisResult.objects.select_related('job').get(pk=uar_id)
         except UserAnalysisResult.DoesNotExist:
             return Response({"error": "해당 분석 결과를 찾을 수 없습니다."}, status=status.HTTP_404_NOT_FOUND)
         
-        if user_analysis_result.user_id.id != user.id:
+        if user_analysis_result.user_id_id != user.id:
             return Response({"error": "접근 권한이 없습니다."}, status=status.HTTP_401_UNAUTHORIZED)
 
-        ingredient_list = IngredientResult.objects.filter(uar_id=uar_id)
-        ir_serializer = IngredientResultSerializer(ingredient_list,many=True).data
+        # 작업 모드로 등록된 분석이 아직 끝나지 않은 경우 진행 상태만 반환
+        job = getattr(user_analysis_result, 'job', None)
+        if job is not None and job.status != AnalysisJob.DONE:
+            message = {
+                "uarNo": user_analysis_result.id,
+                "status": job.status,
+            }
+            if job.status == AnalysisJob.FAILED:
+                # 내부 오류 내용(job.error)은 로그와 관리자 화면에서만 확인
+                message["error"] = ANALYSIS_FAILED_MESSAGE
+                return Response(message, status=status.HTTP_200_OK)
+            if job.status == AnalysisJob.PENDING:
+                # 이 프로세스에 워커가 아직 없으면 (재시작 직후 등) 띄워서 처리
+                wake_local_workers()
+            return Response(message, status=status.HTTP_202_ACCEPTED)
+
+        # S3 직접 업로드로 번호만 발급받고 아직 분석을 시작하지 않은 경우
+        if job is None and not user_analysis_result.image:
+            return Response({
+                "uarNo": user_analysis_result.id,
+                "status": AnalysisJob.PENDING,
+            }, status=status.HTTP_202_ACCEPTED)
+
+        # 저장된 요약(성분 id 목록)과 메모리 성분 사전으로 응답 생성 (성분별 조회 없음)
+        message = {
+            "status": AnalysisJob.DONE,
+            **snapshot_message(
+                user_analysis_result,
+                request.build_absolute_uri(analysis_image_url(user_analysis_result)),
+            ),
+        }
 
-        matched_ingredients = []
-        level_counts = {"1등급": 0, "2등급": 0}
+        return Response(message, status=status.HTTP_200_OK)
+    
 
-        for ir in ir_serializer:
-            try:
-                match = Ingredient.objects.get(pk=ir['ingredient_id'])
-                match_data_serializer = IngredientSerializer(match)
-                matched_ingredients.append(match_data_serializer.data)
+class AnalysisUploadURL(APIView):
+    permission_classes = [IsAuthenticated]
+    CONTENT_TYPES = ['image/jpeg', 'image/png', 'image/webp']
 
-                if match.level in level_counts:
-                    level_counts[match.level] += 1
+    @extend_schema(
+    summary="S3 직접 업로드 URL 발급 API",
+    description="분석 번호(uarNo)를 만들고, 이미지를 서버를 거치지 않고 S3 에 바로 올릴 수 있는 서명된 URL 을 발급합니다. "
+                "POST 방식은 fields 를 폼 데이터로 함께 보내고(file 은 마지막), PUT 방식은 headers 를 그대로 사용합니다. "
+                "업로드가 끝나면 analysis/start 로 분석을 시작합니다.",
+    tags=["Ingredient"],
+    request=inline_serializer(
+        name="AnalysisUploadURL_API",
+        fields={
+            "contentType": serializers.ChoiceField(choices=CONTENT_TYPES, required=False),  # 기본값 image/jpeg
+            "method": serializers.ChoiceField(choices=['post', 'put'], required=False),  # 기본값 post
+        },
+    ),
+    examples=[
+        OpenApiExample(
+            response_only=True,
+            name="201_CREATED",
+            value={
+                "uarNo": 1,
+                "upload": {
+                    "method": "POST",
+                    "url": "https://mombobucket.s3.amazonaws.com/",
+                    "fields": {"key": "uploads/1/original", "Content-Type": "image/jpeg", "policy": "...", "x-amz-signature": "..."},
+                },
+                "expiresIn": 600,
+            }
+        ),
+        OpenApiExample(
+            response_only=True,
+            name="400_BAD_REQUEST",
+            value={
+                "message": "400_BAD_REQUEST",
+            },
+        ),
+    ],
+    )
+    def post(self, request):
+        content_type = request.data.get('contentType', 'image/jpeg')
+        method = request.data.get('method', 'post')
+        if content_type not in self.CONTENT_TYPES or method not in ('post', 'put'):
+            return Response({"error": "지원하지 않는 업로드 형식입니다."}, status=status.HTTP_400_BAD_REQUEST)
 
-            except Ingredient.DoesNotExist:
-                continue
+        user_analysis_result, upload = create_direct_upload(request.user, content_type, method)
 
-        # Determine risk level based on ingredient levels
-        if level_counts["1등급"] > 0:
-            risk_level = "high"
-        elif level_counts["2등급"] > 0:
-            risk_level = "middle"
-        else:
-            risk_level = "low"
+        return Response({
+            "uarNo": user_analysis_result.id,
+            "upload": upload,
+            "expiresIn": settings.ANALYSIS_UPLOAD_URL_EXPIRES,
+        }, status=status.HTTP_201_CREATED)
 
-        # Sort the ingredients by level
-        sorted_ingredients = sorted(matched_ingredients, key=lambda x: x['level'])
 
-        # Assuming 'image_url' is defined somewhere in the code; otherwise, it should be handled properly.
-        message = {
-            "riskLevel": risk_level,
-            "analysisImage": user_analysis_result.image,
-            "riskIngredientCount": {
-                'total': level_counts["1등급"] + level_counts["2등급"],
-                '1등급': level_counts["1등급"],
-                '2등급': level_counts["2등급"],
+class AnalysisStart(APIView):
+    permission_classes = [IsAuthenticated]
+    @extend_schema(
+    summary="S3 에 올린 이미지로 분석 시작 API",
+    description="analysis/upload-url 로 발급받은 URL 에 이미지를 올린 뒤 호출합니다. 결과는 analysis/detail 로 조회합니다.",
+    tags=["Ingredient"],
+    request=inline_serializer(
+        name="AnalysisStart_API",
+        fields={
+            "uarNo": serializers.IntegerField(required=True),
+        },
+    ),
+    examples=[
+        OpenApiExample(
+            response_only=True,
+            name="202_ACCEPTED",
+            value={
+                "uarNo": 1,
+                "status": "pending",
+            }
+        ),
+        OpenApiExample(
+            response_only=True,
+            name="400_BAD_REQUEST",
+            value={
+                "message": "400_BAD_REQUEST",
             },
-            "ingredientAnalysis": sorted_ingredients
-        }
+        ),
+        OpenApiExample(
+            response_only=True,
+            name="409_CONFLICT",
+            value={
+                "message": "409_CONFLICT",
+            },
+        ),
+    ],
+    )
+    def post(self, request):
+        uar_id = request.data.get('uarNo')
+        if not uar_id:
+            return Response({"error": "UAR 번호가 제공되지 않았습니다."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            user_analysis_result = UserAnalysisResult.objects.select_related('job').get(pk=uar_id)
+        except (UserAnalysisResult.DoesNotExist, ValueError):
+            return Response({"error": "해당 분석 결과를 찾을 수 없습니다."}, status=status.HTTP_404_NOT_FOUND)
+
+        if user_analysis_result.user_id_id != request.user.id:
+            return Response({"error": "접근 권한이 없습니다."}, status=status.HTTP_401_UNAUTHORIZED)
+
+        if hasattr(user_analysis_result, 'job') or user_analysis_result.image:
+            return Response({"error": "이미 시작된 분석입니다."}, status=status.HTTP_409_CONFLICT)
+
+        size = object_size(direct_upload_key(user_analysis_result))
+        if size is None:
+            return Response({"error": "업로드된 이미지가 없습니다."}, status=status.HTTP_400_BAD_REQUEST)
+        if size > settings.ANALYSIS_UPLOAD_MAX_BYTES:
+            # PUT 업로드는 S3 가 크기를 검사하지 않으므로 여기서 거절하고, 올라간 원본과 분석 번호는 지운다
+            discard_direct_upload(user_analysis_result)
+            return Response({"error": "이미지 크기가 너무 큽니다. 업로드 URL 을 다시 발급받아주세요."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with transaction.atomic():
+                job = enqueue_direct_upload(user_analysis_result)
+        except IntegrityError:
+            # 같은 분석을 동시에 시작한 다른 요청이 먼저 작업을 등록함 (AnalysisJob.uar_id 는 OneToOne)
+            return Response({"error": "이미 시작된 분석입니다."}, status=status.HTTP_409_CONFLICT)
+
+        return Response({
+            "uarNo": user_analysis_result.id,
+            "status": job.status,
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class AnalysisImageRender(APIView):
+    permission_classes = [AllowAny]
+    @extend_schema(
+    summary="OCR 박스를 그린 분석 이미지",
+    description="분석 응답의 analysisImage 주소입니다. 처음 요청할 때 이미지를 만들어 저장하고, 저장된 이미지 URL 로 이동(302)합니다.",
+    tags=["Ingredient"],
+    responses={302: OpenApiResponse(description="이미지 URL 로 이동"), 404: OpenApiResponse(description="잘못된 주소")},
+    )
+    def get(self, request, token):
+        uar_id = uar_id_from_token(token)
+        if uar_id is None:
+            return Response({"error": "해당 이미지를 찾을 수 없습니다."}, status=status.HTTP_404_NOT_FOUND)
+
+        user_analysis_result = get_object_or_404(UserAnalysisResult, pk=uar_id)
+        if not user_analysis_result.image:
+            return Response({"error": "해당 이미지를 찾을 수 없습니다."}, status=status.HTTP_404_NOT_FOUND)
+
+        return redirect(render_annotated_image(user_analysis_result))
 
-        return Response(message, status=status.HTTP_200_OK)
-    
 
 class IngredientUploadAPIView(APIView):
     parser_classes = (MultiPartParser, FormParser)
     @extend_schema(exclude=True)
     def post(self, request, *args, **kwargs):
+        limit_upload_size(request, settings.SPREADSHEET_UPLOAD_MAX_BYTES)
         file = request.FILES.get('file')
 
         if not file:
             return Response({"error": "파일이 제공되지 않았습니다."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 파일 확장자에 따라 pandas로 파일 읽기
-        if file.name.endswith('.csv'):
-            data = pd.read_csv(file)
-        elif file.name.endswith('.xlsx'):
-            data = pd.read_excel(file)
-        else:
+        if not file.name.endswith(('.csv', '.xlsx')):
             return Response({"error": "지원되지 않는 파일 형식입니다."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 데이터 저장
-        ingredients = []
-        for _, row in data.iterrows():
-            ingredients.append(Ingredient(
-                categoryId = row.iloc[0],
-                effectType = row.iloc[1],
-                ingredientKr = row.iloc[2],
-                ingredient = row.iloc[3],
-                level = row.iloc[4],
-                reason = row.iloc[5],
-                notes = row.iloc[6]
-            ))
-        
-        Ingredient.objects.bulk_create(ingredients)
+        # 파일 전체를 메모리에 올리지 않고 나눠 읽어서 저장 (이미 있는 성분은 갱신)
+        # 중간에 실패하면 앞 묶음까지 저장된 반쪽 업로드가 남지 않도록 파일 전체를 한 트랜잭션으로 처리
+        created = []
+        updated = []
+        level_changed = []
+        duplicates = []
+        seen = set()
+        job = None
+        with transaction.atomic():
+            for rows in spreadsheet_rows(file, settings.SPREADSHEET_BATCH_SIZE):
+                batch_created, batch_updated, batch_changed, batch_duplicates = import_rows(rows, seen)
+                created += batch_created
+                updated += batch_updated
+                level_changed += batch_changed
+                duplicates += batch_duplicates
+
+            # 등급이 바뀐 성분을 포함한 지난 분석 결과의 요약 재계산 작업
+            if level_changed:
+                job = create_rescore_job(level_changed)
+
+        # 메모리 성분 사전에 바뀐 성분만 반영
+        refresh_index(created + updated)
+
+        message = {
+            "message": "데이터가 성공적으로 업로드되었습니다.",
+            "created": len(created),
+            "updated": len(updated),
+        }
+
+        # 파일 안에서 정규화한 이름이 겹친 행 (마지막 행으로 저장됨)
+        if duplicates:
+            message["duplicates"] = duplicates
+
+        if job is not None:
+            start_rescore_job(job)
+            message["rescoreJob"] = {"id": job.id, "total": job.total}
 
-        return Response({"message": "데이터가 성공적으로 업로드되었습니다."}, status=status.HTTP_201_CREATED)
\ No newline at end of file
+        return Response(message, status=status.HTTP_201_CREATED)
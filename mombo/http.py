@@ -0,0 +1,238 @@
+import json as jsonlib
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.RequestException):
+    # 외부 서비스 장애로 회로가 열려 있어 요청을 보내지 않음
+    pass
+
+
+def not_sent(error):
+    # 연결을 맺지 못해 요청이 서버에 전달되지 않은 실패인지 (연결 타임아웃, 연결 거부, DNS 실패)
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, ConnectTimeoutError)
+
+
+class CircuitBreaker:
+    """
+    연속 실패가 failure_threshold 번 쌓이면 reset_timeout 동안 요청을 바로 실패시킨다.
+    시간이 지나면 요청 하나만 시험으로 보내고(half-open), 성공하면 다시 닫는다.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class Upstream:
+    """
+    외부 서비스(host) 하나에 대한 HTTP 클라이언트.
+    keep-alive 연결 풀, 연결/응답 타임아웃, 지터를 준 재시도, 회로 차단기, 지연 시간/오류 통계를 제공한다.
+    """
+
+    RETRY_STATUSES = (502, 503, 504)
+    # 여러 번 보내도 결과가 같은 메서드만 응답 오류/연결 끊김에 재시도한다 (POST 는 과금/중복 처리 위험)
+    IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+    def __init__(self, name, connect_timeout=3.05, read_timeout=10.0, retries=2, backoff=0.2,
+                 failure_threshold=5, reset_timeout=30.0, pool_size=10, session=None):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        self.session = session
+
+        self.requests = 0
+        self.errors = 0
+        self.retried = 0
+        self.rejected = 0
+        self.latencies = deque(maxlen=1000)  # 최근 요청 지연 시간(ms)
+        self._lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        if not self.breaker.allow():
+            with self._lock:
+                self.rejected += 1
+            raise CircuitOpenError(f"{self.name} 서비스 응답 불가 (circuit open)")
+
+        kwargs.setdefault('timeout', self.timeout)
+        idempotent = method.upper() in self.IDEMPOTENT_METHODS
+
+        for attempt in range(self.retries + 1):
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.ConnectionError as e:
+                # 연결 단계 실패는 요청이 전달되지 않았으므로 재시도
+                # 보낸 뒤 끊긴 경우는 서버가 이미 처리했을 수 있어 멱등 메서드만 재시도
+                self._record(started, failed=True)
+                if attempt < self.retries and (idempotent or not_sent(e)):
+                    self._sleep(attempt)
+                    continue
+                self.breaker.record_failure()
+                raise
+            except requests.RequestException:
+                # 응답 타임아웃 등은 이미 처리됐을 수 있으므로 재시도하지 않는다
+                self._record(started, failed=True)
+                self.breaker.record_failure()
+                raise
+            except Exception:
+                # 그 밖의 예외도 실패로 기록 (half-open 시험 요청이 회로를 half-open 에 묶어 두지 않도록)
+                self._record(started, failed=True)
+                self.breaker.record_failure()
+                raise
+
+            failed = response.status_code >= 500
+            self._record(started, failed=failed)
+            if failed and idempotent and response.status_code in self.RETRY_STATUSES and attempt < self.retries:
+                self._sleep(attempt)
+                continue
+
+            if failed:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def _sleep(self, attempt):
+        with self._lock:
+            self.retried += 1
+        # full jitter: 0 ~ backoff * 2^attempt 사이 임의 대기
+        time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    def _record(self, started, failed):
+        with self._lock:
+            self.requests += 1
+            if failed:
+                self.errors += 1
+            self.latencies.append((time.perf_counter() - started) * 1000)
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'retries': self.retried,
+            'rejected': self.rejected,
+            'circuit': self.breaker.state,
+            'latency_avg_ms': round(sum(latencies) / len(latencies), 1) if latencies else None,
+            'latency_p95_ms': round(latencies[int(len(latencies) * 0.95)], 1) if latencies else None,
+        }
+
+
+_upstreams = {}
+_upstreams_lock = threading.Lock()
+
+
+def get_upstream(name):
+    # settings.HTTP_UPSTREAMS[name] 설정으로 프로세스당 하나만 만든다
+    upstream = _upstreams.get(name)
+    if upstream is not None:
+        return upstream
+
+    with _upstreams_lock:
+        if name not in _upstreams:
+            options = getattr(settings, 'HTTP_UPSTREAMS', {}).get(name, {})
+            _upstreams[name] = Upstream(name, **options)
+        return _upstreams[name]
+
+
+def upstream_stats():
+    return {name: upstream.stats() for name, upstream in list(_upstreams.items())}
+
+
+class FakeResponse:
+    # 테스트용 가짜 응답
+    def __init__(self, status_code=200, json=None, text=None):
+        self.status_code = status_code
+        if text is None:
+            text = jsonlib.dumps(json) if json is not None else ''
+        self.text = text
+
+    def json(self):
+        return jsonlib.loads(self.text)
+
+
+class FakeSession:
+    # 테스트용 가짜 세션: handler(method, url, **kwargs) 의 반환값을 응답으로 사용하고 호출 기록을 남긴다
+    def __init__(self, handler):
+        self.handler = handler
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        return self.handler(method, url, **kwargs)
+
+
+@contextmanager
+def override_upstream(name, session, **options):
+    # with override_upstream('clova_ocr', FakeSession(handler)): ...
+    with _upstreams_lock:
+        previous = _upstreams.get(name)
+        options = {**getattr(settings, 'HTTP_UPSTREAMS', {}).get(name, {}), **options}
+        _upstreams[name] = Upstream(name, session=session, **options)
+    try:
+        yield _upstreams[name]
+    finally:
+        with _upstreams_lock:
+            if previous is None:
+                _upstreams.pop(name, None)
+            else:
+                _upstreams[name] = previous
@@ -0,0 +1,266 @@
+from django.core import signing
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connection
+from django.db.models import Count, Window
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def with_total(queryset):
+    # 전체 개수를 각 행에 함께 붙인다 (COUNT(*) OVER (), LIMIT 적용 전 개수)
+    return queryset.annotate(window_total=Window(Count('*')))
+
+
+def first_with_count(queryset, limit):
+    """
+    앞의 limit 개와 전체 개수를 쿼리 한 번으로 가져온다.
+    (행 목록, 전체 개수) 반환
+    """
+    rows = list(with_total(queryset)[:limit])
+    return rows, rows[0].window_total if rows else 0
+
+
+class WindowCountPaginator(Paginator):
+    """
+    페이지 행과 전체 개수를 쿼리 한 번으로 가져오는 Paginator.
+    COUNT(*) 를 따로 실행하지 않고, 페이지가 비어 있으면 1페이지만 빈 결과로 허용한다.
+    """
+
+    def page(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger("페이지 번호가 정수가 아닙니다.")
+        if number < 1:
+            raise EmptyPage("페이지 번호는 1 이상이어야 합니다.")
+
+        bottom = (number - 1) * self.per_page
+        rows = list(with_total(self.object_list)[bottom:bottom + self.per_page])
+        if rows:
+            self.count = rows[0].window_total
+        elif number == 1 and self.allow_empty_first_page:
+            self.count = 0
+        else:
+            raise EmptyPage("결과가 없는 페이지입니다.")
+        return self._get_page(rows, number, self)
+
+
+class WindowCountPagination(PageNumberPagination):
+    # 페이지 번호 방식 응답은 그대로 두고, 전체 개수는 페이지 쿼리에서 함께 계산
+    django_paginator_class = WindowCountPaginator
+
+    @property
+    def count(self):
+        # paginate_queryset 이후 사용 (추가 쿼리 없음)
+        return self.page.paginator.count
+
+    def restore_page(self, request, count, page_number):
+        # 캐시한 결과로 응답할 때 next/previous 링크를 만들기 위한 페이지 정보 (쿼리 없음)
+        self.request = request
+        self.page = Paginator(range(count), self.get_page_size(request)).page(page_number)
+
+
+def keyset_requested(request):
+    # cursor 파라미터가 있으면 (빈 값이면 첫 페이지) 커서 방식, 없으면 기존 페이지 번호 방식
+    return KeysetPagination.cursor_query_param in request.query_params
+
+
+class KeysetPagination(BasePagination):
+    """
+    OFFSET 없이 마지막 행의 (정렬 키, id) 다음부터 읽는 커서 페이지네이션.
+    정렬 키 인덱스에서 바로 위치를 찾으므로 몇 번째 페이지든 첫 페이지와 비용이 같다.
+    정렬은 queryset 의 order_by 를 그대로 쓰고, 마지막에 id 를 붙여 순서를 하나로 정한다.
+    전체 개수는 세지 않는다.
+    """
+    cursor_query_param = 'cursor'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = "잘못된 커서입니다."
+    signing_salt = 'mombo.pagination.cursor'
+
+    def __init__(self):
+        self.request = None
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size < 1:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        ordering = self._ordering(queryset)
+        keys = [self._key(queryset, field) for field in ordering]
+        values, reverse = self.decode_cursor(request.query_params.get(self.cursor_query_param), ordering)
+
+        if reverse:
+            # 이전 페이지는 반대 방향으로 읽은 뒤 뒤집는다
+            keys = [(sql, params, not descending, null) for sql, params, descending, null in keys]
+            queryset = queryset.order_by(*[field[1:] if field.startswith('-') else '-' + field for field in ordering])
+        else:
+            queryset = queryset.order_by(*ordering)
+
+        # 다음 페이지가 있는지 알기 위해 한 행 더 읽는다
+        limit = self.page_size + 1
+        if values is None:
+            rows = list(queryset[:limit])
+        else:
+            rows = []
+            for where, params in self._seek(keys, values):
+                rows.extend(queryset.extra(where=[where], params=params)[:limit - len(rows)])
+                if len(rows) >= limit:
+                    break
+
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # 커서로 들어왔으면 그 반대쪽 페이지는 있다고 본다
+        has_next = values is not None if reverse else has_more
+        has_previous = has_more if reverse else values is not None
+        if rows and has_next:
+            self.next_cursor = self.encode_cursor(self._values(rows[-1], ordering), ordering, False)
+        if rows and has_previous:
+            self.previous_cursor = self.encode_cursor(self._values(rows[0], ordering), ordering, True)
+        return rows
+
+    def _ordering(self, queryset):
+        # extra(order_by=...) 가 있으면 그 순서가 우선
+        ordering = list(queryset.query.extra_order_by or queryset.query.order_by) or ['pk']
+        if ordering[-1].lstrip('-') not in ('pk', 'id'):
+            ordering.append('-pk' if ordering[-1].startswith('-') else 'pk')
+        return ordering
+
+    def _key(self, queryset, field):
+        # (SQL 식, 파라미터, 내림차순 여부, NULL 가능 여부)
+        descending = field.startswith('-')
+        name = field.lstrip('-')
+        if name in queryset.query.extra_select:
+            # extra(select=...) 값 (FTS 관련도 등) 은 NULL 이 아니라고 본다
+            # 단항 + 로 감싸 가상 테이블 제약으로 넘기지 않는다 (FTS5 는 WHERE rank = ? 를 순위 함수 설정으로 해석)
+            sql, params = queryset.query.extra_select[name]
+            return f'+({sql})', list(params), descending, False
+
+        model = queryset.model
+        field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+        qn = connection.ops.quote_name
+        return f'{qn(model._meta.db_table)}.{qn(field.column)}', [], descending, field.null
+
+    def _values(self, row, ordering):
+        # 커서에 담을 행의 정렬 키 값
+        return [getattr(row, field.lstrip('-')) for field in ordering]
+
+    def _seek(self, keys, values):
+        """
+        커서 다음 행들을 정렬 순서대로 (WHERE 조건, 파라미터) 구간으로 나눈다.
+        NULL 이 끼지 않고 방향이 같은 키는 행 값 비교 (a, b, id) > (?, ?, ?) 하나로 묶어
+        인덱스에서 바로 위치를 찾는다. 대부분 구간 하나(쿼리 한 번)로 끝나고,
+        NULL 이 뒤에 정렬되는 키는 그 사이에 'IS NULL' 구간이 끼어 쿼리가 더 필요할 수 있다.
+        """
+        nulls_largest = connection.features.nulls_order_largest
+        segments = []
+        run = []  # 행 값 비교로 묶을 키 위치 (뒤에서부터)
+
+        def prefix(end):
+            # 앞쪽 키는 커서 값과 같아야 한다
+            where, params = [], []
+            for (sql, key_params, _, _), value in zip(keys[:end], values):
+                if value is None:
+                    where.append(f'{sql} IS NULL')
+                    params.extend(key_params)
+                else:
+                    where.append(f'{sql} = %s')
+                    params.extend(key_params + [value])
+            return where, params
+
+        def flush():
+            if not run:
+                return
+            start, end = run[-1], run[0] + 1
+            where, params = prefix(start)
+            columns, column_params = [], []
+            for sql, key_params, _, _ in keys[start:end]:
+                columns.append(sql)
+                column_params.extend(key_params)
+            operator = '<' if keys[start][2] else '>'
+            where.append('({}) {} ({})'.format(', '.join(columns), operator, ', '.join(['%s'] * len(columns))))
+            segments.append((' AND '.join(where), params + column_params + list(values[start:end])))
+            run.clear()
+
+        for i in reversed(range(len(keys))):
+            sql, key_params, descending, null = keys[i]
+            # 이 방향에서 NULL 이 값 있는 행보다 뒤에 오는지
+            nulls_after = nulls_largest != descending
+
+            if values[i] is None:
+                flush()
+                if not nulls_after:
+                    where, params = prefix(i)
+                    where.append(f'{sql} IS NOT NULL')
+                    segments.append((' AND '.join(where), params + key_params))
+                continue
+
+            if run and keys[run[0]][2] != descending:
+                flush()
+            run.append(i)
+            if null and nulls_after:
+                flush()
+                where, params = prefix(i)
+                where.append(f'{sql} IS NULL')
+                segments.append((' AND '.join(where), params + key_params))
+        flush()
+        return segments
+
+    def encode_cursor(self, values, ordering, reverse):
+        return signing.dumps({'o': ordering, 'v': values, 'r': reverse}, salt=self.signing_salt, compress=True)
+
+    def decode_cursor(self, cursor, ordering):
+        # (커서 값, 이전 페이지 여부), 첫 페이지면 (None, False)
+        if not cursor:
+            return None, False
+        try:
+            payload = signing.loads(cursor, salt=self.signing_salt)
+        except signing.BadSignature:
+            raise NotFound(self.invalid_cursor_message)
+        # 다른 정렬에서 만든 커서는 사용할 수 없음
+        if payload.get('o') != ordering or len(payload.get('v') or ()) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return payload['v'], bool(payload.get('r'))
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'page')
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self._link(self.next_cursor)
+
+    def get_previous_link(self):
+        return self._link(self.previous_cursor)
+
+    def restore_cursors(self, request, next_cursor, previous_cursor):
+        # 캐시한 결과로 응답할 때 next/previous 링크를 만들기 위한 커서 (쿼리 없음)
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
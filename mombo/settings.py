@@ -116,6 +116,91 @@ SPECTACULAR_SETTINGS = {
     'SWAGGER_UI_DIST': '//unpkg.com/swagger-ui-dist@3.38.0',  # Swagger UI 버전을 조절할수 있습니다.
 }
 
+# 외부 서비스별 HTTP 클라이언트 설정 (mombo.http.Upstream)
+# 타임아웃(초), 재시도 횟수, 회로 차단 기준(연속 실패 수, 차단 시간), 연결 풀 크기
+# POST(Clova OCR, NLP)는 연결 단계 실패만 재시도 (요청마다 과금되므로 중복 전송 방지)
+HTTP_UPSTREAMS = {
+    'clova_ocr': {'connect_timeout': 3.05, 'read_timeout': 20, 'retries': 2, 'failure_threshold': 5, 'reset_timeout': 30, 'pool_size': 10},
+    'nlp': {'connect_timeout': 1, 'read_timeout': 5, 'retries': 2, 'failure_threshold': 5, 'reset_timeout': 15, 'pool_size': 10},
+    # 인가 코드는 한 번만 쓸 수 있으므로 토큰 발급은 재시도하지 않음
+    'kakao_auth': {'connect_timeout': 3.05, 'read_timeout': 5, 'retries': 0, 'failure_threshold': 5, 'reset_timeout': 30, 'pool_size': 5},
+    'kakao_api': {'connect_timeout': 3.05, 'read_timeout': 5, 'retries': 1, 'failure_threshold': 5, 'reset_timeout': 30, 'pool_size': 5},
+}
+
+# 성분명 교정 방식 ('local', 'remote', 'local_fallback')
+INGREDIENT_NLP_BACKEND = os.environ.get('INGREDIENT_NLP_BACKEND', 'local')
+# NLP_SERVER_URL = 'http://3.38.183.235:8001/correct_ingredients/'
+NLP_SERVER_URL = os.environ.get('NLP_SERVER_URL', 'http://127.0.0.1:8001/correct_ingredients/')
+
+# 비동기 성분 분석 작업 (DB 작업 큐)
+ANALYSIS_JOB_UPLOAD_DIR = os.environ.get('ANALYSIS_JOB_UPLOAD_DIR', BASE_DIR / 'uploads' / 'jobs')
+ANALYSIS_JOB_LOCAL_WORKERS = int(os.environ.get('ANALYSIS_JOB_LOCAL_WORKERS', 2))  # 웹 프로세스 안에서 띄울 워커 수 (0이면 run_analysis_workers 사용)
+# 앱을 불러올 때 워커를 바로 띄울지 (웹 서버 프로세스에서만 true, 꺼져 있으면 첫 업로드/상태 조회 때 띄움)
+ANALYSIS_JOB_START_ON_STARTUP = os.environ.get('ANALYSIS_JOB_START_ON_STARTUP', 'false').lower() == 'true'
+ANALYSIS_JOB_POLL_INTERVAL = 2.0  # 대기열 확인 주기(초)
+ANALYSIS_JOB_TIMEOUT = 300  # running 상태로 이 시간(초)을 넘긴 작업은 다시 대기열로
+ANALYSIS_JOB_MAX_ATTEMPTS = 3
+ANALYSIS_JOB_RETRY_DELAY = 10  # 실패한 작업의 첫 재시도 대기 시간(초), 실패할 때마다 두 배
+ANALYSIS_JOB_RETRY_MAX_DELAY = 300
+
+# 분석 이미지 업로드 최대 크기 (서버 업로드, S3 직접 업로드 공통), S3 직접 업로드 URL 유효 시간(초)
+ANALYSIS_UPLOAD_MAX_BYTES = int(os.environ.get('ANALYSIS_UPLOAD_MAX_BYTES', 20 * 1024 * 1024))
+ANALYSIS_UPLOAD_URL_EXPIRES = 600
+ANALYSIS_UPLOAD_EXPIRE_GRACE = 3600  # URL 만료 후 이 시간(초)이 지나도록 시작하지 않은 직접 업로드는 워커가 지움
+ANALYSIS_UPLOAD_EXPIRE_INTERVAL = 300  # 워커가 시작하지 않은 직접 업로드를 정리하는 주기(초)
+# 디코딩할 최대 픽셀 수 (큰 JPEG 는 줄여서 디코딩한 크기 기준, PNG 등은 원본 크기 기준)
+ANALYSIS_IMAGE_MAX_PIXELS = int(os.environ.get('ANALYSIS_IMAGE_MAX_PIXELS', 25_000_000))
+
+# 업로드 파일이 이 크기(byte)보다 크면 메모리 대신 임시 파일에 저장
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.environ.get('FILE_UPLOAD_MAX_MEMORY_SIZE', 2 * 1024 * 1024))
+# 성분/FAQ/정보 CSV, XLSX 업로드 최대 크기, 한 번에 읽고 저장할 줄 수
+SPREADSHEET_UPLOAD_MAX_BYTES = int(os.environ.get('SPREADSHEET_UPLOAD_MAX_BYTES', 50 * 1024 * 1024))
+SPREADSHEET_BATCH_SIZE = 500
+
+# OCR 결과 캐시 (리사이즈된 이미지 해시 -> Clova OCR 응답)
+OCR_CACHE_ENABLED = os.environ.get('OCR_CACHE_ENABLED', 'true').lower() == 'true'
+OCR_CACHE_DIR = os.environ.get('OCR_CACHE_DIR', BASE_DIR / 'cache' / 'ocr')
+OCR_CACHE_MEMORY_ITEMS = 256
+OCR_CACHE_MAX_BYTES = int(os.environ.get('OCR_CACHE_MAX_BYTES', 100 * 1024 * 1024))
+OCR_CACHE_PHASH_DISTANCE = None  # 정수로 지정하면 지각 해시 거리 이내의 비슷한 사진도 캐시 사용 (예: 4)
+
+# 성분 사전/FAQ 데이터 버전(DB 에 저장, 워커끼리 공유)을 다시 확인하는 주기(초). 다른 워커의 변경은 최대 이 시간 뒤에 반영됨
+DATA_VERSION_CHECK_INTERVAL = int(os.environ.get('DATA_VERSION_CHECK_INTERVAL', 2))
+# 버전이 그대로여도 메모리 성분 사전을 다시 만드는 주기(초). 시그널 없이 바뀐 데이터도 이 시간 안에 반영됨
+INGREDIENT_INDEX_MAX_AGE = int(os.environ.get('INGREDIENT_INDEX_MAX_AGE', 3600))
+
+# OCR 단어 목록 -> 교정/매칭 결과 캐시 항목 수 (성분 사전이 바뀌면 비워짐)
+ANALYSIS_CACHE_ITEMS = 1024
+
+# 분석 파이프라인 단계를 동시에 실행할 스레드 풀 크기 (프로세스 전체 공유)
+ANALYSIS_PIPELINE_WORKERS = int(os.environ.get('ANALYSIS_PIPELINE_WORKERS', 8))
+
+# 성분 업로드로 등급이 바뀌면 지난 분석 요약을 백그라운드에서 다시 계산 (False 면 rescore_analyses 명령으로 처리)
+RESCORE_IN_BACKGROUND = os.environ.get('RESCORE_IN_BACKGROUND', 'true').lower() == 'true'
+RESCORE_WORKERS = 1  # 재계산 전용 스레드 수 (분석 파이프라인 스레드 풀과 따로 씀)
+
+# 분석 응답 후 OCR 박스를 그린 이미지를 미리 만들어 둘지 (False 면 처음 조회할 때 생성)
+ANALYSIS_RENDER_IN_BACKGROUND = os.environ.get('ANALYSIS_RENDER_IN_BACKGROUND', 'true').lower() == 'true'
+ANALYSIS_RENDER_WORKERS = int(os.environ.get('ANALYSIS_RENDER_WORKERS', 2))  # 이미지 생성 전용 스레드 수
+
+# 검색 결과 캐시 (워커별 메모리, 성분/FAQ 가 바뀌면 비워짐). FAQ 조회수는 TTL 동안 캐시된 값으로 보일 수 있음
+SEARCH_CACHE_ENABLED = os.environ.get('SEARCH_CACHE_ENABLED', 'true').lower() == 'true'
+SEARCH_CACHE_ITEMS = 1024
+SEARCH_CACHE_MAX_BYTES = int(os.environ.get('SEARCH_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL', 300))
+# 성분 검색 결과 최대 개수 (이름 관련도순 상위만 조회해서 등급순으로 정렬)
+SEARCH_INGREDIENT_MAX_MATCHES = int(os.environ.get('SEARCH_INGREDIENT_MAX_MATCHES', 500))
+
+# 검색어 자동완성 사전을 다시 만드는 주기(초). FAQ 조회수 순위가 이 주기로 반영됨
+SEARCH_SUGGEST_TTL = int(os.environ.get('SEARCH_SUGGEST_TTL', 300))
+
+# Clova OCR 로 보낼 이미지 (글자가 작은 사진일수록 크게 보내고, 흑백 + 대비 보정 후 JPEG 로 전송)
+OCR_IMAGE_MIN_WIDTH = int(os.environ.get('OCR_IMAGE_MIN_WIDTH', 768))
+OCR_IMAGE_MAX_WIDTH = int(os.environ.get('OCR_IMAGE_MAX_WIDTH', 1600))
+OCR_IMAGE_TEXT_HEIGHT = 28  # 전송 이미지에서 글자 줄 높이(px) 목표
+OCR_IMAGE_JPEG_QUALITY = int(os.environ.get('OCR_IMAGE_JPEG_QUALITY', 80))
+OCR_IMAGE_GRAYSCALE = os.environ.get('OCR_IMAGE_GRAYSCALE', 'true').lower() == 'true'
+
 ROOT_URLCONF = 'mombo.urls'
 
 TEMPLATES = [
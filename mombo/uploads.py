@@ -0,0 +1,82 @@
+import math
+
+import pandas as pd
+from django.core.files.uploadhandler import FileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "업로드 파일 크기가 너무 큽니다."
+    default_code = 'upload_too_large'
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    """
+    요청 본문이 max_bytes 를 넘으면 바로 413 으로 거절하는 업로드 핸들러.
+    Content-Length 가 있으면 본문을 읽기 전에, 없으면 읽은 크기가 넘는 순간 중단한다.
+    실제 저장은 뒤에 있는 기본 핸들러(작으면 메모리, 크면 임시 파일)가 맡는다.
+    """
+
+    def __init__(self, request=None, max_bytes=None):
+        super().__init__(request)
+        self.max_bytes = max_bytes
+        self.received = 0
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length and content_length > self.max_bytes:
+            raise UploadTooLarge()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            raise UploadTooLarge()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def limit_upload_size(request, max_bytes):
+    # request.data / request.FILES 를 읽기 전에 호출해야 한다
+    request.upload_handlers.insert(0, MaxSizeUploadHandler(request, max_bytes))
+
+
+def spreadsheet_rows(file, batch_size=500):
+    """
+    CSV/XLSX 업로드를 batch_size 줄씩 나눠 읽는 제너레이터 (첫 줄은 머리글).
+    파일 전체를 DataFrame 으로 올리지 않으므로 메모리 사용량이 파일 크기와 상관없이 일정하다.
+    빈 칸은 None 으로 돌려준다.
+    """
+    if file.name.endswith('.csv'):
+        # 나눠 읽으면 묶음마다 타입 추론이 달라질 수 있으므로 문자열로 읽는다 (숫자 필드는 저장할 때 변환)
+        for chunk in pd.read_csv(file, chunksize=batch_size, dtype=str):
+            yield [tuple(None if _is_nan(value) else value for value in row)
+                   for row in chunk.itertuples(index=False, name=None)]
+
+    elif file.name.endswith('.xlsx'):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(min_row=2, values_only=True)
+            batch = []
+            for row in rows:
+                if all(value is None for value in row):
+                    continue
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            workbook.close()
+
+    else:
+        raise ValueError("지원되지 않는 파일 형식입니다.")
+
+
+def _is_nan(value):
+    return isinstance(value, float) and math.isnan(value)
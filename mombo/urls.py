@@ -26,7 +26,8 @@ from drf_spectacular.views import SpectacularRedocView
 from drf_spectacular.views import SpectacularSwaggerView
 from drf_spectacular.views import SpectacularYAMLAPIView
 
-from pregnancy.views import Home, Search, Content, SearchDetail, ContentDetail
+from pregnancy.views import Home, Search, Content, SearchDetail, SearchSuggest, ContentDetail
+from .views import OCRCacheStatsView, SearchCacheStatsView, UpstreamStatsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -37,8 +38,12 @@ urlpatterns = [
     path("main/", Home.as_view(), name="home"),
     path("search/", Search.as_view(), name="search"),
     path("search/details/", SearchDetail.as_view(), name="search_detail"),
+    path("search/suggest/", SearchSuggest.as_view(), name="search_suggest"),
     path("content/", Content.as_view(), name="content"),
     path("content/details/", ContentDetail.as_view(), name="content_detail"),
+    path("status/upstreams/", UpstreamStatsView.as_view(), name="upstream_stats"),
+    path("status/search-cache/", SearchCacheStatsView.as_view(), name="search_cache_stats"),
+    path("status/ocr-cache/", OCRCacheStatsView.as_view(), name="ocr_cache_stats"),
     
     # Open API 자체를 조회 : json, yaml
     # path("api/json/", login_required(SpectacularJSONAPIView.as_view()), name="schema-json"), # 로그인을 해야만 볼 수 있음.
@@ -0,0 +1,35 @@
+from drf_spectacular.utils import extend_schema
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ingredient.cache import get_ocr_cache
+from pregnancy.cache import get_search_cache
+from .http import upstream_stats
+
+
+class UpstreamStatsView(APIView):
+    permission_classes = [IsAdminUser]
+    @extend_schema(exclude=True)
+    def get(self, request):
+        # 외부 서비스별 요청 수, 오류 수, 지연 시간, 회로 상태 (현재 프로세스 기준)
+        return Response({"upstreams": upstream_stats()}, status=status.HTTP_200_OK)
+
+
+class SearchCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+    @extend_schema(exclude=True)
+    def get(self, request):
+        # 검색 결과 캐시 적중률, 항목 수, 메모리 사용량(JSON 크기 기준) (현재 프로세스 기준)
+        search_cache = get_search_cache()
+        return Response({"searchCache": search_cache.stats() if search_cache else None}, status=status.HTTP_200_OK)
+
+
+class OCRCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+    @extend_schema(exclude=True)
+    def get(self, request):
+        # OCR 캐시 적중률(근사 적중 포함), 메모리/디스크 항목 수 (현재 프로세스 기준)
+        ocr_cache = get_ocr_cache()
+        return Response({"ocrCache": ocr_cache.stats() if ocr_cache else None}, status=status.HTTP_200_OK)
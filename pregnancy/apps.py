@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PregnancyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pregnancy'
+
+    def ready(self):
+        # FAQ 변경 시그널 등록
+        from . import suggest  # noqa: F401
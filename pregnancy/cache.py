@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from ingredient.index import dictionary_version
+from .suggest import faq_version
+
+
+def normalize_keyword(keyword):
+    """
+    검색 결과 캐시 키로 쓰는 검색어 (앞뒤/연속 공백, 대소문자 차이 제거).
+    검색 결과가 달라지지 않는 차이만 없애므로 검색에도 이 값을 그대로 사용한다.
+    (초성 검색어의 호환 자모가 바뀌지 않도록 NFKC 정규화는 하지 않음)
+    """
+    return ' '.join((keyword or '').split()).lower()
+
+
+def search_version():
+    # 성분 사전 버전과 FAQ 버전 (업로드, 수정, 삭제 시 증가, DB 로 공유되므로 다른 워커의 변경도 보인다)
+    return dictionary_version(), faq_version()
+
+
+class SearchCache:
+    """
+    검색 응답 캐시 (워커 프로세스별 메모리).
+    항목 수와 바이트(JSON 크기 기준) 상한을 넘으면 오래 안 쓴 것부터 지우고, ttl 초가 지난 항목은 쓰지 않는다.
+    성분 사전이나 FAQ 버전이 바뀌면 전체를 비운다.
+    """
+
+    def __init__(self, maxsize=1024, max_bytes=16 * 1024 * 1024, ttl=300):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._data = OrderedDict()  # key -> (만료 시각, 크기, 값)
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        if self.version != version:
+            self._data.clear()
+            self.bytes = 0
+            self.version = version
+
+    def get(self, key, version):
+        with self._lock:
+            self._check_version(version)
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+
+            expires_at, size, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.bytes -= size
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, version, value):
+        size = len(json.dumps(value, ensure_ascii=False, default=str).encode())
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._check_version(version)
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+
+            self._data[key] = (time.monotonic() + self.ttl, size, value)
+            self.bytes += size
+            while len(self._data) > self.maxsize or self.bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._data.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / requests if requests else 0.0,
+                'expired': self.expired,
+                'evictions': self.evictions,
+                'items': len(self._data),
+                'bytes': self.bytes,
+                'max_items': self.maxsize,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'version': self.version,
+            }
+
+
+_search_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache():
+    # settings.SEARCH_CACHE_ENABLED 가 False 면 None
+    global _search_cache
+    if not getattr(settings, 'SEARCH_CACHE_ENABLED', True):
+        return None
+    with _cache_lock:
+        if _search_cache is None:
+            _search_cache = SearchCache(
+                maxsize=getattr(settings, 'SEARCH_CACHE_ITEMS', 1024),
+                max_bytes=getattr(settings, 'SEARCH_CACHE_MAX_BYTES', 16 * 1024 * 1024),
+                ttl=getattr(settings, 'SEARCH_CACHE_TTL', 300),
+            )
+    return _search_cache
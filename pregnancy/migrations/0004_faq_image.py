@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pregnancy', '0003_rename_week_information_week'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='faq',
+            name='image',
+            field=models.CharField(blank=True, default='https://i.ibb.co/CQQ4rBK/suhyeon-choi-NIZeg731-Lx-M-unsplash.jpg', max_length=50, null=True),
+        ),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+# FAQ 본문 전문 검색 인덱스 (SQLite FTS5, external content)
+# trigram 토크나이저는 띄어쓰기가 없는 한글도 부분 문자열로 찾을 수 있고 대소문자를 구분하지 않는다 (icontains 와 같은 결과)
+# 트리거가 INSERT / UPDATE / DELETE 를 그대로 따라가므로 bulk_create, queryset.update 도 반영된다
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE pregnancy_faq_fts USING fts5(
+        question, real_question, answer,
+        content='pregnancy_faq', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER pregnancy_faq_fts_insert AFTER INSERT ON pregnancy_faq BEGIN
+        INSERT INTO pregnancy_faq_fts(rowid, question, real_question, answer)
+        VALUES (new.id, new.question, new.real_question, new.answer);
+    END
+    """,
+    """
+    CREATE TRIGGER pregnancy_faq_fts_delete AFTER DELETE ON pregnancy_faq BEGIN
+        INSERT INTO pregnancy_faq_fts(pregnancy_faq_fts, rowid, question, real_question, answer)
+        VALUES ('delete', old.id, old.question, old.real_question, old.answer);
+    END
+    """,
+    # 조회수, 이미지 변경에는 다시 색인하지 않는다
+    """
+    CREATE TRIGGER pregnancy_faq_fts_update AFTER UPDATE OF question, real_question, answer ON pregnancy_faq BEGIN
+        INSERT INTO pregnancy_faq_fts(pregnancy_faq_fts, rowid, question, real_question, answer)
+        VALUES ('delete', old.id, old.question, old.real_question, old.answer);
+        INSERT INTO pregnancy_faq_fts(rowid, question, real_question, answer)
+        VALUES (new.id, new.question, new.real_question, new.answer);
+    END
+    """,
+    "INSERT INTO pregnancy_faq_fts(pregnancy_faq_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS pregnancy_faq_fts_update",
+    "DROP TRIGGER IF EXISTS pregnancy_faq_fts_delete",
+    "DROP TRIGGER IF EXISTS pregnancy_faq_fts_insert",
+    "DROP TABLE IF EXISTS pregnancy_faq_fts",
+]
+
+
+def run_sqlite(statements):
+    def run(apps, schema_editor):
+        # SQLite 가 아니면 검색은 icontains 로 동작하므로 아무것도 만들지 않는다
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pregnancy', '0004_faq_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(CREATE_SQL), run_sqlite(DROP_SQL)),
+    ]
@@ -0,0 +1,45 @@
+from django.db import connection
+from django.db.models import Q
+
+from .models import FAQ
+
+FTS_TABLE = 'pregnancy_faq_fts'
+# trigram 토크나이저는 3글자 미만 검색어를 찾지 못한다
+FTS_MIN_LENGTH = 3
+
+_fts_available = None
+
+
+def fts_available():
+    # SQLite 이고 FTS 테이블이 만들어져 있을 때만 사용 (프로세스당 한 번 확인)
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+    return _fts_available
+
+
+def fts_phrase(keyword):
+    # 검색어 전체를 하나의 구문으로 (FTS 연산자로 해석되지 않도록 큰따옴표 이스케이프)
+    return '"{}"'.format(keyword.replace('"', '""'))
+
+
+def search_faqs(keyword):
+    """
+    질문/실제 질문/답변에 keyword 가 들어 있는 FAQ 를 관련도(BM25) 순으로 반환.
+    FTS 를 쓸 수 없거나 검색어가 짧으면 LIKE 검색 후 최신순으로 반환.
+    """
+    keyword = keyword.strip()
+    if len(keyword) < FTS_MIN_LENGTH or not fts_available():
+        return FAQ.objects.filter(
+            Q(question__icontains=keyword) | Q(real_question__icontains=keyword) | Q(answer__icontains=keyword)
+        ).order_by('-id')
+
+    # FTS 인덱스에서 찾은 행만 FAQ 와 조인 (bm25 는 작을수록 관련도가 높음)
+    # bm25() 대신 같은 값인 rank 열을 사용 (bm25() 는 COUNT(*) OVER () 와 같은 쿼리에서 쓸 수 없음)
+    return FAQ.objects.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = pregnancy_faq.id', f'{FTS_TABLE} MATCH %s'],
+        params=[fts_phrase(keyword)],
+        select={'rank': f'{FTS_TABLE}.rank'},
+        order_by=['rank', '-id'],
+    )
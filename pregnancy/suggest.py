@@ -0,0 +1,218 @@
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+from ingredient.index import get_index
+from ingredient.utils import normalize_name
+from ingredient.versions import bump_version, current_version
+from .models import FAQ
+
+logger = logging.getLogger(__name__)
+
+# FAQ 버전 (질문 내용이 바뀌면 워커마다 자동완성 사전, 검색 결과 캐시를 다시 만들도록 알리는 용도, DB 로 공유)
+FAQ_VERSION = 'pregnancy:faq'
+
+# FAQ 질문의 어절 구분 ('[임신과 카페인] 임신 중 ...' 의 말머리 괄호 포함)
+WORD_SEPARATORS = re.compile(r'[\s\[\]()]+')
+
+# 노드마다 미리 골라 두는 후보 수 (요청의 limit 최댓값)
+SUGGEST_MAX_LIMIT = 10
+
+
+def faq_version():
+    return current_version(FAQ_VERSION)
+
+
+def bump_faq_version():
+    return bump_version(FAQ_VERSION)[1]
+
+
+class RadixNode:
+    __slots__ = ('edges', 'items', 'top')
+
+    def __init__(self):
+        self.edges = {}  # 첫 글자 -> (간선 문자열, 자식 노드)
+        self.items = []  # 이 노드에서 끝나는 키의 (점수, id)
+        self.top = ()    # 이 노드 아래 전체에서 점수가 가장 좋은 (점수, id) k개
+
+
+class RadixTrie:
+    """
+    간선에 문자열을 붙여 한 글자짜리 노드 사슬을 줄인 접두사 트리 (compressed trie).
+    노드마다 하위 키의 상위 k개를 미리 계산해 두므로, 자동완성은 접두사를 따라 내려간 뒤 목록을 그대로 읽기만 한다.
+    점수는 작을수록 앞에 온다. 같은 id 가 여러 키로 들어가도 결과에는 한 번만 나온다.
+    """
+
+    def __init__(self, entries, k=SUGGEST_MAX_LIMIT):
+        # entries: (키, 점수, id)
+        self.root = RadixNode()
+        self.k = k
+        for key, score, pk in entries:
+            if key:
+                self._insert(key, (score, pk))
+        self._collect(self.root)
+
+    def _insert(self, key, item):
+        node = self.root
+        while True:
+            if not key:
+                node.items.append(item)
+                return
+
+            edge = node.edges.get(key[0])
+            if edge is None:
+                child = RadixNode()
+                child.items.append(item)
+                node.edges[key[0]] = (key, child)
+                return
+
+            label, child = edge
+            common = 0
+            while common < min(len(label), len(key)) and label[common] == key[common]:
+                common += 1
+
+            if common < len(label):
+                # 간선을 공통 부분에서 나눈다
+                middle = RadixNode()
+                middle.edges[label[common]] = (label[common:], child)
+                node.edges[key[0]] = (label[:common], middle)
+                child = middle
+
+            node = child
+            key = key[common:]
+
+    def _collect(self, root):
+        # 아래에서부터 상위 k개를 합친다 (재귀 대신 스택, 긴 FAQ 질문도 안전)
+        stack = [(root, False)]
+        while stack:
+            node, visited = stack.pop()
+            if not visited:
+                stack.append((node, True))
+                stack.extend((child, False) for _, child in node.edges.values())
+                continue
+
+            candidates = list(node.items)
+            for _, child in node.edges.values():
+                candidates.extend(child.top)
+            node.top = tuple(self._unique(sorted(candidates)))
+
+    def _unique(self, items):
+        seen = set()
+        for score, pk in items:
+            if pk in seen:
+                continue
+            seen.add(pk)
+            yield score, pk
+            if len(seen) >= self.k:
+                return
+
+    def complete(self, prefix, limit=SUGGEST_MAX_LIMIT):
+        # prefix 로 시작하는 키의 id (점수순, 최대 limit 개)
+        node = self.root
+        while prefix:
+            edge = node.edges.get(prefix[0])
+            if edge is None:
+                return []
+            label, child = edge
+            if prefix.startswith(label):
+                prefix = prefix[len(label):]
+            elif label.startswith(prefix):
+                prefix = ''
+            else:
+                return []
+            node = child
+        return [pk for _, pk in node.top[:limit]]
+
+
+def question_keys(question):
+    # 질문의 각 어절부터 시작하는 키 ('임신 중 배 뭉침' -> '임신중배뭉침', '중배뭉침', '배뭉침', '뭉침')
+    words = [word for word in WORD_SEPARATORS.split(question or '') if word]
+    return {normalize_name(''.join(words[i:])) for i in range(len(words))}
+
+
+class SuggestIndex:
+    """
+    검색창 자동완성 사전. 성분은 한글명/영문명 접두사로 찾아 위험한 등급부터,
+    FAQ 는 질문의 어절 접두사로 찾아 조회수가 많은 순으로 돌려준다.
+    """
+
+    def __init__(self, ingredient_index, faqs, version):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.ingredients = {}  # ingredient id -> 응답 항목
+        self.faqs = {}         # faq id -> 응답 항목
+
+        entries = []
+        for pk, entry in ingredient_index.entries.items():
+            severity = entry['severity']
+            score = (severity is None, severity or 0)
+            for name in entry['names']:
+                entries.append((normalize_name(name), score + (len(name or ''),), pk))
+            self.ingredients[pk] = {
+                'id': pk,
+                'ingredientKr': entry['data']['ingredientKr'],
+                'ingredient': entry['data']['ingredient'],
+                'level': entry['level'],
+            }
+        self.ingredient_trie = RadixTrie(entries)
+
+        entries = []
+        for faq in faqs:
+            for key in question_keys(faq.question):
+                entries.append((key, (-(faq.views or 0), -faq.id), faq.id))
+            self.faqs[faq.id] = {'id': faq.id, 'question': faq.question}
+        self.faq_trie = RadixTrie(entries)
+
+    def suggest(self, keyword, limit):
+        key = normalize_name(keyword)
+        if not key:
+            return {"ingredients": [], "faqs": []}
+        return {
+            "ingredients": [self.ingredients[pk] for pk in self.ingredient_trie.complete(key, limit)],
+            "faqs": [self.faqs[pk] for pk in self.faq_trie.complete(key, limit)],
+        }
+
+
+_suggest_index = None
+_suggest_lock = threading.Lock()
+
+
+def get_suggest_index():
+    """
+    워커 프로세스당 한 번 만들고, 성분 사전이나 FAQ 버전이 바뀌면 다시 만든다.
+    FAQ 조회수 순위는 SEARCH_SUGGEST_TTL 초마다 다시 만들 때 반영된다.
+    """
+    global _suggest_index
+
+    ingredient_index = get_index()
+    version = (ingredient_index.generation, faq_version())
+    ttl = getattr(settings, 'SEARCH_SUGGEST_TTL', 300)
+
+    index = _suggest_index
+    if index is not None and index.version == version and time.monotonic() - index.built_at < ttl:
+        return index
+
+    with _suggest_lock:
+        index = _suggest_index
+        if index is None or index.version != version or time.monotonic() - index.built_at >= ttl:
+            faqs = FAQ.objects.only('id', 'question', 'views')
+            index = SuggestIndex(ingredient_index, faqs, version)
+            _suggest_index = index
+            logger.info("자동완성 사전 생성: 성분 %d개, FAQ %d개 (version=%s)",
+                        len(index.ingredients), len(index.faqs), version)
+        return index
+
+
+def faq_changed(sender, update_fields=None, **kwargs):
+    # 조회수만 바뀐 저장은 무시 (순위는 TTL 마다 반영)
+    if update_fields is not None and set(update_fields) <= {'views'}:
+        return
+    bump_faq_version()
+
+
+post_save.connect(faq_changed, sender=FAQ)
+post_delete.connect(faq_changed, sender=FAQ)
@@ -1,3 +1,283 @@
-from django.test import TestCase
+import random
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from ingredient.index import DICTIONARY_VERSION, get_index
+from ingredient.models import DataVersion, Ingredient
+from user.models import User
+from .cache import SearchCache, search_version
+from .models import FAQ, Information
+from .search import fts_available, search_faqs
+from .suggest import FAQ_VERSION, RadixTrie, faq_version, get_suggest_index
+
+
+@override_settings(SEARCH_CACHE_ENABLED=False, DATA_VERSION_CHECK_INTERVAL=60)
+class SearchQueryCountTest(TestCase):
+    # 전체 개수와 페이지를 쿼리 한 번으로 가져오는지 확인 (개수마다 COUNT(*) 를 따로 실행하지 않음)
+
+    def setUp(self):
+        FAQ.objects.bulk_create([
+            FAQ(question=f'아스피린 복용 질문 {i}', real_question='진통제를 먹어도 되나요?', answer='의사와 상담하세요.', views=0)
+            for i in range(25)
+        ])
+        Ingredient.objects.create(ingredientKr='아스피린', ingredient='Aspirin', level='2등급')
+        Ingredient.objects.create(ingredientKr='아스피린라이신', ingredient='Aspirin Lysine', level='1등급')
+
+        self.user = User.objects.create(email='search@test.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        # 프로세스당 한 번 만드는 성분 사전, FTS 테이블 확인, 데이터 버전 확인은 세지 않는다
+        get_index()
+        fts_available()
+        search_version()
+
+    def test_search(self):
+        # FAQ 1번 + 성분 1번
+        with self.assertNumQueries(2):
+            response = self.client.get('/search/', {'keyword': '아스피린'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['faqsCount'], 25)
+        self.assertEqual(len(response.json()['faqs']), 3)
+        self.assertEqual(response.json()['ingredientsCount'], 2)
+
+    def test_search_short_keyword(self):
+        # 3글자 미만은 LIKE 검색, 성분 역색인에서 찾은 성분이 없으면 성분 쿼리는 실행하지 않는다
+        with self.assertNumQueries(1):
+            response = self.client.get('/search/', {'keyword': '질문'})
+
+        self.assertEqual(response.json()['faqsCount'], 25)
+        self.assertEqual(response.json()['ingredientsCount'], 0)
+
+    def test_search_detail_content(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/search/details/', {'keyword': '아스피린', 'category': 'content', 'page': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 25)
+        self.assertEqual(response.json()['results']['maxPage'], 2)
+        self.assertEqual(len(response.json()['results']['faqs']), 5)
+
+    def test_search_detail_ingredient(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/search/details/', {'keyword': '아스피린', 'category': 'ingredient'})
+
+        self.assertEqual(response.json()['count'], 2)
+        # 위험한 등급(severity)이 먼저, 같은 등급은 한글명 순
+        self.assertEqual([item['ingredientKr'] for item in response.json()['results']['ingredients']], ['아스피린라이신', '아스피린'])
+
+    def test_search_detail_ingredient_cursor(self):
+        # 커서 방식도 등급순 그대로 겹치지 않게 넘긴다
+        Ingredient.objects.create(ingredientKr='저용량아스피린', level='2등급')
+        Ingredient.objects.create(ingredientKr='아스피린정100', level='2등급')
+        get_index()
+
+        names = []
+        url, params = '/search/details/', {'keyword': '아스피린', 'category': 'ingredient', 'cursor': '', 'page_size': 1}
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url, params)
+            names += [item['ingredientKr'] for item in response.json()['results']['ingredients']]
+            url, params = response.json()['next'], None
+
+        self.assertEqual(names, ['아스피린라이신', '아스피린', '아스피린정100', '저용량아스피린'])
+
+    @override_settings(SEARCH_INGREDIENT_MAX_MATCHES=2)
+    def test_search_detail_ingredient_keeps_most_relevant_matches(self):
+        # 결과가 많으면 이름 관련도순 상위만 (그 안에서 등급순)
+        Ingredient.objects.create(ingredientKr='저용량아스피린', level='1등급')
+        Ingredient.objects.create(ingredientKr='아스피린정100', level='2등급')
+        get_index()
+
+        response = self.client.get('/search/details/', {'keyword': '아스피린', 'category': 'ingredient'})
+
+        self.assertEqual([item['ingredientKr'] for item in response.json()['results']['ingredients']], ['아스피린라이신', '아스피린'])
+
+    def test_search_detail_page_out_of_range(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/search/details/', {'keyword': '아스피린', 'category': 'content', 'page': 3})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_content_faq(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/content/', {'category': 'faq'})
+
+        self.assertEqual(response.json()['count'], 25)
+        self.assertEqual(len(response.json()['results']['faqs']), 20)
+
+    def test_search_detail_cursor(self):
+        # 커서 방식: 관련도 순 FAQ 를 겹치지 않게 끝까지 넘긴다
+        ids = []
+        url, params = '/search/details/', {'keyword': '아스피린', 'category': 'content', 'cursor': '', 'page_size': 10}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids += [item['id'] for item in response.json()['results']['faqs']]
+            url, params = response.json()['next'], None
+
+        self.assertEqual(sorted(ids), sorted(FAQ.objects.values_list('id', flat=True)))
+
+    def test_content_faq_cursor(self):
+        first = self.client.get('/content/', {'category': 'faq', 'cursor': ''}).json()
+        self.assertEqual(len(first['results']['faqs']), 20)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(first['next'])
+
+        last_ids = [item['id'] for item in response.json()['results']['faqs']]
+        self.assertEqual(last_ids, list(FAQ.objects.order_by('-id').values_list('id', flat=True)[20:]))
+        self.assertIsNone(response.json()['next'])
+
+
+@override_settings(SPREADSHEET_BATCH_SIZE=2)
+class InformationUploadTest(TestCase):
+    # CSV 를 여러 묶음으로 나눠 읽어도 모든 줄이 저장되는지 확인
+
+    def test_csv_upload(self):
+        content = (
+            'step,week,fetus,maternity,summary\n'
+            '초기,4,착상,피로감,임신 확인\n'
+            '초기,8,심장 박동,입덧,\n'
+            '중기,20,태동,배가 나옴,정밀 초음파\n'
+        )
+        upload = SimpleUploadedFile('information.csv', content.encode('utf-8'), content_type='text/csv')
+
+        response = APIClient().post('/pregnancy/information/upload/', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            list(Information.objects.order_by('week').values_list('step', 'week', 'fetus', 'summary')),
+            [('초기', 4, '착상', '임신 확인'), ('초기', 8, '심장 박동', None), ('중기', 20, '태동', '정밀 초음파')],
+        )
+
+
+class FAQFullTextSearchTest(TestCase):
+    # 트리거가 FAQ 변경을 FTS 색인에 그대로 반영하는지, 짧은 검색어는 LIKE 로 찾는지 확인
+
+    def setUp(self):
+        if not fts_available():
+            self.skipTest("FTS5 는 SQLite 에서만 사용")
+        self.faq = FAQ.objects.create(question='아세트아미노펜 먹어도 되나요?', real_question='해열제', answer='의사와 상담하세요.', views=0)
+
+    def ids(self, keyword):
+        return [faq.id for faq in search_faqs(keyword)]
+
+    def test_triggers_follow_changes(self):
+        bulk = FAQ.objects.bulk_create([FAQ(question='엽산은 언제부터 먹나요?', answer='임신 전부터', views=0)])[0]
+        self.assertEqual(self.ids('아세트아미노펜'), [self.faq.id])
+        self.assertEqual(self.ids('엽산은'), [bulk.id])
+
+        FAQ.objects.filter(pk=self.faq.pk).update(question='이부프로펜 먹어도 되나요?')
+        self.assertEqual(self.ids('아세트아미노펜'), [])
+        self.assertEqual(self.ids('이부프로펜'), [self.faq.id])
+
+        FAQ.objects.filter(pk=self.faq.pk).delete()
+        self.assertEqual(self.ids('이부프로펜'), [])
+
+    def test_ranks_by_relevance(self):
+        best = FAQ.objects.create(question='카페인 카페인', real_question='카페인', answer='카페인은 하루 200mg 이하', views=0)
+        other = FAQ.objects.create(question='커피 마셔도 되나요?', answer='카페인이 들어 있습니다. 하루 한 잔 정도는 괜찮습니다.', views=0)
+
+        self.assertEqual(self.ids('카페인'), [best.id, other.id])
+
+    def test_short_keyword_falls_back_to_like(self):
+        # trigram 은 3글자 미만을 찾지 못하므로 LIKE (최신순)
+        other = FAQ.objects.create(question='해열제 종류', views=0)
+        self.assertEqual(self.ids('해열'), [other.id, self.faq.id])
+        self.assertEqual(self.ids(' 해열 '), [other.id, self.faq.id])
+
+    def test_quotes_are_not_operators(self):
+        self.assertEqual(self.ids('"아세트 OR'), [])
+
+
+class RadixTrieTest(SimpleTestCase):
+    # 노드마다 미리 골라 둔 상위 k개가 접두사로 시작하는 모든 키를 점수순으로 본 결과와 같은지 확인
+
+    def brute_force(self, entries, prefix, limit):
+        best = {}
+        for key, score, pk in entries:
+            if key.startswith(prefix) and (pk not in best or score < best[pk]):
+                best[pk] = score
+        return [pk for score, pk in sorted((score, pk) for pk, score in best.items())][:limit]
+
+    def test_top_k_matches_brute_force(self):
+        rng = random.Random(0)
+        entries = [
+            (''.join(rng.choice('가나다') for _ in range(rng.randint(1, 6))), rng.randint(0, 20), rng.randint(1, 40))
+            for _ in range(300)
+        ]
+        trie = RadixTrie(entries, k=5)
+
+        prefixes = {key[:n] for key, _, _ in entries for n in range(1, 4)} | {'', '라', '가가가가가가가'}
+        for prefix in sorted(prefixes):
+            for limit in (1, 3, 5):
+                self.assertEqual(trie.complete(prefix, limit), self.brute_force(entries, prefix, limit), (prefix, limit))
+
+    def test_prefix_inside_edge(self):
+        trie = RadixTrie([('아스피린', 2, 1), ('아스코르빈산', 3, 2), ('아세트아미노펜', 1, 3)])
+
+        self.assertEqual(trie.complete('아'), [3, 1, 2])
+        self.assertEqual(trie.complete('아스'), [1, 2])
+        self.assertEqual(trie.complete('아스피'), [1])   # 간선 '피린' 중간에서 끝나는 접두사
+        self.assertEqual(trie.complete('아스피란'), [])
+
+    def test_same_id_appears_once(self):
+        trie = RadixTrie([('aspirin', 5, 1), ('아스피린', 1, 1), ('aspartame', 3, 2)])
+        self.assertEqual(trie.complete(''), [1, 2])     # 여러 키 중 가장 좋은 점수로 한 번만
+        self.assertEqual(trie.complete('asp'), [2, 1])  # 접두사에 맞는 키의 점수만 사용
+
+
+@override_settings(DATA_VERSION_CHECK_INTERVAL=0)
+class FAQVersionTest(TestCase):
+    # FAQ 버전은 DB 로 공유되므로 다른 프로세스에서 바꾼 FAQ 도 자동완성 사전에 반영된다
+
+    def test_change_in_other_process_rebuilds_suggest_index(self):
+        FAQ.objects.create(question='카페인 얼마나 마셔도 되나요?', views=0)
+        index = get_suggest_index()
+        self.assertEqual(len(index.suggest('카페인', 5)['faqs']), 1)
+
+        # 다른 프로세스: 시그널 없이 추가하고 DB 의 버전만 올림
+        FAQ.objects.bulk_create([FAQ(question='카페인 없는 커피는 괜찮나요?', views=0)])
+        DataVersion.objects.filter(name=FAQ_VERSION).update(version=F('version') + 1)
+
+        self.assertEqual(faq_version(), DataVersion.objects.get(name=FAQ_VERSION).version)
+        self.assertIsNot(get_suggest_index(), index)
+        self.assertEqual(len(get_suggest_index().suggest('카페인', 5)['faqs']), 2)
+
+
+@override_settings(DATA_VERSION_CHECK_INTERVAL=0)
+class SearchCacheVersionTest(TestCase):
+    # 검색 결과 캐시는 DB 로 공유되는 성분 사전/FAQ 버전을 보므로 다른 프로세스의 변경에도 비워진다
+
+    def setUp(self):
+        FAQ.objects.create(question='카페인 얼마나 마셔도 되나요?', views=0)
+        Ingredient.objects.create(ingredientKr='카페인', ingredient='Caffeine', level='2등급')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(email='cache@test.com'))
+        self.cache = SearchCache()
+        self.enterContext(mock.patch('pregnancy.views.get_search_cache', return_value=self.cache))
+
+    def search(self):
+        return self.client.get('/search/', {'keyword': '카페인'}).json()
+
+    def test_shared_version_change_invalidates(self):
+        self.assertEqual(self.search()['faqsCount'], 1)
+        with self.assertNumQueries(2):  # 버전 확인만 (성분 사전, FAQ)
+            self.assertEqual(self.search()['faqsCount'], 1)
+
+        # 다른 프로세스에서 FAQ 추가
+        FAQ.objects.bulk_create([FAQ(question='카페인 없는 커피는 괜찮나요?', views=0)])
+        DataVersion.objects.filter(name=FAQ_VERSION).update(version=F('version') + 1)
+        self.assertEqual(self.search()['faqsCount'], 2)
+
+        # 다른 프로세스에서 성분 추가
+        Ingredient.objects.bulk_create([Ingredient(ingredientKr='카페인시트르산', normalized_name='카페인시트르산', level='2등급', severity=2)])
+        DataVersion.objects.filter(name=DICTIONARY_VERSION).update(version=F('version') + 1)
+        self.assertEqual(self.search()['ingredientsCount'], 2)
+        self.assertEqual(self.cache.stats()['version'], search_version())
@@ -1,4 +1,5 @@
 from drf_spectacular.utils import OpenApiExample, extend_schema, inline_serializer, OpenApiParameter, OpenApiResponse
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.forms.models import model_to_dict
 from rest_framework import serializers
@@ -6,18 +7,21 @@ from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework.pagination import PageNumberPagination
-from django.db.models import Max, Q
+from django.db.models import Max
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from .models import FAQ, Information
+from .cache import get_search_cache, normalize_keyword, search_version
+from .search import search_faqs
 from .serializers import InformationSerializer, FAQSerializer
+from .suggest import SUGGEST_MAX_LIMIT, bump_faq_version, get_suggest_index
 from .utils import weeks_since
 from user.serializers import ProfileSerializer
 from user.models import Profile
-from ingredient.models import Ingredient
+from ingredient.search import search_ingredients
 from ingredient.serializers import IngredientSerializer
+from mombo.pagination import KeysetPagination, WindowCountPagination, first_with_count, keyset_requested
+from mombo.uploads import limit_upload_size, spreadsheet_rows
 import random
-import pandas as pd
 
 
 from django.contrib.auth import get_user_model
@@ -26,11 +30,18 @@ User = get_user_model()
 # Create your views here.
 
 # 페이징 처리 클래스
-class SearchPagination(PageNumberPagination):
+class SearchPagination(WindowCountPagination):
     page_size = 20  # 한 페이지에 20개 항목
     page_size_query_param = 'page_size'
     max_page_size = 100  # 최대 페이지 크기 제한
-    
+
+
+# 커서 페이징 처리 클래스 (cursor 파라미터가 있을 때, 깊은 페이지도 OFFSET 없이 조회)
+class SearchCursorPagination(KeysetPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
 
 class Home(APIView):
     permission_classes = [IsAuthenticated]
@@ -201,23 +212,27 @@ class Search(APIView):
         },
     )
     def get(self, request):
-        keyword = request.GET.get('keyword')
+        keyword = normalize_keyword(request.GET.get('keyword'))
 
         if not keyword:
             return Response({"message": "검색 창이 입력되지 않았습니다."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # FAQ
-        faqs_queryset = FAQ.objects.filter(
-            Q(question__icontains=keyword) | Q(real_question__icontains=keyword) | Q(answer__icontains=keyword)
-        )
-        faqs_count = faqs_queryset.count()
-        faqs = faqs_queryset.order_by('-id')[:3]
+        # 같은 검색어의 결과가 캐시에 있으면 쿼리 없이 응답
+        search_cache = get_search_cache()
+        version = search_version()
+        cache_key = (keyword, 'summary')
+        if search_cache is not None:
+            response_data = search_cache.get(cache_key, version)
+            if response_data is not None:
+                return Response(response_data, status=status.HTTP_200_OK)
+
+        # FAQ (전문 검색 인덱스, 관련도순)
+        # 앞의 3개와 전체 개수를 쿼리 한 번으로
+        faqs, faqs_count = first_with_count(search_faqs(keyword), 3)
         faqs_serializer = FAQSerializer(faqs, many=True).data
 
         # Ingredient
-        ingredients_queryset = Ingredient.objects.filter(Q(ingredientKr__icontains=keyword))
-        ingredients_count = ingredients_queryset.count()
-        ingredients = ingredients_queryset.order_by('level', 'ingredientKr')[:3]
+        ingredients, ingredients_count = first_with_count(search_ingredients(keyword), 3)
         ingredients_serializer = IngredientSerializer(ingredients, many=True).data
         
         response_data = {
@@ -227,9 +242,69 @@ class Search(APIView):
             "ingredientsCount": ingredients_count
         }
 
+        if search_cache is not None:
+            search_cache.set(cache_key, version, response_data)
+
         return Response(response_data, status=status.HTTP_200_OK)
 
 
+class SearchSuggest(APIView):
+    @extend_schema(
+        summary="검색어 자동완성 API",
+        description="검색어 자동완성 API에 대한 설명 입니다. 입력 중인 검색어로 시작하는 성분(위험 등급순)과 FAQ 질문(조회수순)을 반환합니다. DB 를 조회하지 않으므로 글자를 입력할 때마다 호출해도 됩니다.",
+        parameters=[
+            OpenApiParameter(name='keyword', description='입력 중인 검색어', required=True, type=str),
+            OpenApiParameter(name='limit', description=f'종류별 최대 개수 (기본 5, 최대 {SUGGEST_MAX_LIMIT})', required=False, type=int),
+        ],
+        tags=["Search"],
+        responses={
+            200: OpenApiResponse(
+                description="자동완성 후보를 반환합니다.",
+                examples=[
+                    OpenApiExample(
+                        name="200_OK",
+                        value={
+                            "ingredients": [
+                                {
+                                    "id": 1,
+                                    "ingredientKr": "아스피린",
+                                    "ingredient": "Aspirin",
+                                    "level": "1등급"
+                                }
+                            ],
+                            "faqs": [
+                                {
+                                    "id": 114,
+                                    "question": "임신 중 배 뭉침이 너무 잦아서 걱정입니다."
+                                }
+                            ]
+                        },
+                    ),
+                    OpenApiExample(
+                        name="400_BAD_REQUEST",
+                        value={
+                            "message": "검색 창이 입력되지 않았습니다.",
+                        },
+                    ),
+                ],
+            )
+        },
+    )
+    def get(self, request):
+        keyword = request.GET.get('keyword')
+
+        if not keyword:
+            return Response({"message": "검색 창이 입력되지 않았습니다."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = int(request.GET.get('limit', 5))
+        except ValueError:
+            return Response({"message": "limit 은 정수여야 합니다."}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+
+        return Response(get_suggest_index().suggest(keyword, limit), status=status.HTTP_200_OK)
+
+
 class SearchDetail(APIView):
     @extend_schema(
         summary="검색 결과 디테일 API",
@@ -237,6 +312,12 @@ class SearchDetail(APIView):
         parameters=[
             OpenApiParameter(name='keyword', description='검색어', required=True, type=str),
             OpenApiParameter(name='page', description='페이지 번호 (정수 값)', required=False, type=int),
+            OpenApiParameter(
+                name='cursor',
+                description="커서 (있으면 page 대신 커서 방식으로 응답, 첫 페이지는 빈 값, 다음/이전 페이지는 next/previous 링크 사용)",
+                required=False,
+                type=str,
+            ),
             OpenApiParameter(
                 name='category', 
                 description="검색 카테고리 (가능한 값: 'content', 'ingredient')", 
@@ -300,52 +381,105 @@ class SearchDetail(APIView):
         },
     )
     def get(self, request):
-        keyword = request.GET.get('keyword')
+        keyword = normalize_keyword(request.GET.get('keyword'))
         category = request.GET.get('category')
         page = int(request.GET.get('page', 1))
 
         if not keyword:
             return Response({"message": "검색 창이 입력되지 않았습니다."}, status=status.HTTP_400_BAD_REQUEST)
 
+        # 검색어, 카테고리, 페이지가 같은 결과가 캐시에 있으면 쿼리 없이 응답
+        search_cache = get_search_cache()
+        version = search_version()
+
+        # 커서 방식 (전체 개수 없이 (정렬 키, id) 다음부터 조회, 커서가 같은 결과는 캐시에서 응답)
+        if keyset_requested(request):
+            paginator = SearchCursorPagination()
+            cache_key = (keyword, 'content' if category == 'content' else 'ingredient', 'cursor',
+                         request.GET.get('cursor'), paginator.get_page_size(request))
+            if search_cache is not None:
+                cached = search_cache.get(cache_key, version)
+                if cached is not None:
+                    paginator.restore_cursors(request, cached['next'], cached['previous'])
+                    return paginator.get_paginated_response(cached['data'])
+
+            if category == 'content':
+                paginated_faqs = paginator.paginate_queryset(search_faqs(keyword), request)
+                response_data = {"faqs": FAQSerializer(paginated_faqs, many=True).data}
+            else:
+                paginated_ingredients = paginator.paginate_queryset(search_ingredients(keyword), request)
+                response_data = {"ingredients": IngredientSerializer(paginated_ingredients, many=True).data}
+            response_data["page_size"] = paginator.page_size
+
+            if search_cache is not None:
+                search_cache.set(cache_key, version, {
+                    'next': paginator.next_cursor,
+                    'previous': paginator.previous_cursor,
+                    'data': response_data,
+                })
+
+            return paginator.get_paginated_response(response_data)
+
+        cache_key = (keyword, 'content' if category == 'content' else 'ingredient', page,
+                     SearchPagination().get_page_size(request))
+        if search_cache is not None:
+            cached = search_cache.get(cache_key, version)
+            if cached is not None:
+                paginator = SearchPagination()
+                paginator.restore_page(request, cached['count'], cached['page'])
+                return paginator.get_paginated_response(cached['data'])
+
         if category == 'content':
-            faqs = FAQ.objects.filter(
-                Q(question__icontains=keyword) | Q(real_question__icontains=keyword) | Q(answer__icontains=keyword)
-            ).order_by('-id')
+            faqs = search_faqs(keyword)
             
             # 페이징 처리
             paginator = SearchPagination()
             paginated_faqs = paginator.paginate_queryset(faqs, request)
 
             faqs_serializer = FAQSerializer(paginated_faqs, many=True).data
-            maxPage = (faqs.count() + paginator.page_size - 1) // paginator.page_size
+            maxPage = (paginator.count + paginator.page_size - 1) // paginator.page_size
             
             response_data = {
                 "faqs": faqs_serializer,
-                "count": faqs.count(),  # 총 항목 수
+                "count": paginator.count,  # 총 항목 수
                 "page": page,
                 "page_size": paginator.page_size,
                 "maxPage": maxPage,
             }
 
+            if search_cache is not None:
+                search_cache.set(cache_key, version, {
+                    'count': paginator.count,
+                    'page': paginator.page.number,
+                    'data': response_data,
+                })
+
             return paginator.get_paginated_response(response_data)
         else:
-            ingredients = Ingredient.objects.filter(Q(ingredientKr__icontains=keyword)).order_by('level', 'ingredientKr')
+            ingredients = search_ingredients(keyword)
             
             # 페이징 처리
             paginator = SearchPagination()
             paginated_ingredients = paginator.paginate_queryset(ingredients, request)
 
             ingredients_serializer = IngredientSerializer(paginated_ingredients, many=True).data
-            maxPage = (ingredients.count() + paginator.page_size - 1) // paginator.page_size
+            maxPage = (paginator.count + paginator.page_size - 1) // paginator.page_size
 
             response_data = {
                 "ingredients": ingredients_serializer,
-                "count": ingredients.count(),  # 총 항목 수
+                "count": paginator.count,  # 총 항목 수
                 "page": page,
                 "page_size": paginator.page_size,
                 "maxPage": maxPage,
             }
 
+            if search_cache is not None:
+                search_cache.set(cache_key, version, {
+                    'count': paginator.count,
+                    'page': paginator.page.number,
+                    'data': response_data,
+                })
+
             return paginator.get_paginated_response(response_data)
 
 
@@ -355,6 +489,12 @@ class Content(APIView):
         description="콘텐츠 API에 대한 설명 입니다. FAQ와 주차별 정보를 반환합니다.",
         parameters=[
             OpenApiParameter(name='page', description='페이지 번호 (정수 값)', required=False, type=int),
+            OpenApiParameter(
+                name='cursor',
+                description="커서 (있으면 page 대신 커서 방식으로 응답 (faq 만), 첫 페이지는 빈 값, 다음/이전 페이지는 next/previous 링크 사용)",
+                required=False,
+                type=str,
+            ),
             OpenApiParameter(
                 name='category', 
                 description="카테고리 (가능한 값: 'all', 'faq', 'info')", 
@@ -429,16 +569,28 @@ class Content(APIView):
         elif category == 'faq':
             faqs = FAQ.objects.all().order_by('-id')
             
+            # 커서 방식 (전체 개수 없이 id 다음부터 조회)
+            if keyset_requested(request):
+                paginator = SearchCursorPagination()
+                paginated_faqs = paginator.paginate_queryset(faqs, request)
+
+                response_data = {
+                    "faqs": FAQSerializer(paginated_faqs, many=True).data,
+                    "page_size": paginator.page_size,
+                }
+
+                return paginator.get_paginated_response(response_data)
+
             # 페이징 처리
             paginator = SearchPagination()
             paginated_faqs = paginator.paginate_queryset(faqs, request)
 
             faqs_serializer = FAQSerializer(paginated_faqs, many=True).data
-            maxPage = (faqs.count() + paginator.page_size - 1) // paginator.page_size
+            maxPage = (paginator.count + paginator.page_size - 1) // paginator.page_size
             
             response_data = {
                 "faqs": faqs_serializer,
-                "count": faqs.count(),  # 총 항목 수
+                "count": paginator.count,  # 총 항목 수
                 "page": page,
                 "page_size": paginator.page_size,
                 "maxPage": maxPage,
@@ -528,7 +680,7 @@ class ContentDetail(APIView):
         if category == 'faq':
             faq = FAQ.objects.get(pk=postNo)
             faq.views += 1  # views 값을 +1 증가
-            faq.save()  # 변경 사항 저장
+            faq.save(update_fields=['views'])  # 변경 사항 저장
             faq_serializer = FAQSerializer(faq).data
             
             response_data = {
@@ -553,30 +705,29 @@ class FAQUploadAPIView(APIView):
     parser_classes = (MultiPartParser, FormParser)
     @extend_schema(exclude=True)
     def post(self, request, *args, **kwargs):
+        limit_upload_size(request, settings.SPREADSHEET_UPLOAD_MAX_BYTES)
         file = request.FILES.get('file')
 
         if not file:
             return Response({"error": "파일이 제공되지 않았습니다."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 파일 확장자에 따라 pandas로 파일 읽기
-        if file.name.endswith('.csv'):
-            data = pd.read_csv(file)
-        elif file.name.endswith('.xlsx'):
-            data = pd.read_excel(file)
-        else:
+        if not file.name.endswith(('.csv', '.xlsx')):
             return Response({"error": "지원되지 않는 파일 형식입니다."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 데이터 저장
-        faqs = []
-        for _, row in data.iterrows():
-            faqs.append(FAQ(
-                question = row.iloc[0],
-                real_question = row.iloc[1],
-                answer = row.iloc[2],
-                views = 0
-            ))
-        
-        FAQ.objects.bulk_create(faqs)
+        # 파일 전체를 메모리에 올리지 않고 나눠 읽어서 저장
+        for rows in spreadsheet_rows(file, settings.SPREADSHEET_BATCH_SIZE):
+            FAQ.objects.bulk_create([
+                FAQ(
+                    question = row[0],
+                    real_question = row[1],
+                    answer = row[2],
+                    views = 0
+                )
+                for row in rows
+            ])
+
+        # bulk_create 는 시그널이 없으므로 자동완성 사전, 검색 결과 캐시 갱신을 직접 알린다
+        bump_faq_version()
 
         return Response({"message": "데이터가 성공적으로 업로드되었습니다."}, status=status.HTTP_201_CREATED)
     
@@ -589,6 +740,7 @@ class FAQImageUpdateAPIView(APIView):
 
         # 모든 FAQ 데이터를 가져와 image 값을 업데이트
         FAQ.objects.all().update(image=temp_image_url)
+        bump_faq_version()  # 검색 결과 캐시에 이미지 URL 이 들어 있음
 
         return Response(
             {"message": "모든 FAQ의 이미지가 임시 값으로 업데이트되었습니다."},
@@ -600,30 +752,26 @@ class InfomationUploadAPIView(APIView):
     parser_classes = (MultiPartParser, FormParser)
     @extend_schema(exclude=True)
     def post(self, request, *args, **kwargs):
+        limit_upload_size(request, settings.SPREADSHEET_UPLOAD_MAX_BYTES)
         file = request.FILES.get('file')
 
         if not file:
             return Response({"error": "파일이 제공되지 않았습니다."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 파일 확장자에 따라 pandas로 파일 읽기
-        if file.name.endswith('.csv'):
-            data = pd.read_csv(file)
-        elif file.name.endswith('.xlsx'):
-            data = pd.read_excel(file)
-        else:
+        if not file.name.endswith(('.csv', '.xlsx')):
             return Response({"error": "지원되지 않는 파일 형식입니다."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 데이터 저장
-        informations = []
-        for _, row in data.iterrows():
-            informations.append(Information(
-                step = row.iloc[0],
-                Week = row.iloc[1],
-                fetus = row.iloc[2],
-                maternity = row.iloc[3],
-                summary = row.iloc[4]
-            ))
-        
-        Information.objects.bulk_create(informations)
+        # 파일 전체를 메모리에 올리지 않고 나눠 읽어서 저장
+        for rows in spreadsheet_rows(file, settings.SPREADSHEET_BATCH_SIZE):
+            Information.objects.bulk_create([
+                Information(
+                    step = row[0],
+                    week = row[1],
+                    fetus = row[2],
+                    maternity = row[3],
+                    summary = row[4]
+                )
+                for row in rows
+            ])
 
         return Response({"message": "데이터가 성공적으로 업로드되었습니다."}, status=status.HTTP_201_CREATED)
\ No newline at end of file
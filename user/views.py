@@ -18,6 +18,7 @@ from .utils import set_to_next_monday
 from pregnancy.utils import weeks_since
 from ingredient.models import Ingredient, UserAnalysisResult, IngredientResult
 from ingredient.serializers import IngredientSerializer, UserAnalysisResultSerializer, IngredientResultSerializer
+from mombo.http import get_upstream
 import dotenv
 import os
 import requests
@@ -104,7 +105,10 @@ class Login(APIView):
         token_headers = {
             'Content-type': 'application/x-www-form-urlencoded;charset=utf-8'
         }
-        token_res = requests.post("https://kauth.kakao.com/oauth/token", data=request_data, headers=token_headers)
+        try:
+            token_res = get_upstream('kakao_auth').post("https://kauth.kakao.com/oauth/token", data=request_data, headers=token_headers)
+        except requests.RequestException:
+            return Response({'error': 'Kakao auth server is unavailable'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         
         token_json = token_res.json()
         access_token = token_json.get('access_token')
@@ -117,7 +121,10 @@ class Login(APIView):
                 "Content-type": "application/x-www-form-urlencoded;charset=utf-8",
             }
 
-            user_info_res = requests.post("https://kapi.kakao.com/v2/user/me", headers=auth_headers)
+            try:
+                user_info_res = get_upstream('kakao_api').post("https://kapi.kakao.com/v2/user/me", headers=auth_headers)
+            except requests.RequestException:
+                return Response({'error': 'Kakao API server is unavailable'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
             user_info_json = user_info_res.json()
 
             kakao_account = user_info_json.get('kakao_account')
@@ -343,7 +350,8 @@ class ProfileView(APIView):
         profile_data['pregnancyWeek'] = pregnancyWeek
         
         # 해당 user의 성분 분석 결과를 가져오기
-        user_analysis_results = UserAnalysisResult.objects.filter(user_id=user)
+        # (업로드 URL 만 발급받고 시작하지 않은 분석은 이미지도 작업도 없으므로 제외)
+        user_analysis_results = UserAnalysisResult.objects.filter(user_id=user).exclude(image__isnull=True, job__isnull=True)
         user_analysis_results_serializer = UserAnalysisResultSerializer(user_analysis_results, many=True)
 
         data = {